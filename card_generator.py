@@ -0,0 +1,261 @@
+"""
+Synthetic perk-card generator.
+
+Renders labeled perk cards from the PERK_PRIORITY entries: card-sized images
+with the normal or purple background (PURPLE_BG_COLOR with a
+PURPLE_BORDER_COLOR border), phrases built from each entry's include keywords
+with multipliers such as "x1.15" / "x1.80" or percentages, and optional noise
+(blur, JPEG artifacts, scaling, shifts).
+
+The output directory gets card_NNNNN.png files and a labels.json in the
+format read by ocr_benchmark.py. Labels hold the priority of the entry the
+phrase was built from, in the list the --window profile uses
+(PERK_PRIORITY_DADDY for Daddy windows), and matcher_priority, what the
+matcher returns for the clean text. Phrases the matcher maps to a different
+entry (e.g. "Tower Health Regen" hits "health regen" first) are kept and
+listed by shadowed_phrases(), so the benchmarks count them as errors.
+
+    python card_generator.py out/ --count 2000 --purple 0.3 --noise 0.5 --seed 1
+    python ocr_benchmark.py out/
+
+The game font is not shipped; pass --font with the font file to match it,
+otherwise a bold system font (or PIL's default) is used.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+CARD_SIZE = (371, 87)              # perk1_text_region of COORDS_NO_AD
+NORMAL_BG_COLOR = (28, 38, 66)
+TEXT_COLOR = (255, 255, 255)
+BORDER_WIDTH = 3
+FONT_SIZE = 24
+FALLBACK_FONTS = ("arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf")
+
+MULTIPLIERS = ("1.10", "1.15", "1.20", "1.25", "1.50", "1.80", "2.00", "2.50")
+PERCENTS = ("2", "4", "5", "10", "20", "50")
+
+# Phrase templates over an entry's include keywords ({0}, {1}); {m} is replaced by a
+# multiplier from MULTIPLIERS and {p} by a percentage from PERCENTS.
+SINGLE_TEMPLATES = ("x{m} {0}", "{0} x{m}", "{0} +{p}%", "Unlock {0}")
+PAIR_TEMPLATES = ("{0} {1} x{m}", "{0} -{p}%, but {1} +{p}%", "x{m} {0}, but {1} -{p}%")
+
+
+def _title(keyword):
+    return ' '.join(word.capitalize() for word in keyword.split())
+
+
+def _merge_overlap(first, second):
+    """'free upgrade chance' + 'upgrade chance for all' -> 'free upgrade chance for all' (None if no overlap)."""
+    a, b = first.split(), second.split()
+    for size in range(min(len(a), len(b)), 0, -1):
+        if a[-size:] == b[:size]:
+            return ' '.join(a + b[size:])
+    return None
+
+
+def keyword_phrases(priority_list):
+    """{perk id: [phrase templates]} built from each entry's include keywords (perk id as in get_perk_id)."""
+    phrases = {}
+    for _, include, _ in priority_list:
+        keywords = list(include)
+        if len(keywords) == 2:
+            merged = _merge_overlap(*keywords)
+            if merged:
+                keywords = [merged]
+        names = [_title(keyword) for keyword in keywords]
+        templates = SINGLE_TEMPLATES if len(names) == 1 else PAIR_TEMPLATES
+        phrases['+'.join(include)] = [t.format(*names, m='{m}', p='{p}') for t in templates]
+    return phrases
+
+
+def expand(template):
+    """Every text a phrase template produces."""
+    multipliers = MULTIPLIERS if '{m}' in template else ('',)
+    percents = PERCENTS if '{p}' in template else ('',)
+    return [template.format(m=m, p=p) for m in multipliers for p in percents]
+
+
+def perk_phrases(automator, window_name):
+    """keyword_phrases() of the window's priority list with each entry's own priority.
+
+    Returns {perk id: (priority, [templates])}; the priority is the entry the templates
+    were built from, not what the matcher makes of them (see shadowed_phrases).
+    """
+    templates_by_id = keyword_phrases(automator.get_priority_list(window_name))
+    return {'+'.join(include): (priority, templates_by_id['+'.join(include)])
+            for priority, include, _ in automator.get_priority_list(window_name)}
+
+
+def shadowed_phrases(automator, window_name):
+    """Phrase texts the matcher maps to another entry than the one they were built from.
+
+    Returns {perk id: [(text, priority the matcher returned)]}, only for entries with such texts.
+    """
+    shadowed = {}
+    for perk_id, (priority, templates) in perk_phrases(automator, window_name).items():
+        for template in templates:
+            for text in expand(template):
+                matched = automator.get_perk_priority(text, window_name)
+                if matched != priority:
+                    shadowed.setdefault(perk_id, []).append((text, matched))
+    return shadowed
+
+
+def report_shadowed(automator, window_name):
+    """Print the entries whose phrases the matcher maps elsewhere; returns shadowed_phrases()."""
+    shadowed = shadowed_phrases(automator, window_name)
+    if shadowed:
+        phrases = perk_phrases(automator, window_name)
+        print(f"Matcher errors on clean phrases for {window_name} (cards keep the entry they were built from):")
+        for perk_id, misses in shadowed.items():
+            priority = phrases[perk_id][0]
+            text, matched = misses[0]
+            print(f"  {perk_id} (priority {priority}): {len(misses)} texts, e.g. '{text}' -> {matched}")
+    return shadowed
+
+
+def phrase_text(template, rng):
+    return template.format(m=rng.choice(MULTIPLIERS), p=rng.choice(PERCENTS))
+
+
+def load_font(path=None, size=FONT_SIZE):
+    for candidate in ([path] if path else []) + list(FALLBACK_FONTS):
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _wrap(draw, text, font, max_width):
+    """Split text into at most two lines that fit max_width."""
+    if draw.textlength(text, font=font) <= max_width:
+        return [text]
+    words = text.split()
+    for split in range(len(words) - 1, 0, -1):
+        first = ' '.join(words[:split])
+        if draw.textlength(first, font=font) <= max_width:
+            return [first, ' '.join(words[split:])]
+    return [text]
+
+
+def render_card(text, background=NORMAL_BG_COLOR, border=None, size=CARD_SIZE, font=None):
+    """Render one clean card image."""
+    font = font or load_font()
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    if border is not None:
+        draw.rectangle((0, 0, size[0] - 1, size[1] - 1), outline=border, width=BORDER_WIDTH)
+    lines = _wrap(draw, text, font, size[0] - 24)
+    line_height = font.getbbox("Ag")[3] + 4
+    y = (size[1] - line_height * len(lines)) // 2
+    for line in lines:
+        x = (size[0] - draw.textlength(line, font=font)) // 2
+        draw.text((x, y), line, fill=TEXT_COLOR, font=font)
+        y += line_height
+    return image
+
+
+def add_noise(image, rng, strength=0.5):
+    """Apply random blur, scaling, shift and JPEG compression; returns (image, applied settings)."""
+    applied = {}
+    if strength <= 0:
+        return image, applied
+    width, height = image.size
+    if rng.random() < strength:
+        applied['blur'] = round(rng.uniform(0.3, 1.2 * strength + 0.3), 2)
+        image = image.filter(ImageFilter.GaussianBlur(applied['blur']))
+    if rng.random() < strength:
+        applied['scale'] = round(rng.uniform(1 - 0.3 * strength, 1 + 0.2 * strength), 2)
+        scaled = image.resize((max(1, int(width * applied['scale'])), max(1, int(height * applied['scale']))))
+        image = scaled.resize((width, height))
+    if rng.random() < strength:
+        applied['shift'] = (rng.randint(-6, 6), rng.randint(-4, 4))
+        shifted = Image.new('RGB', image.size, image.getpixel((5, 5)))
+        shifted.paste(image, applied['shift'])
+        image = shifted
+    if rng.random() < strength:
+        applied['jpeg'] = rng.randint(max(10, int(60 - 45 * strength)), 85)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=applied['jpeg'])
+        buffer.seek(0)
+        image = Image.open(buffer).convert('RGB')
+    return image, applied
+
+
+def load_automator(home=None):
+    """The perk lists and purple colors are taken from the automator itself.
+
+    Its init() opens the log, journal and history files, so a first import points
+    PERK_AUTOMATOR_HOME at home (a new temporary directory by default), not the repo.
+    """
+    if 'tower_perk_selector.automator' not in sys.modules:
+        os.environ['PERK_AUTOMATOR_HOME'] = str(home or tempfile.mkdtemp(prefix="perk-automator-"))
+    from tower_perk_selector import automator
+    automator.init()
+    return automator
+
+
+def generate_cards(count, window_name="Benchmark", purple_rate=0.3, noise=0.5, seed=None, font=None):
+    """Yield (image, label) pairs; label holds priority, matcher_priority, window, text, perk_id,
+    purple and noise."""
+    automator = load_automator()
+    phrases = perk_phrases(automator, window_name)
+    perk_ids = list(phrases)
+    rng = random.Random(seed)
+    font = font or load_font()
+    for _ in range(count):
+        perk_id = rng.choice(perk_ids)
+        priority, templates = phrases[perk_id]
+        text = phrase_text(rng.choice(templates), rng)
+        purple = rng.random() < purple_rate
+        if purple:
+            card = render_card(text, automator.PURPLE_BG_COLOR, automator.PURPLE_BORDER_COLOR, font=font)
+        else:
+            card = render_card(text, font=font)
+        image, applied = add_noise(card, rng, noise)
+        yield image, {
+            'priority': priority, 'matcher_priority': automator.get_perk_priority(text, window_name),
+            'window': window_name, 'text': text,
+            'perk_id': perk_id, 'purple': purple, 'noise': applied,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate labeled synthetic perk cards")
+    parser.add_argument("out", help="output directory")
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--window", default="Benchmark", help="window name; its profile selects the perk list")
+    parser.add_argument("--purple", type=float, default=0.3, help="fraction of purple cards")
+    parser.add_argument("--noise", type=float, default=0.5, help="noise strength 0..1")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--font", default=None, help="TTF/OTF font file (the game font if available)")
+    parser.add_argument("--font-size", type=int, default=FONT_SIZE)
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    font = load_font(args.font, args.font_size)
+    report_shadowed(load_automator(), args.window)
+    labels = {}
+    for i, (image, label) in enumerate(generate_cards(args.count, args.window, args.purple, args.noise,
+                                                      args.seed, font), start=1):
+        name = f"card_{i:05d}.png"
+        image.save(out / name)
+        labels[name] = label
+    with open(out / "labels.json", "w", encoding="utf-8") as f:
+        json.dump(labels, f, indent=1)
+    print(f"Wrote {len(labels)} cards and labels.json to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Allocation benchmark for the capture path: PIL copies vs. reused NumPy buffers.
+
+Runs the reads of an idle tick (ad probe pixels and two New Perk bar OCR
+inputs, through a planned capture) and of a perk tick (three card crops) over
+a synthetic client-area frame, in two variants:
+
+    pil      - the previous path: each captured rect is copied out as bytes
+               (GetBitmapBits), decoded with Image.frombuffer(... 'BGRX' ...)
+               and cropped with PIL
+    buffers  - frame_buffers: each rect is copied into a reused buffer
+               (standing in for the BitBlt into a pooled DIB section), read
+               through FrameView views and converted to PIL only for OCR
+
+    python frame_benchmark.py [--ticks 200] [--size 1400 830]
+
+Allocations are measured with tracemalloc (peak and net traced bytes per tick)
+in a separate pass from the timings. PIL's own pixel memory is invisible to
+tracemalloc, so the pil variant's figures are a lower bound; the OCR-boundary
+work (grayscale and 2x resize) is the same in both variants.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from tower_perk_selector import capture_planner, color_probes, frame_buffers
+
+# Client-area reads of each tick (COORDS_NO_AD / COORDS_WITH_AD, AD_CHECK_POS_*)
+AD_PROBE = {'ad': {'points': [(5, 500), (400, 500)], 'mode': 'uniform', 'states': ('no_ad', 'ad')}}
+BAR_REGIONS = [((832, 62), (1044, 93)), ((1018, 63), (1228, 92))]
+CARD_REGIONS = [((804, 201), (1175, 288)), ((804, 307), (1175, 396)), ((804, 413), (1175, 502))]
+
+
+def _ocr_input(image):
+    """What the OCR path does first with every crop."""
+    gray = image.convert('L')
+    return gray.resize((gray.width * 2, gray.height * 2), Image.LANCZOS)
+
+
+class PilCapture:
+    """Each rect is copied out as bytes and decoded into its own PIL image."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def grab(self, rects):
+        tiles = []
+        for rect in rects:
+            x1, y1, x2, y2 = rect
+            bits = self.source[y1:y2, x1:x2].tobytes()
+            tiles.append((rect, Image.frombuffer('RGB', (x2 - x1, y2 - y1), bits, 'raw', 'BGRX', 0, 1)))
+        return tiles
+
+
+class BufferCapture:
+    """Each rect is copied into a reused buffer and handed out as a FrameView."""
+
+    def __init__(self, source):
+        self.source = source
+        self.buffers = {}
+
+    def grab(self, rects, purpose='grab'):
+        tiles = []
+        for slot, rect in enumerate(rects):
+            x1, y1, x2, y2 = rect
+            shape = (y2 - y1, x2 - x1, 4)
+            buffer = self.buffers.get((purpose, slot, shape))     # BufferPool keys by size as well
+            if buffer is None:
+                buffer = self.buffers[(purpose, slot, shape)] = np.empty(shape, dtype=np.uint8)
+            np.copyto(buffer, self.source[y1:y2, x1:x2])
+            tiles.append((rect, frame_buffers.FrameView(buffer)))
+        return tiles
+
+
+def idle_tick(capture, size, probes, rects):
+    frame = capture_planner.RegionFrame(size, capture.grab(rects))
+    state = color_probes.evaluate_probes(frame, probes, names=['ad'])['ad']
+    region = BAR_REGIONS[0] if state == 'no_ad' else BAR_REGIONS[1]
+    for _ in range(2):  # wave check and new perk check both read the bar
+        _ocr_input(frame_buffers.to_image(frame.crop(region)))
+
+
+def perk_tick(capture, size, probes, rects):
+    for region in CARD_REGIONS:
+        rect = capture_planner.as_rect(region)
+        _, tile = capture.grab([rect])[0]
+        _ocr_input(frame_buffers.to_image(tile))
+
+
+def measure(tick, capture, size, probes, rects, ticks):
+    """Return (ms per tick, peak KB per tick, net KB per tick)."""
+    for _ in range(5):
+        tick(capture, size, probes, rects)
+    started = time.perf_counter()
+    for _ in range(ticks):
+        tick(capture, size, probes, rects)
+    ms = (time.perf_counter() - started) / ticks * 1000
+
+    peaks = []
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(ticks):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tick(capture, size, probes, rects)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    net = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return ms, sum(peaks) / len(peaks) / 1024, net / ticks / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture-path allocation benchmark (tracemalloc)")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--size", type=int, nargs=2, default=(1400, 830), metavar=("WIDTH", "HEIGHT"))
+    args = parser.parse_args()
+
+    size = tuple(args.size)
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    probes = color_probes.compile_probes(AD_PROBE)
+    rects = capture_planner.plan([point for point in AD_PROBE['ad']['points']] + BAR_REGIONS, bounds=size)
+
+    print(f"{size[0]}x{size[1]} frame, {args.ticks} ticks; planned idle rects: {rects}\n")
+    print(f"{'tick':6} {'variant':8} {'ms/tick':>9} {'peak KB/tick':>13} {'net KB/tick':>12}")
+    for name, tick in (('idle', idle_tick), ('perk', perk_tick)):
+        for variant, capture in (('pil', PilCapture(source)), ('buffers', BufferCapture(source))):
+            ms, peak, net = measure(tick, capture, size, probes, rects, args.ticks)
+            print(f"{name:6} {variant:8} {ms:9.3f} {peak:13.1f} {net:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
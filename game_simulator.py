@@ -0,0 +1,428 @@
+"""
+Simulated emulator windows for end-to-end throughput benchmarks.
+
+Each SimulatedGame keeps the state of one game window: wave counter, pending
+perks, open perk dialog, ad banner and paused/running. Frames are rendered
+with the COORDS_WITH_AD / COORDS_NO_AD layout (play/pause button color at
+PLAY_PAUSE_CHECK_POS, ad probe pixels, perk bar text, perk cards with the
+normal or purple background), and clicks / the play/pause hotkey change the
+state the way the game does.
+
+SimulatedFleet plugs into the automator as both REPLAY_BACKEND (captures)
+and ACTUATOR (clicks and hotkeys), so check_all_windows() ->
+handle_perk_selection runs unchanged on Linux with the system tesseract.
+
+    python game_simulator.py --windows 2 4 8 16 32 --duration 120
+
+For each window count the report shows perks handled per minute, paused
+time per perk (game clock and the automator's paused_per_perk stage) and
+CPU per window (automator process plus its tesseract children, minus the
+simulator's own rendering). Window names go through the automator's
+WINDOW_PROFILES like real titles: a "Daddy" prefix reads three cards with
+PERK_PRIORITY_DADDY; Maximus names are avoided because that profile shifts
+the perk cards.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+import card_generator
+
+WINDOW_SIZE = (1400, 830)
+EMULATOR_BG_COLOR = (12, 12, 16)
+GAME_BG_COLOR = (18, 24, 44)
+AD_COLORS = ((240, 240, 240), (200, 40, 40))
+BAR_COLOR = (40, 52, 90)
+BAR_FONT_SIZE = 20
+BUTTON_HALF_SIZE = 12
+CLICK_RADIUS = 20       # close_x / play_pause hit radius
+
+DEFAULT_WAVE_SECONDS = 2.0
+DEFAULT_PERK_WAVES = 5
+DEFAULT_PURPLE_RATE = 0.2
+
+
+class SimulatedGame:
+    """State and rendering of one simulated game window."""
+
+    def __init__(self, automator, window_name, ad=False, wave=2, wave_seconds=DEFAULT_WAVE_SECONDS,
+                 perk_waves=DEFAULT_PERK_WAVES, purple_rate=DEFAULT_PURPLE_RATE, ad_toggle_seconds=None,
+                 seed=None, font=None, bar_font=None):
+        self.automator = automator
+        self.window_name = window_name
+        self.ad = ad
+        self.wave = wave
+        self.wave_seconds = wave_seconds
+        self.perk_waves = perk_waves
+        self.purple_rate = purple_rate
+        self.ad_toggle_seconds = ad_toggle_seconds
+        self.rng = random.Random(seed)
+        self.font = font or card_generator.load_font()
+        self.bar_font = bar_font or card_generator.load_font(size=BAR_FONT_SIZE)
+        self.phrases = card_generator.perk_phrases(automator, window_name)
+        self.priorities = {perk_id: priority for perk_id, (priority, _) in self.phrases.items()}
+        self.perk_ids = list(self.phrases)
+
+        self.paused = False
+        self.pending_perks = 0
+        self.dialog_open = False
+        self.cards = []            # [(perk_id, text, purple)]
+        self.picks = []            # [(time, priority, purple)]
+        self.paused_seconds = 0.0
+        self.dialog_closes = 0
+        self.missed_clicks = 0
+        self.render_cpu = 0.0
+
+        now = time.time()
+        self._clock = now          # game time is advanced lazily up to here
+        self._wave_progress = 0.0
+        self._next_ad_toggle = now + ad_toggle_seconds if ad_toggle_seconds else None
+        self._frame = None
+        self._lock = threading.Lock()
+
+    @property
+    def coords(self):
+        return self.automator.COORDS_WITH_AD if self.ad else self.automator.COORDS_NO_AD
+
+    def _advance(self, now):
+        """Bring waves, pending perks, paused time and the ad banner up to now."""
+        elapsed = now - self._clock
+        if elapsed <= 0:
+            return
+        self._clock = now
+        if self.paused:
+            self.paused_seconds += elapsed
+        else:
+            self._wave_progress += elapsed / self.wave_seconds
+            while self._wave_progress >= 1:
+                self._wave_progress -= 1
+                self.wave += 1
+                if self.wave % self.perk_waves == 0:
+                    self.pending_perks += 1
+                self._frame = None
+        if self._next_ad_toggle is not None and now >= self._next_ad_toggle:
+            self.ad = not self.ad
+            self._next_ad_toggle = now + self.ad_toggle_seconds
+            self._frame = None
+
+    def _deal_cards(self):
+        self.cards = []
+        for _ in range(3):
+            perk_id = self.rng.choice(self.perk_ids)
+            text = card_generator.phrase_text(self.rng.choice(self.phrases[perk_id][1]), self.rng)
+            self.cards.append((perk_id, text, self.rng.random() < self.purple_rate))
+
+    def bar_text(self):
+        if self.pending_perks:
+            return "New Perk"
+        next_perk = (self.wave // self.perk_waves + 1) * self.perk_waves
+        return f"{self.wave}/{next_perk}"
+
+    def render(self):
+        """Return the full window frame (cached until the state changes)."""
+        with self._lock:
+            self._advance(time.time())
+            if self._frame is not None:
+                return self._frame
+            started = time.thread_time()
+            frame = self._render()
+            self.render_cpu += time.thread_time() - started
+            self._frame = frame
+            return frame
+
+    def _render(self):
+        automator = self.automator
+        coords = self.coords
+        image = Image.new('RGB', WINDOW_SIZE, EMULATOR_BG_COLOR)
+        draw = ImageDraw.Draw(image)
+        if self.ad:
+            # Two different colors under the ad probe points (AD_CHECK_POS_1 / AD_CHECK_POS_2)
+            split = (automator.AD_CHECK_POS_1[0] + automator.AD_CHECK_POS_2[0]) // 2
+            draw.rectangle((0, 0, split, WINDOW_SIZE[1]), fill=AD_COLORS[0])
+            draw.rectangle((split, 0, coords['perk1_text_region'][0][0] - 100, WINDOW_SIZE[1]), fill=AD_COLORS[1])
+        viewport_left = coords['perk1_text_region'][0][0] - 90
+        draw.rectangle((viewport_left, 0, coords['perk1_text_region'][1][0] + 10, WINDOW_SIZE[1]), fill=GAME_BG_COLOR)
+
+        x, y = automator.PLAY_PAUSE_CHECK_POS
+        button = automator.PLAY_BUTTON_COLOR if self.paused else automator.PAUSE_BUTTON_COLOR
+        draw.rectangle((x - BUTTON_HALF_SIZE, y - BUTTON_HALF_SIZE, x + BUTTON_HALF_SIZE, y + BUTTON_HALF_SIZE), fill=button)
+
+        (x1, y1), (x2, y2) = coords['new_perk_region']
+        draw.rectangle((x1, y1, x2, y2), fill=BAR_COLOR)
+        text = self.bar_text()
+        text_x = x1 + (x2 - x1 - draw.textlength(text, font=self.bar_font)) // 2
+        draw.text((text_x, y1 + 4), text, fill=card_generator.TEXT_COLOR, font=self.bar_font)
+
+        if self.dialog_open:
+            for index, (_, card_text, purple) in enumerate(self.cards, start=1):
+                (x1, y1), (x2, y2) = coords[f'perk{index}_text_region']
+                if purple:
+                    card = card_generator.render_card(card_text, automator.PURPLE_BG_COLOR, automator.PURPLE_BORDER_COLOR,
+                                                      size=(x2 - x1, y2 - y1), font=self.font)
+                else:
+                    card = card_generator.render_card(card_text, size=(x2 - x1, y2 - y1), font=self.font)
+                image.paste(card, (x1, y1))
+        return image
+
+    def grab(self, region=None):
+        frame = self.render()
+        if region is None:
+            return frame.copy()
+        (x1, y1), (x2, y2) = region
+        return frame.crop((x1, y1, x2, y2))
+
+    def click(self, point):
+        """React to a window-relative click like the game does."""
+        with self._lock:
+            self._advance(time.time())
+            coords = self.coords
+            px, py = point
+            if self.dialog_open:
+                for index in range(1, len(self.cards) + 1):
+                    (x1, y1), (x2, y2) = coords[f'perk{index}_text_region']
+                    if x1 <= px < x2 and y1 <= py < y2:
+                        self._pick(index - 1)
+                        return
+                if _near(point, coords['close_x']):
+                    self.dialog_open = False
+                    self.dialog_closes += 1
+                    self._frame = None
+                    return
+            else:
+                (x1, y1), (x2, y2) = coords['new_perk_region']
+                if x1 <= px < x2 and y1 <= py < y2:
+                    if self.pending_perks:
+                        self.dialog_open = True
+                        self._deal_cards()
+                        self._frame = None
+                    return
+            if _near(point, coords['play_pause']):
+                self._toggle_pause()
+                return
+            self.missed_clicks += 1
+
+    def _pick(self, index):
+        perk_id, _, purple = self.cards[index]
+        self.picks.append((time.time(), self.priorities.get(perk_id, 9999), purple))
+        self.pending_perks -= 1
+        if self.pending_perks:
+            self._deal_cards()
+        else:
+            self.cards = []
+        self._frame = None
+
+    def _toggle_pause(self):
+        self.paused = not self.paused
+        self._frame = None
+
+    def hotkey(self, keys):
+        if tuple(k.lower() for k in keys) != tuple(self.automator.PLAY_PAUSE_HOTKEY):
+            return
+        with self._lock:
+            self._advance(time.time())
+            self._toggle_pause()
+
+    def stats(self):
+        with self._lock:
+            self._advance(time.time())
+            return {
+                'perks': len(self.picks),
+                'purple_picks': sum(1 for _, _, purple in self.picks if purple),
+                'paused_seconds': self.paused_seconds,
+                'wave': self.wave,
+                'pending_perks': self.pending_perks,
+                'dialog_closes': self.dialog_closes,
+                'missed_clicks': self.missed_clicks,
+                'render_cpu': self.render_cpu,
+            }
+
+
+def _near(point, target, radius=CLICK_RADIUS):
+    return abs(point[0] - target[0]) <= radius and abs(point[1] - target[1]) <= radius
+
+
+class SimulatedFleet:
+    """Capture backend and actuator for a set of SimulatedGame windows."""
+
+    background = True
+
+    def __init__(self, games):
+        self.games = {game.window_name: game for game in games}
+
+    def handles(self, window_name):
+        return window_name in self.games
+
+    def grab(self, window_name, region=None):
+        game = self.games.get(window_name)
+        return game.grab(region) if game is not None else None
+
+    def click(self, window_name, coords, description=""):
+        game = self.games.get(window_name)
+        if game is None:
+            return False
+        game.click(coords)
+        return True
+
+    def hotkey(self, window_name, keys):
+        game = self.games.get(window_name)
+        if game is None:
+            return False
+        game.hotkey(keys)
+        return True
+
+
+def load_automator(log_dir):
+    """Import the automator with every log, journal and history file pointed into log_dir."""
+    from tower_perk_selector import decision_journal, history_store
+    log_dir = Path(log_dir).resolve()
+    automator = card_generator.load_automator(log_dir)
+    automator.SAVE_DEBUG_IMAGES = False
+    automator.DEBUG_ARTIFACTS.enabled = False
+    automator.PROFILE_OCR_VARIANTS = False
+    automator.TIMING_SUMMARY_INTERVAL = 0
+    if automator.DATA_DIR != log_dir:
+        # Imported earlier in this process: redirect the files it already opened
+        automator.LOG_FILE = log_dir / "perk_selection_log.txt"
+        automator.PERKS_ONLY_LOG = log_dir / "perks_seen.txt"
+        automator.DECISION_JOURNAL = decision_journal.DecisionJournal(log_dir / "journal")
+        automator.HISTORY_STORE = history_store.HistoryStore(log_dir / "perk_history.sqlite3",
+                                                             writer=automator.LOG_WRITER)
+    return automator
+
+
+def _cpu_seconds():
+    """CPU time of this process and its reaped children (the tesseract runs)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def run_simulation(automator, window_count, duration, prefix="Sim Bluestack", check_interval=None,
+                   ad_fraction=0.5, seed=0, drain_timeout=120, quiet=True, **game_options):
+    """Drive check_all_windows() against window_count simulated windows for duration seconds."""
+    font = card_generator.load_font()
+    bar_font = card_generator.load_font(size=BAR_FONT_SIZE)
+    games = [SimulatedGame(automator, f"{prefix} {i:02d}", ad=i < round(window_count * ad_fraction),
+                           seed=seed + i, font=font, bar_font=bar_font, **game_options)
+             for i in range(window_count)]
+    fleet = SimulatedFleet(games)
+    automator.REPLAY_BACKEND = fleet
+    automator.ACTUATOR = fleet
+    automator.FOREGROUND_ACTUATOR = fleet
+    automator.WINDOWS = [game.window_name for game in games]
+    automator.TIMINGS.reset()
+    interval = automator.CHECK_INTERVAL if check_interval is None else check_interval
+
+    output = io.StringIO() if quiet else sys.stdout
+    cpu_before = _cpu_seconds()
+    started = time.time()
+    with contextlib.redirect_stdout(output):
+        while time.time() - started < duration:
+            automator.check_all_windows()
+            if quiet:
+                output.seek(0)
+                output.truncate()
+            time.sleep(interval)
+        # Let perk selections already under way finish
+        deadline = time.time() + drain_timeout
+        for thread in list(automator.perk_selection_threads.values()):
+            thread.join(max(0, deadline - time.time()))
+    elapsed = time.time() - started
+    cpu = _cpu_seconds() - cpu_before
+
+    stats = [game.stats() for game in games]
+    perks = sum(s['perks'] for s in stats)
+    paused = sum(s['paused_seconds'] for s in stats)
+    render_cpu = sum(s['render_cpu'] for s in stats)
+    automator_cpu = max(0.0, cpu - render_cpu)
+    paused_hist = None
+    for (_, stage), histogram in automator.TIMINGS.snapshot().items():
+        if stage == 'paused_per_perk':
+            if paused_hist is None:
+                paused_hist = histogram
+            else:
+                paused_hist.merge(histogram)
+    return {
+        'windows': window_count,
+        'seconds': elapsed,
+        'perks': perks,
+        'perks_per_minute': perks / elapsed * 60 if elapsed else 0.0,
+        'paused_per_perk': paused / perks if perks else None,
+        'automator_paused_per_perk_p50': paused_hist.percentile(50) / 1e6 if paused_hist else None,
+        'automator_paused_per_perk_p90': paused_hist.percentile(90) / 1e6 if paused_hist else None,
+        'cpu_per_window': automator_cpu / window_count,
+        'cpu_percent_per_window': automator_cpu / elapsed / window_count * 100 if elapsed else 0.0,
+        'render_cpu': render_cpu,
+        'pending_perks': sum(s['pending_perks'] for s in stats),
+        'purple_picks': sum(s['purple_picks'] for s in stats),
+        'missed_clicks': sum(s['missed_clicks'] for s in stats),
+        'unfinished_selections': sum(1 for w in automator.WINDOWS if automator.is_perk_selection_running(w)),
+    }
+
+
+def print_results(results):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else f"{'-':>{spec.split('.')[0]}}"
+
+    print(f"{'windows':>7} {'perks':>6} {'perks/min':>10} {'paused/perk':>12} {'p50':>7} {'p90':>7} "
+          f"{'cpu s/win':>10} {'cpu %/win':>10} {'backlog':>8} {'missed':>7}")
+    for r in results:
+        print(f"{r['windows']:7} {r['perks']:6} {r['perks_per_minute']:10.1f} {fmt(r['paused_per_perk'], '12.1f')} "
+              f"{fmt(r['automator_paused_per_perk_p50'], '7.1f')} {fmt(r['automator_paused_per_perk_p90'], '7.1f')} "
+              f"{r['cpu_per_window']:10.2f} {r['cpu_percent_per_window']:10.1f} {r['pending_perks']:8} "
+              f"{r['missed_clicks']:7}")
+    print("\npaused/perk: game clock; p50/p90: automator paused_per_perk stage (seconds)")
+    print("backlog: perks still pending at the end; missed: clicks that hit nothing")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against simulated game windows")
+    parser.add_argument("--windows", type=int, nargs="+", default=[2, 4, 8, 16, 32], help="window counts to run")
+    parser.add_argument("--duration", type=float, default=120, help="seconds of main-loop checks per run")
+    parser.add_argument("--prefix", default="Sim Bluestack", help="window name prefix (use 'Daddy ...' for 3 cards)")
+    parser.add_argument("--check-interval", type=float, default=None, help="seconds between passes (default CHECK_INTERVAL)")
+    parser.add_argument("--delay-scale", type=float, default=1.0,
+                        help="multiply CLICK_DELAY / WINDOW_OPEN_WAIT / WINDOW_CLOSE_WAIT")
+    parser.add_argument("--wave-seconds", type=float, default=DEFAULT_WAVE_SECONDS)
+    parser.add_argument("--perk-waves", type=int, default=DEFAULT_PERK_WAVES, help="a perk every N waves")
+    parser.add_argument("--purple", type=float, default=DEFAULT_PURPLE_RATE, help="fraction of purple cards")
+    parser.add_argument("--ad", type=float, default=0.5, help="fraction of windows showing the ad banner")
+    parser.add_argument("--ad-toggle", type=float, default=None, help="toggle the ad banner every N seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the automator's own output")
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="perk-sim-")
+    try:
+        automator = load_automator(log_dir)
+        automator.CLICK_DELAY *= args.delay_scale
+        automator.WINDOW_OPEN_WAIT *= args.delay_scale
+        automator.WINDOW_CLOSE_WAIT *= args.delay_scale
+        # Cards are scored by the entry they were built from, so these show up as wrong picks
+        card_generator.report_shadowed(automator, f"{args.prefix} 00")
+        results = []
+        for count in args.windows:
+            print(f"Running {count} windows for {args.duration:.0f}s...")
+            results.append(run_simulation(
+                automator, count, args.duration, prefix=args.prefix, check_interval=args.check_interval,
+                ad_fraction=args.ad, seed=args.seed, quiet=not args.verbose, wave_seconds=args.wave_seconds,
+                perk_waves=args.perk_waves, purple_rate=args.purple, ad_toggle_seconds=args.ad_toggle))
+        print()
+        print_results(results)
+        automator.LOG_WRITER.close()
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Microbenchmark and equivalence gate for the perk text matcher.
+
+Covers get_perk_priority, fuzzy_match_perk and correct_perk_text over a
+corpus of clean card phrases (card_generator.keyword_phrases of both perk
+lists with every multiplier and percentage),
+OCR-style noisy variants of them, and real OCR strings from perks_seen.txt
+(or --corpus files, one string per line).
+
+    python matcher_benchmark.py record            # golden results of the current matcher
+                                                  # (matcher_golden.json is committed: the original matcher)
+    python matcher_benchmark.py check             # compare against the golden file
+    python matcher_benchmark.py check --candidate fast_matcher
+    python matcher_benchmark.py bench [--rounds 5]
+
+record stores the corpus and, for both PERK_PRIORITY and PERK_PRIORITY_DADDY,
+every function's result per string. check replays the stored corpus through
+the automator's functions, or through the functions of the --candidate
+module that replace them, and exits with status 1 on any difference: a
+matcher rewrite has to pass it before it replaces the current one.
+"""
+
+import argparse
+import importlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import card_generator
+from tower_perk_selector.timing import LatencyHistogram
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+DEFAULT_GOLDEN = SCRIPT_DIR / "matcher_golden.json"
+PERKS_SEEN = SCRIPT_DIR / "perks_seen.txt"
+
+# Window names selecting each priority list (see get_perk_priority)
+LIST_WINDOWS = {
+    'PERK_PRIORITY': "Benchmark",
+    'PERK_PRIORITY_DADDY': "Daddy Benchmark",
+}
+FUNCTIONS = ('get_perk_priority', 'fuzzy_match_perk', 'correct_perk_text')
+
+# Typical Tesseract confusions on the game font
+OCR_CONFUSIONS = {
+    'l': ['1', 'I', '|'], 'I': ['l', '1'], 'i': ['l', '1'], 'O': ['0', 'Q'], 'o': ['0', 'c'],
+    'S': ['5', '$'], 's': ['5'], 'B': ['8'], 'e': ['c', 'o'], 'a': ['o', 'e'], 'n': ['m', 'h'],
+    'm': ['rn', 'nn'], 'h': ['b'], 'g': ['q', '9'], '.': [',', ''], 'x': ['X', '*'], '%': ['96', '9%'],
+}
+NOISE_VARIANTS = 6
+EXTRA_STRINGS = ["", "New Perk", "new perk", "12/20", "1/5", "|||", "x1.80", "1.8", "Coins x1.80 but Tower Max",
+                 "perk", "Unlock", "asdf qwer", "x", "+5.00%"]
+
+
+def _ocr_noise(text, rng):
+    """Apply 1-3 OCR-like edits: confusions, dropped/doubled characters, lost spaces, case."""
+    chars = list(text)
+    for _ in range(rng.randint(1, 3)):
+        if not chars:
+            break
+        i = rng.randrange(len(chars))
+        kind = rng.random()
+        if kind < 0.5 and chars[i] in OCR_CONFUSIONS:
+            chars[i] = rng.choice(OCR_CONFUSIONS[chars[i]])
+        elif kind < 0.65:
+            del chars[i]
+        elif kind < 0.75:
+            chars.insert(i, chars[i])
+        elif kind < 0.85 and ' ' in chars:
+            chars.remove(' ')
+        else:
+            chars[i] = chars[i].swapcase()
+    result = ''.join(chars)
+    if rng.random() < 0.2:
+        result = rng.choice(['| ', '— ', '']) + result + rng.choice([' |', ' .', ''])
+    return result
+
+
+def real_strings(paths=()):
+    """OCR strings from perks_seen.txt ('... | marker | text') and plain corpus files."""
+    strings = []
+    if PERKS_SEEN.exists():
+        for line in PERKS_SEEN.read_text(encoding='utf-8', errors='replace').splitlines():
+            parts = line.split(' | ', 2)
+            if len(parts) == 3:
+                strings.append(parts[2])
+    for path in paths:
+        strings.extend(line for line in Path(path).read_text(encoding='utf-8').splitlines())
+    return strings
+
+
+def build_corpus(seed=0, variants=NOISE_VARIANTS, paths=()):
+    """Return the deduplicated list of clean, noisy and real strings (deterministic for a seed)."""
+    automator = load_automator()
+    rng = random.Random(seed)
+    clean = []
+    for list_name in LIST_WINDOWS:
+        for templates in card_generator.keyword_phrases(getattr(automator, list_name)).values():
+            for template in templates:
+                clean.extend(card_generator.expand(template))
+    clean = list(dict.fromkeys(clean))
+    corpus = list(clean)
+    for text in clean:
+        corpus.extend(_ocr_noise(text, rng) for _ in range(variants))
+    corpus.extend(EXTRA_STRINGS)
+    corpus.extend(real_strings(paths))
+    return list(dict.fromkeys(corpus))
+
+
+def load_automator():
+    return card_generator.load_automator()
+
+
+def load_functions(candidate=None):
+    """The automator's matcher functions, with those defined by the candidate module replacing them."""
+    automator = load_automator()
+    functions = {name: getattr(automator, name) for name in FUNCTIONS}
+    if candidate:
+        module = importlib.import_module(candidate)
+        replaced = [name for name in FUNCTIONS if hasattr(module, name)]
+        if not replaced:
+            raise SystemExit(f"{candidate} defines none of {', '.join(FUNCTIONS)}")
+        functions.update({name: getattr(module, name) for name in replaced})
+    return functions
+
+
+def evaluate(functions, corpus):
+    """Return {list_name: {function: [result per string]}}."""
+    results = {}
+    for list_name, window_name in LIST_WINDOWS.items():
+        results[list_name] = {
+            'get_perk_priority': [functions['get_perk_priority'](text, window_name) for text in corpus],
+            'fuzzy_match_perk': [functions['fuzzy_match_perk'](text.strip().lower(), window_name) for text in corpus],
+            'correct_perk_text': [functions['correct_perk_text'](text, window_name) for text in corpus],
+        }
+    return results
+
+
+def compare(golden, results, corpus):
+    """Return [(list_name, function, text, expected, got)] for every difference."""
+    differences = []
+    for list_name, per_function in golden.items():
+        for name, expected_values in per_function.items():
+            for text, expected, got in zip(corpus, expected_values, results[list_name][name]):
+                if expected != got:
+                    differences.append((list_name, name, text, expected, got))
+    return differences
+
+
+def bench(functions, corpus, rounds=3):
+    """Return [(function, list_name, calls, calls_per_sec, p50_us, p99_us, max_us)]."""
+    rows = []
+    for name in FUNCTIONS:
+        fn = functions[name]
+        for list_name, window_name in LIST_WINDOWS.items():
+            histogram = LatencyHistogram()   # nanoseconds: most calls take a few microseconds
+            total = 0
+            for _ in range(rounds):
+                for text in corpus:
+                    arg = text.strip().lower() if name == 'fuzzy_match_perk' else text
+                    started = time.perf_counter_ns()
+                    fn(arg, window_name)
+                    elapsed = time.perf_counter_ns() - started
+                    total += elapsed
+                    histogram.record(elapsed)
+            rows.append((name, list_name, histogram.count, histogram.count / total * 1e9 if total else 0.0,
+                         histogram.percentile(50) / 1000, histogram.percentile(99) / 1000, histogram.max / 1000))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perk matcher microbenchmark and equivalence check")
+    parser.add_argument("command", choices=("record", "check", "bench"))
+    parser.add_argument("--golden", default=str(DEFAULT_GOLDEN))
+    parser.add_argument("--candidate", default=None, help="module whose matcher functions replace the automator's")
+    parser.add_argument("--corpus", nargs="*", default=[], help="extra text files with one OCR string per line")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the corpus for bench")
+    args = parser.parse_args()
+
+    functions = load_functions(args.candidate)
+    golden_path = Path(args.golden)
+
+    if args.command == "record":
+        corpus = build_corpus(args.seed, paths=args.corpus)
+        with open(golden_path, "w", encoding="utf-8") as f:
+            json.dump({'corpus': corpus, 'results': evaluate(functions, corpus)}, f, indent=1)
+        print(f"Recorded {len(corpus)} strings x {len(LIST_WINDOWS)} lists to {golden_path}")
+        return
+
+    if args.command == "check":
+        if not golden_path.exists():
+            raise SystemExit(f"No golden file at {golden_path}; run 'record' with the current matcher first")
+        with open(golden_path, "r", encoding="utf-8") as f:
+            golden = json.load(f)
+        corpus = golden['corpus']
+        differences = compare(golden['results'], evaluate(functions, corpus), corpus)
+        if differences:
+            for list_name, name, text, expected, got in differences[:50]:
+                print(f"  {list_name:20} {name:18} {text!r:45} expected {expected!r} got {got!r}")
+            if len(differences) > 50:
+                print(f"  ... {len(differences) - 50} more")
+            print(f"FAIL: {len(differences)} differences over {len(corpus)} strings")
+            sys.exit(1)
+        print(f"OK: {len(corpus)} strings identical for {', '.join(LIST_WINDOWS)}")
+        return
+
+    corpus = build_corpus(args.seed, paths=args.corpus)
+    print(f"{len(corpus)} strings, {args.rounds} rounds\n")
+    print(f"{'function':18} {'list':20} {'calls':>8} {'calls/s':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    for name, list_name, calls, rate, p50, p99, worst in bench(functions, corpus, args.rounds):
+        print(f"{name:18} {list_name:20} {calls:8} {rate:10.0f} {p50:9.1f} {p99:9.1f} {worst:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Offline OCR benchmark over a labeled directory of perk-card crops.
+
+Each card goes through the same path as a live read:
+get_text_from_region(is_perk=True) -> correct_perk_text -> get_perk_priority,
+with captures served from the crop instead of an emulator window.
+
+The corpus directory holds the images and a labels.json:
+
+    {"card_0001.png": {"priority": 3, "window": "Daddy Bluestack", "text": "..."},
+     "card_0002.png": 12}
+
+A bare number is the expected priority. "window" selects the perk list
+(PERK_PRIORITY_DADDY for Daddy windows, PERK_PRIORITY otherwise); expected
+priorities refer to that list. Cards whose label has a matcher_priority other
+than the expected one (card_generator.py) are misread by the matcher even as
+clean text; they are marked MAT and counted separately. Runs headless with the
+system tesseract.
+
+    python ocr_benchmark.py corpus/ [--out results.json] [--compare previous.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+import card_generator
+
+DEFAULT_WINDOW = "Benchmark"
+RESULTS_DIR = Path(__file__).parent.resolve() / "benchmarks"
+
+
+def load_corpus(directory):
+    """Return [(path, expected_priority, window_name, label)] from labels.json."""
+    directory = Path(directory)
+    with open(directory / "labels.json", "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    cards = []
+    for name, label in sorted(labels.items()):
+        if not isinstance(label, dict):
+            label = {'priority': label}
+        cards.append((directory / name, int(label['priority']), label.get('window', DEFAULT_WINDOW), label))
+    return cards
+
+
+class CorpusCaptureBackend:
+    """Serves the current card as the whole 'window' so region crops and color probes see the card."""
+
+    def __init__(self):
+        self.image = None
+
+    def handles(self, window_name):
+        return True
+
+    def grab(self, window_name, region=None):
+        if self.image is None:
+            return None
+        if region is None:
+            return self.image.copy()
+        (x1, y1), (x2, y2) = region
+        return self.image.crop((x1, y1, x2, y2))
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def load_automator():
+    """Import the automator with side effects (debug images, profiling) switched off."""
+    automator = card_generator.load_automator()
+    automator.SAVE_DEBUG_IMAGES = False
+    automator.DEBUG_ARTIFACTS.enabled = False
+    automator.PROFILE_OCR_VARIANTS = False
+    return automator
+
+
+def run_benchmark(corpus_dir, quiet=True):
+    automator = load_automator()
+    backend = CorpusCaptureBackend()
+    automator.REPLAY_BACKEND = backend
+    cards = load_corpus(corpus_dir)
+
+    per_card = []
+    for path, expected, window_name, label in cards:
+        with Image.open(path) as img:
+            backend.image = img.convert('RGB')
+        region = ((0, 0), backend.image.size)
+        calls_before = automator.METRICS.value('perk_ocr_calls_total', window=window_name, kind='perk')
+        output = io.StringIO() if quiet else sys.stdout
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            text = automator.get_text_from_region(window_name, region, save_debug_image=False, is_perk=True)
+            priority = automator.get_perk_priority(text, window_name)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        calls = automator.METRICS.value('perk_ocr_calls_total', window=window_name, kind='perk') - calls_before
+        per_card.append({
+            'file': path.name, 'window': window_name, 'expected': expected, 'priority': priority,
+            'correct': priority == expected, 'matcher_error': label.get('matcher_priority', expected) != expected,
+            'text': text, 'ms': round(elapsed_ms, 1), 'tesseract_calls': calls,
+        })
+        mark = "ok " if priority == expected else "MAT" if per_card[-1]['matcher_error'] else "BAD"
+        print(f"  {mark} {path.name:30} expected {expected:5} got {priority:5} {elapsed_ms:8.1f} ms  '{text[:50]}'")
+
+    latencies = [c['ms'] for c in per_card]
+    correct = sum(c['correct'] for c in per_card)
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'corpus': str(Path(corpus_dir).resolve()),
+        'cards': len(per_card),
+        'correct': correct,
+        'accuracy': correct / len(per_card) if per_card else None,
+        'matcher_errors': sum(c['matcher_error'] for c in per_card),
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else None,
+        },
+        'tesseract_calls_per_card': sum(c['tesseract_calls'] for c in per_card) / len(per_card) if per_card else None,
+        'per_card': per_card,
+    }
+
+
+def print_summary(result, previous=None):
+    def delta(key, sub=None, scale=1.0, fmt="{:+.1f}"):
+        if previous is None:
+            return ""
+        old = previous.get(key) if sub is None else previous.get(key, {}).get(sub)
+        new = result.get(key) if sub is None else result[key].get(sub)
+        if old is None or new is None:
+            return ""
+        return "  (" + fmt.format((new - old) * scale) + ")"
+
+    print(f"\nCards: {result['cards']}  revision: {result['revision']}")
+    if result['accuracy'] is not None:
+        print(f"Accuracy: {result['correct']}/{result['cards']} = {result['accuracy'] * 100:.1f}%"
+              + delta('accuracy', scale=100, fmt="{:+.1f} pts"))
+        if result['matcher_errors']:
+            print(f"Cards the matcher misreads as clean text: {result['matcher_errors']}")
+    for key in ('mean', 'p50', 'p90', 'p99', 'max'):
+        value = result['latency_ms'][key]
+        if value is not None:
+            print(f"Latency {key:4}: {value:8.1f} ms" + delta('latency_ms', key, fmt="{:+.1f} ms"))
+    if result['tesseract_calls_per_card'] is not None:
+        print(f"Tesseract calls per card: {result['tesseract_calls_per_card']:.1f}"
+              + delta('tesseract_calls_per_card', fmt="{:+.1f}"))
+    if previous is not None:
+        old = {c['file']: c['correct'] for c in previous.get('per_card', [])}
+        changed = [c for c in result['per_card'] if c['file'] in old and old[c['file']] != c['correct']]
+        for card in changed:
+            print(f"  {'fixed' if card['correct'] else 'REGRESSED'}: {card['file']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark perk OCR against a labeled corpus")
+    parser.add_argument("corpus", help="directory with card images and labels.json")
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/ocr-<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the automator's own OCR output")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.corpus, quiet=not args.verbose)
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    print_summary(result, previous)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"ocr-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Tower Perk Selector: automates perk selection in Tower Idle Defense across emulator windows.
+
+Run the automator with the perk-automator command or python -m tower_perk_selector.
+"""
+
+import os
+from pathlib import Path
+
+
+def data_dir():
+    """Directory for logs, history, journal, debug images and probes.json: PERK_AUTOMATOR_HOME,
+    or the current directory (never the installed package)."""
+    return Path(os.environ.get('PERK_AUTOMATOR_HOME') or os.getcwd()).resolve()
@@ -0,0 +1,3 @@
+from .automator import main
+
+main()
@@ -0,0 +1,222 @@
+"""
+Actuator backends for the perk automator.
+
+An actuator delivers clicks and the play/pause hotkey to a target window.
+
+    MessageActuator    - posts mouse/keyboard messages straight to the window, so
+                         nothing is moved to the foreground and several windows
+                         can be driven at the same time
+    ForegroundActuator - the original path: focus the window, then use pyautogui
+    FallbackActuator   - tries a primary actuator and falls back to another
+    RecordingActuator  - records actions in memory, for tests and dry runs
+
+Every actuator exposes click(window_name, coords, description) and
+hotkey(window_name, keys), both returning True when the action was delivered,
+plus a 'background' flag telling the caller whether clicks need focus.
+runs_in_background() answers the same per action (a MessageActuator clicks in
+the background but cannot post modifier chords), and may_take_focus() whether
+any action can end up on the focus-taking path, e.g. through a fallback.
+"""
+
+import threading
+import time
+
+from . import window_registry
+
+try:
+    import win32api
+    import win32con
+    import win32gui
+    WIN32_SUPPORT = True
+except ImportError:
+    WIN32_SUPPORT = False
+
+# Virtual-key codes for the hotkeys the automator sends
+VK_CODES = {
+    'ctrl': 0x11,
+    'shift': 0x10,
+    'alt': 0x12,
+}
+
+# Posted WM_KEYDOWN messages do not change the keyboard state, so a chord with these
+# would arrive as the bare key; MessageActuator leaves such hotkeys to the next actuator.
+MODIFIER_KEYS = ('ctrl', 'shift', 'alt')
+
+# Held across focus -> verify -> pyautogui, so per-window threads cannot steal focus in between
+FOREGROUND_LOCK = threading.RLock()
+
+CWP_SKIPINVISIBLE = 0x0001
+CWP_SKIPDISABLED = 0x0002
+MESSAGE_KEY_DELAY = 0.02  # seconds between posted key messages
+
+
+def runs_in_background(actuator, action, keys=()):
+    """True if the actuator delivers this action ('click' or 'hotkey') itself, without focus."""
+    check = getattr(actuator, 'runs_in_background', None)
+    return check(action, keys) if check is not None else actuator.background
+
+
+def may_take_focus(actuator):
+    """True if some action of this actuator may focus the window (directly or via a fallback)."""
+    return getattr(actuator, 'may_take_focus', not actuator.background)
+
+
+def _vk_code(key):
+    """Return the virtual-key code for a key name like 'ctrl' or 'u'."""
+    key = key.lower()
+    if key in VK_CODES:
+        return VK_CODES[key]
+    if len(key) == 1:
+        return ord(key.upper())
+    raise ValueError(f"Unsupported key for message actuator: {key}")
+
+
+class RecordingActuator:
+    """Records every action instead of performing it."""
+
+    background = True
+
+    def __init__(self):
+        self.actions = []
+        self._lock = threading.Lock()
+
+    def click(self, window_name, coords, description=""):
+        with self._lock:
+            self.actions.append(('click', window_name, tuple(coords), description))
+        return True
+
+    def hotkey(self, window_name, keys):
+        with self._lock:
+            self.actions.append(('hotkey', window_name, tuple(keys), ""))
+        return True
+
+    def clicks_for(self, window_name):
+        return [a for a in self.actions if a[0] == 'click' and a[1] == window_name]
+
+
+class ForegroundActuator:
+    """Focus-then-pyautogui actuation, provided by the automator's own functions.
+
+    Each action runs under FOREGROUND_LOCK, so only one window at a time can be
+    focused and sent input.
+    """
+
+    background = False
+    may_take_focus = True
+
+    def __init__(self, click_fn, hotkey_fn):
+        self._click_fn = click_fn
+        self._hotkey_fn = hotkey_fn
+
+    def click(self, window_name, coords, description=""):
+        with FOREGROUND_LOCK:
+            return self._click_fn(window_name, coords, description)
+
+    def hotkey(self, window_name, keys):
+        with FOREGROUND_LOCK:
+            return self._hotkey_fn(window_name, keys)
+
+
+class MessageActuator:
+    """Delivers clicks and hotkeys with PostMessage, without touching focus."""
+
+    background = True
+    may_take_focus = False
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    @staticmethod
+    def runs_in_background(action, keys=()):
+        return action == 'click' or not any(k.lower() in MODIFIER_KEYS for k in keys)
+
+    def _target(self, window_name, coords):
+        """Return (hwnd, client_x, client_y) of the deepest child under a client-area point."""
+        window = self.registry.get_window(window_name)
+        if window is None:
+            return None
+        client_left, client_top, _, _ = window_registry.client_geometry(window)
+        screen_point = (client_left + coords[0], client_top + coords[1])
+        hwnd = window.hwnd
+        # Walk down to the deepest child under the point (BlueStacks renders into a child window)
+        while True:
+            child = win32gui.ChildWindowFromPointEx(
+                hwnd, win32gui.ScreenToClient(hwnd, screen_point), CWP_SKIPINVISIBLE | CWP_SKIPDISABLED
+            )
+            if not child or child == hwnd:
+                break
+            hwnd = child
+        client_x, client_y = win32gui.ScreenToClient(hwnd, screen_point)
+        return hwnd, client_x, client_y
+
+    def click(self, window_name, coords, description=""):
+        if not WIN32_SUPPORT:
+            return False
+        try:
+            target = self._target(window_name, coords)
+            if target is None:
+                return False
+            hwnd, x, y = target
+            lparam = win32api.MAKELONG(x, y)
+            # PostMessage raises on failure, so reaching the end means all three were queued
+            win32gui.PostMessage(hwnd, win32con.WM_MOUSEMOVE, 0, lparam)
+            win32gui.PostMessage(hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, lparam)
+            win32gui.PostMessage(hwnd, win32con.WM_LBUTTONUP, 0, lparam)
+            return True
+        except Exception as e:
+            print(f"  [{window_name}] Message click failed: {e}")
+            return False
+
+    def hotkey(self, window_name, keys):
+        if not WIN32_SUPPORT or any(k.lower() in MODIFIER_KEYS for k in keys):
+            return False
+        try:
+            hwnd = self.registry.resolve(window_name)
+            if hwnd is None:
+                return False
+            codes = [_vk_code(k) for k in keys]
+            for code in codes:
+                win32gui.PostMessage(hwnd, win32con.WM_KEYDOWN, code, 0)
+                time.sleep(MESSAGE_KEY_DELAY)
+            for code in reversed(codes):
+                # Bits 30/31 set: previous state down, transition to up
+                win32gui.PostMessage(hwnd, win32con.WM_KEYUP, code, 0xC0000001)
+                time.sleep(MESSAGE_KEY_DELAY)
+            return True
+        except Exception as e:
+            print(f"  [{window_name}] Message hotkey failed: {e}")
+            return False
+
+
+class FallbackActuator:
+    """Uses the primary actuator and falls back when it cannot deliver the action."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    @property
+    def background(self):
+        return self.primary.background
+
+    @property
+    def may_take_focus(self):
+        return may_take_focus(self.primary) or may_take_focus(self.fallback)
+
+    def runs_in_background(self, action, keys=()):
+        if runs_in_background(self.primary, action, keys):
+            return True
+        # A background primary hands what it cannot deliver to the fallback
+        return not may_take_focus(self.primary) and runs_in_background(self.fallback, action, keys)
+
+    def click(self, window_name, coords, description=""):
+        if self.primary.click(window_name, coords, description):
+            return True
+        print(f"  [{window_name}] {type(self.primary).__name__} could not click - using {type(self.fallback).__name__}")
+        return self.fallback.click(window_name, coords, description)
+
+    def hotkey(self, window_name, keys):
+        if self.primary.hotkey(window_name, keys):
+            return True
+        print(f"  [{window_name}] {type(self.primary).__name__} could not send hotkey - using {type(self.fallback).__name__}")
+        return self.fallback.hotkey(window_name, keys)
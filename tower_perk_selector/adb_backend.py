@@ -0,0 +1,352 @@
+"""
+ADB capture and input backend for BlueStacks instances.
+
+Talks to the local adb server (127.0.0.1:5037) with the plain ADB host
+protocol, so no adb.exe process is spawned per action:
+
+    - frames come from 'exec:screencap' in raw format and are parsed into a
+      NumPy array that views the receive buffer (no per-pixel conversion)
+    - taps go through one persistent 'shell:' session per instance
+
+Window-relative coordinates (COORDS_WITH_AD / COORDS_NO_AD) are mapped to
+device pixels through the game viewport configured for each window, so the
+same device coordinates are used whether or not the ad banner is showing.
+
+FakeAdbServer implements enough of the protocol to run this off a real device.
+"""
+
+import re
+import socket
+import socketserver
+import struct
+import threading
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+try:
+    from PIL import Image
+    PIL_SUPPORT = True
+except ImportError:
+    PIL_SUPPORT = False
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = 5037
+ADB_TIMEOUT = 5.0
+
+SCREENCAP_HEADER = struct.Struct('<III')  # width, height, pixel format
+RGBA_8888 = 1
+
+
+class AdbError(Exception):
+    """Raised when the adb server rejects a request or the connection fails."""
+
+
+def _send_request(sock, payload):
+    data = payload.encode('utf-8')
+    sock.sendall(f"{len(data):04x}".encode('ascii') + data)
+
+
+def _recv_exact(sock, size):
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise AdbError("Connection closed by adb server")
+        received += n
+    return bytes(data)
+
+
+def _read_status(sock):
+    status = _recv_exact(sock, 4)
+    if status == b'OKAY':
+        return
+    if status == b'FAIL':
+        length = int(_recv_exact(sock, 4), 16)
+        raise AdbError(_recv_exact(sock, length).decode('utf-8', 'replace'))
+    raise AdbError(f"Unexpected adb response: {status!r}")
+
+
+class AdbDevice:
+    """One emulator instance reached through the adb server."""
+
+    def __init__(self, serial, host=ADB_HOST, port=ADB_PORT):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self._shell = None
+        self._shell_lock = threading.Lock()
+        self._frame_buffer = bytearray()
+        self.device_size = None  # (width, height) once known
+
+    def _open_service(self, service):
+        """Open a socket bound to this device and start a service on it."""
+        sock = socket.create_connection((self.host, self.port), timeout=ADB_TIMEOUT)
+        try:
+            _send_request(sock, f"host:transport:{self.serial}")
+            _read_status(sock)
+            _send_request(sock, service)
+            _read_status(sock)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def screencap(self):
+        """Grab the framebuffer; returns an (H, W, 4) RGBA array viewing an internal buffer.
+
+        The array is only valid until the next screencap() call on this device.
+        """
+        sock = self._open_service("exec:screencap")
+        try:
+            header = _recv_exact(sock, SCREENCAP_HEADER.size)
+            width, height, pixel_format = SCREENCAP_HEADER.unpack(header)
+            if pixel_format != RGBA_8888:
+                raise AdbError(f"Unsupported screencap pixel format {pixel_format}")
+            pixel_bytes = width * height * 4
+            # Android 9+ adds a 4-byte colorspace field after the header
+            needed = pixel_bytes + 4
+            if len(self._frame_buffer) < needed:
+                self._frame_buffer = bytearray(needed)
+            view = memoryview(self._frame_buffer)
+            received = 0
+            while received < needed:
+                n = sock.recv_into(view[received:needed], needed - received)
+                if n == 0:
+                    break
+                received += n
+        finally:
+            sock.close()
+
+        if received == pixel_bytes + 4:
+            offset = 4
+        elif received == pixel_bytes:
+            offset = 0
+        else:
+            raise AdbError(f"Short screencap: got {received} of {pixel_bytes} bytes")
+        self.device_size = (width, height)
+        if NUMPY_SUPPORT:
+            return np.frombuffer(self._frame_buffer, dtype=np.uint8, count=pixel_bytes, offset=offset).reshape(height, width, 4)
+        return Image.frombuffer('RGBA', (width, height), bytes(view[offset:offset + pixel_bytes]), 'raw', 'RGBA', 0, 1)
+
+    def shell_output(self, command):
+        """Run a one-off shell command and return its output."""
+        sock = self._open_service(f"shell:{command}")
+        chunks = []
+        try:
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            sock.close()
+        return b''.join(chunks).decode('utf-8', 'replace')
+
+    def query_device_size(self):
+        """Read the display size with 'wm size' (used before the first screencap)."""
+        if self.device_size is None:
+            match = re.search(r"(\d+)x(\d+)", self.shell_output("wm size"))
+            if match:
+                self.device_size = (int(match.group(1)), int(match.group(2)))
+        return self.device_size
+
+    def _send_shell_line(self, line):
+        if self._shell is None:
+            self._shell = self._open_service("shell:")
+            self._shell.setblocking(False)
+        self._shell.sendall((line + "\n").encode('utf-8'))
+        # Discard prompt/echo output so the socket buffer never fills up
+        try:
+            while self._shell.recv(65536):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def run_persistent(self, line):
+        """Send a command over the persistent shell session, reconnecting once on failure."""
+        with self._shell_lock:
+            try:
+                self._send_shell_line(line)
+            except (OSError, AdbError):
+                self.close()
+                self._send_shell_line(line)
+
+    def tap(self, x, y):
+        self.run_persistent(f"input tap {int(x)} {int(y)}")
+
+    def close(self):
+        if self._shell is not None:
+            try:
+                self._shell.close()
+            except OSError:
+                pass
+            self._shell = None
+
+
+class AdbBackend:
+    """Maps window coordinates to device pixels and serves captures/taps per window.
+
+    instances: {window_name: {'serial': '127.0.0.1:5555',
+                              'viewport_with_ad': ((x1, y1), (x2, y2)),
+                              'viewport_no_ad': ((x1, y1), (x2, y2))}}
+    The viewports are the window-relative rectangles where the game screen is drawn.
+    ad_state_fn(window_name) returns True while the ad banner layout is active.
+    """
+
+    background = True
+    may_take_focus = False
+
+    def __init__(self, instances, ad_state_fn=None, host=ADB_HOST, port=ADB_PORT):
+        self.instances = instances
+        self.ad_state_fn = ad_state_fn or (lambda window_name: False)
+        self.devices = {name: AdbDevice(cfg['serial'], host, port) for name, cfg in instances.items()}
+        self._locks = {name: threading.Lock() for name in instances}
+
+    def handles(self, window_name):
+        return window_name in self.devices
+
+    def _viewport(self, window_name):
+        cfg = self.instances[window_name]
+        key = 'viewport_with_ad' if self.ad_state_fn(window_name) else 'viewport_no_ad'
+        return cfg.get(key) or cfg.get('viewport_no_ad')
+
+    def to_device(self, window_name, point):
+        """Map a window-relative point to device pixels, or None if outside the game viewport."""
+        device = self.devices[window_name]
+        size = device.device_size or device.query_device_size()
+        (vx1, vy1), (vx2, vy2) = self._viewport(window_name)
+        x, y = point
+        if not (vx1 <= x < vx2 and vy1 <= y < vy2) or size is None:
+            return None
+        return ((x - vx1) * size[0] / (vx2 - vx1), (y - vy1) * size[1] / (vy2 - vy1))
+
+    def grab(self, window_name, region):
+        """Return a PIL image of a window-relative region, or None if it is not inside the game viewport."""
+        if not self.handles(window_name) or region is None:
+            return None
+        (x1, y1), (x2, y2) = region
+        (vx1, vy1), (vx2, vy2) = self._viewport(window_name)
+        if not (vx1 <= x1 and vy1 <= y1 and x2 <= vx2 and y2 <= vy2):
+            return None
+        with self._locks[window_name]:
+            frame = self.devices[window_name].screencap()
+            height, width = (frame.shape[0], frame.shape[1]) if NUMPY_SUPPORT else (frame.height, frame.width)
+            sx = width / (vx2 - vx1)
+            sy = height / (vy2 - vy1)
+            box = (int((x1 - vx1) * sx), int((y1 - vy1) * sy), int(round((x2 - vx1) * sx)), int(round((y2 - vy1) * sy)))
+            if NUMPY_SUPPORT:
+                # Crop on the array view, then copy just the crop into a PIL image
+                crop = Image.fromarray(frame[box[1]:box[3], box[0]:box[2], :3])
+            else:
+                crop = frame.crop(box).convert('RGB')
+        if crop.size != (x2 - x1, y2 - y1):
+            crop = crop.resize((x2 - x1, y2 - y1))
+        return crop
+
+    def click(self, window_name, coords, description=""):
+        if not self.handles(window_name):
+            return False
+        try:
+            point = self.to_device(window_name, coords)
+            if point is None:
+                return False
+            self.devices[window_name].tap(*point)
+            return True
+        except (OSError, AdbError) as e:
+            print(f"  [{window_name}] ADB tap failed: {e}")
+            return False
+
+    @staticmethod
+    def runs_in_background(action, keys=()):
+        return action == 'click'
+
+    def hotkey(self, window_name, keys):
+        # Emulator hotkeys (e.g. Ctrl+Shift+U) are handled by BlueStacks, not Android
+        return False
+
+    def close(self):
+        for device in self.devices.values():
+            device.close()
+
+
+# ============================================
+# FAKE ADB SERVER (for running without an emulator)
+# ============================================
+
+class FakeAdbServer:
+    """Minimal adb server: host:transport, exec:screencap, shell:wm size and a persistent shell.
+
+    frame is an (H, W, 4) RGBA array or a PIL image; commands received on
+    persistent shells are appended to self.commands.
+    """
+
+    def __init__(self, frame, host="127.0.0.1", port=0, colorspace_header=True):
+        self.set_frame(frame)
+        self.colorspace_header = colorspace_header
+        self.commands = []
+        self.serials = set()
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                try:
+                    while True:
+                        length = int(_recv_exact(sock, 4), 16)
+                        request = _recv_exact(sock, length).decode('utf-8')
+                        if request.startswith("host:transport:"):
+                            server.serials.add(request.split(":", 2)[2])
+                            sock.sendall(b'OKAY')
+                            continue
+                        sock.sendall(b'OKAY')
+                        server._serve(sock, request)
+                        return
+                except (AdbError, OSError, ValueError):
+                    return
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def set_frame(self, frame):
+        if hasattr(frame, 'mode'):
+            frame = frame.convert('RGBA')
+            self.width, self.height = frame.size
+            self.pixels = frame.tobytes()
+        else:
+            self.height, self.width = frame.shape[0], frame.shape[1]
+            self.pixels = bytes(frame)
+
+    def _serve(self, sock, request):
+        if request == "exec:screencap":
+            header = SCREENCAP_HEADER.pack(self.width, self.height, RGBA_8888)
+            if self.colorspace_header:
+                header += struct.pack('<I', 0)
+            sock.sendall(header + self.pixels)
+        elif request == "shell:wm size":
+            sock.sendall(f"Physical size: {self.width}x{self.height}\n".encode('ascii'))
+        elif request == "shell:":
+            buffer = b""
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                buffer += chunk
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    self.commands.append(line.decode('utf-8').strip())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,2644 @@
+def check_for_new_perk(window_name, coords):
+    """Check if 'New Perk' text is visible in the perk bar region."""
+    region = coords['new_perk_region']
+    text = get_text_from_region(window_name, region)
+    print(f"  [{window_name}] OCR read: '{text}'")
+    return "new perk" in text.lower()
+def get_perk_id(priority, window_name=None):
+    """Return a stable perk identifier (its include keywords) for a priority, or None if unrecognized."""
+    priority_list = get_priority_list(window_name)
+    for entry_priority, include_keywords, _ in priority_list:
+        if entry_priority == priority:
+            return '+'.join(include_keywords)
+    return None
+
+def get_perk_priority(perk_text, window_name=None):
+    """Return the priority value for a given perk text."""
+    perk_text_lower = perk_text.strip().lower()
+    # Choose the correct priority list
+    priority_list = get_priority_list(window_name)
+
+    # Special case: match 'free upgrade chance for all +5.00' if all words 'free', 'for', 'all' exist
+    if all(word in perk_text_lower for word in ['free', 'for', 'all']):
+        for priority, include_keywords, exclude_keywords in priority_list:
+            if 'free upgrade chance' in include_keywords or 'upgrade chance for all' in include_keywords:
+                return priority
+    for priority, include_keywords, exclude_keywords in priority_list:
+        all_include_match = all(keyword in perk_text_lower for keyword in include_keywords)
+        no_exclude_match = not any(keyword in perk_text_lower for keyword in exclude_keywords)
+        if all_include_match and no_exclude_match:
+            return priority
+
+    # Special numeric recognition: match "1.8" or "1.80" (optionally prefixed with 'x') for coin-type perks
+    try:
+        import re
+        num_match = re.search(r"\b(?:x)?1\.8(?:0)?\b", perk_text_lower)
+        if num_match:
+            # Prefer the specific coins entry that mentions tower/max health
+            for priority, include_keywords, _ in priority_list:
+                inc = [k.lower() for k in include_keywords]
+                if 'coins' in inc and any('tower' in k for k in inc):
+                    return priority
+            # Fallback: any coin-related entry
+            for priority, include_keywords, _ in priority_list:
+                if any('coin' in k for k in include_keywords):
+                    return priority
+
+        # If no numeric match, support textual match: coin + tower max / max health
+        if 'coin' in perk_text_lower and ('tower max' in perk_text_lower or 'tower max health' in perk_text_lower or 'max health' in perk_text_lower):
+            for priority, include_keywords, _ in priority_list:
+                inc = [k.lower() for k in include_keywords]
+                if 'coins' in inc and any('tower' in k for k in inc):
+                    return priority
+            for priority, include_keywords, _ in priority_list:
+                if any('coin' in k for k in include_keywords):
+                    return priority
+    except Exception:
+        pass
+
+    # If no exact match found, try a fuzzy match against known perk phrases
+    try:
+        fuzzy = fuzzy_match_perk(perk_text_lower, window_name)
+        if fuzzy != 9999:
+            return fuzzy
+    except Exception:
+        pass
+    return 9999
+import time
+_IMPORT_STARTED = time.perf_counter()
+import argparse
+from PIL import Image
+import threading
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from . import color_probes
+from . import window_registry
+from . import window_events
+from . import actuators
+from . import adb_backend
+from . import log_writer
+from . import decision_journal
+from . import history_store
+from . import debug_artifacts
+from . import frame_archive
+from . import timing
+from . import metrics
+from . import ocr_profiler
+from . import lazy_imports
+from . import ocr_pool
+from . import layouts
+from . import layout_calibration
+from . import capture_planner
+from . import frame_buffers
+from . import data_dir
+
+# Heavy modules are imported on first use (see lazy_imports.py), not at startup.
+# pyautogui needs a display; without one (headless benchmarks) only background capture/input works
+pyautogui = lazy_imports.LazyModule('pyautogui', on_import=lambda module: setattr(module, 'FAILSAFE', True))
+ImageFilter = lazy_imports.LazyModule('PIL.ImageFilter')
+ImageOps = lazy_imports.LazyModule('PIL.ImageOps')
+ImageEnhance = lazy_imports.LazyModule('PIL.ImageEnhance')
+tk = lazy_imports.LazyModule('tkinter')
+messagebox = lazy_imports.LazyModule('tkinter.messagebox')
+TKINTER_AVAILABLE = lazy_imports.installed('tkinter')
+
+# Directory for logs, history, journal, debug images and probes.json: PERK_AUTOMATOR_HOME,
+# or the directory the automator is started from
+DATA_DIR = data_dir()
+
+# pygetwindow for window targeting (imported when first needed)
+gw = lazy_imports.LazyModule('pygetwindow')
+WINDOW_SUPPORT = lazy_imports.installed('pygetwindow')
+if not WINDOW_SUPPORT:
+    print("WARNING: pygetwindow not installed. Run: pip install pygetwindow")
+    print("Window targeting will not work without it.")
+
+# Try to import win32gui for virtual desktop detection and window capture
+try:
+    import win32gui
+    import win32con
+    from ctypes import windll
+    WIN32_SUPPORT = True
+except ImportError:
+    WIN32_SUPPORT = False
+    print("WARNING: pywin32 not installed. Run: pip install pywin32")
+    print("Virtual desktop detection will not work without it.")
+
+# Per-monitor DPI awareness: window rects, client rects and captures in physical pixels.
+# Must be set before the first window query (pyautogui would otherwise set it on first use).
+DPI_AWARE = True
+DPI_AWARENESS = None      # set by init()
+
+# Cached title -> hwnd / geometry lookups (see window_registry.py), created by init()
+WINDOW_REGISTRY = None
+
+# Set the path to Tesseract (elsewhere the tesseract on PATH is used)
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+def _configure_tesseract(module):
+    if os.path.exists(TESSERACT_CMD):
+        module.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+pytesseract = lazy_imports.LazyModule('pytesseract', on_import=_configure_tesseract)
+
+# ============================================
+# LOGGING CONFIGURATION
+# ============================================
+
+LOG_FILE = DATA_DIR / "perk_selection_log.txt"
+PERKS_ONLY_LOG = DATA_DIR / "perks_seen.txt"
+
+# Log lines are queued and written in batches by a background thread (see log_writer.py).
+# LOG_OVERFLOW decides what happens when the queue is full: 'block' the caller or 'drop' the line.
+LOG_OVERFLOW = 'block'
+LOG_WRITER = None
+
+# Machine-readable decision journal: one JSON line per perk decision, size-rotated,
+# gzip-compressed and kept for JOURNAL_RETENTION_DAYS (never truncated at startup).
+# Summarize with: python -m tower_perk_selector.decision_journal --days 7
+JOURNAL_DIR = DATA_DIR / "journal"
+JOURNAL_MAX_BYTES = 8 * 1024 * 1024
+JOURNAL_COMPRESS = True
+JOURNAL_RETENTION_DAYS = 60
+DECISION_JOURNAL = None
+
+# SQLite history of offers/selections, wave-1 events and focus aborts (written by the log writer thread)
+# Report with: python -m tower_perk_selector.history_store --days 7
+HISTORY_DB = DATA_DIR / history_store.DEFAULT_DB_NAME
+HISTORY_STORE = None
+
+# Per-variant OCR time/confidence/priority/winner for every perk card (same database)
+# Report with: python -m tower_perk_selector.ocr_profiler --days 7
+PROFILE_OCR_VARIANTS = True
+OCR_PROFILER = None
+
+# Per-stage timing spans and latency histograms (see timing.py).
+# The summary is printed on exit, every TIMING_SUMMARY_INTERVAL seconds (0 = only on exit)
+# and whenever print_timing_summary() is called.
+TIMINGS = timing.TIMINGS
+TIMING_SUMMARY_INTERVAL = 600
+
+# Tesseract runs shared by all windows: at most OCR_WORKERS at a time (see ocr_pool.py)
+# OCR_PROCESSES = True makes the pytesseract calls from OCR_WORKERS worker processes; images reach them
+# through a shared-memory frame bus (see frame_bus.py) instead of being pickled. The workers start on
+# the first OCR call and each imports this script once; the import only defines settings and functions,
+# the files, stores and threads above are created by init().
+OCR_WORKERS = ocr_pool.default_workers()
+OCR_PROCESSES = False
+if OCR_PROCESSES:
+    OCR_POOL = ocr_pool.ProcessOcrPool(OCR_WORKERS, timings=TIMINGS,
+                                       tesseract_cmd=TESSERACT_CMD if os.path.exists(TESSERACT_CMD) else None)
+else:
+    OCR_POOL = ocr_pool.OcrPool(pytesseract, OCR_WORKERS, timings=TIMINGS)
+
+# Prometheus metrics served on http://127.0.0.1:METRICS_PORT/metrics (None = no server)
+METRICS_PORT = 9464
+METRICS = metrics.Metrics(TIMINGS)
+for _name, _kind, _help in (
+    ('perk_ticks_total', 'counter', 'Main-loop checks per window'),
+    ('perk_captures_total', 'counter', 'Captured images per window'),
+    ('perk_ocr_calls_total', 'counter', 'Tesseract invocations per window and kind (bar or perk variant)'),
+    ('perk_selected_total', 'counter', 'Perks selected per window and priority'),
+    ('perk_skipped_total', 'counter', 'Perk decisions without a selection, per reason'),
+    ('perk_focus_failures_total', 'counter', 'Aborted focus attempts per window and stage'),
+    ('perk_focus_cooldown_active', 'gauge', '1 while focus attempts for a window are on cooldown'),
+    ('perk_game_paused_seconds_total', 'counter', 'Time the game was kept paused for perk selection'),
+    ('perk_window_errors_total', 'counter', 'Main-loop checks of a window that raised an error'),
+    ('perk_layout_calibrations_total', 'counter', 'Automatic layout recalibrations per window and result'),
+    ('perk_capture_bytes_total', 'counter', 'Bitmap bytes copied out of window captures'),
+):
+    METRICS.describe(_name, _kind, _help)
+METRICS_SERVER = None
+
+def start_metrics_server():
+    """Serve METRICS on localhost if METRICS_PORT is set."""
+    global METRICS_SERVER
+    if not METRICS_PORT or METRICS_SERVER is not None:
+        return
+    try:
+        METRICS_SERVER = metrics.MetricsServer(METRICS, port=METRICS_PORT).start()
+        print(f"Metrics available at http://{METRICS_SERVER.host}:{METRICS_SERVER.port}/metrics")
+    except OSError as e:
+        print(f"WARNING: Could not start metrics server on port {METRICS_PORT}: {e}")
+
+def initialize_log_files():
+    """Clear and recreate both log files at startup."""
+    # Make sure nothing queued earlier lands after the truncation
+    LOG_WRITER.flush()
+
+    # Clear the main log file
+    with open(LOG_FILE, "w", encoding="utf-8") as f:
+        f.write("")  # Creates empty file (or clears existing)
+    
+    # Clear the perks-only log file
+    with open(PERKS_ONLY_LOG, "w", encoding="utf-8") as f:
+        f.write("")  # Creates empty file (or clears existing)
+    
+    print(f"Log files initialized (cleared):")
+    print(f"  - {LOG_FILE}")
+    print(f"  - {PERKS_ONLY_LOG}")
+
+def print_timing_summary(per_window=True):
+    """Print the per-window/stage latency table."""
+    print("=" * 60)
+    print("Timing summary")
+    TIMINGS.print_summary(per_window)
+    CAPTURE_STATS.print_summary()
+    print("=" * 60)
+
+def shutdown_logging():
+    """Flush queued log lines and debug images to disk and report any backpressure."""
+    print_timing_summary()
+    DEBUG_ARTIFACTS.flush()
+    if FRAME_RECORDER is not None:
+        FRAME_RECORDER.close()
+    OCR_POOL.close()
+    LOG_WRITER.close()
+    stats = LOG_WRITER.stats
+    if stats['dropped'] or stats['blocked']:
+        print(f"Log writer: {stats['dropped']} lines dropped, {stats['blocked']} writes blocked on a full queue")
+
+def write_to_log(message):
+    """Write a message to the log file with timestamp."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    LOG_WRITER.write(LOG_FILE, f"[{timestamp}] {message}\n")
+
+def log_perk_to_simple_list(window_name, perk_text, priority, was_selected):
+    """Log a perk to the simple perks-only log file."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    selected_marker = ">>> SELECTED" if was_selected else "    not selected"
+    
+    LOG_WRITER.write(PERKS_ONLY_LOG, f"[{timestamp}] [{window_name}] Priority {priority:4} | {selected_marker} | {perk_text}\n")
+
+def log_decision(window_name, perk_list_name, cards, selected, timings):
+    """Queue one perk decision for the JSONL decision journal."""
+    LOG_WRITER.write(DECISION_JOURNAL, decision_journal.DecisionJournal.make_record(
+        window=window_name, perk_list=perk_list_name, cards=cards, selected=selected, timings=timings))
+
+def _format_perk_block(index, text, priority, bg_color, is_purple, effective_priority):
+    """Format the detailed log lines for one perk option."""
+    lines = [
+        f"  Perk {index}: {text}\n",
+        f"  Perk {index} Priority: {priority}\n",
+    ]
+    if bg_color:
+        lines.append(f"  Perk {index} Background: RGB{bg_color} | Hex: #{bg_color[0]:02X}{bg_color[1]:02X}{bg_color[2]:02X}\n")
+    lines.append(f"  Perk {index} Is Purple: {is_purple}\n")
+    lines.append(f"  Perk {index} Effective Priority: {effective_priority}\n")
+    lines.append("\n")
+    return lines
+
+def log_perk_selection(window_name, perk1_text, perk1_priority, perk2_text, perk2_priority, selected_perk,
+                       perk1_is_purple=False, perk2_is_purple=False, 
+                       effective_priority1=None, effective_priority2=None,
+                       perk1_bg_color=None, perk2_bg_color=None,
+                       perk_list_name=None):
+    """Log a perk selection decision to the log file, including which perk list was used."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Use base priorities if effective not provided
+    if effective_priority1 is None:
+        effective_priority1 = perk1_priority
+    if effective_priority2 is None:
+        effective_priority2 = perk2_priority
+
+    # Log to detailed log (one queued entry for the whole block)
+    lines = [
+        f"\n{'='*70}\n",
+        f"[{timestamp}] PERK SELECTION - {window_name}\n",
+        f"{'='*70}\n",
+    ]
+    if perk_list_name:
+        lines.append(f"  Perk List Used: {perk_list_name}\n")
+    lines += _format_perk_block(1, perk1_text, perk1_priority, perk1_bg_color, perk1_is_purple, effective_priority1)
+    lines += _format_perk_block(2, perk2_text, perk2_priority, perk2_bg_color, perk2_is_purple, effective_priority2)
+    selected_priority = effective_priority1 if selected_perk == 1 else effective_priority2
+    lines.append(f"  >>> SELECTED: Perk {selected_perk} (Effective Priority {selected_priority})\n")
+    lines.append(f"{'='*70}\n\n")
+    LOG_WRITER.write(LOG_FILE, ''.join(lines))
+
+    # Log to simple perks-only log
+    perk1_selected = (selected_perk == 1)
+    perk2_selected = (selected_perk == 2)
+    log_perk_to_simple_list(window_name, perk1_text, perk1_priority, perk1_selected)
+    log_perk_to_simple_list(window_name, perk2_text, perk2_priority, perk2_selected)
+
+def log_perk_selection_three(window_name, perk1_text, perk1_priority, perk2_text, perk2_priority, perk3_text, perk3_priority, selected_perk,
+                             perk1_is_purple=False, perk2_is_purple=False, perk3_is_purple=False,
+                             effective_priority1=None, effective_priority2=None, effective_priority3=None,
+                             perk1_bg_color=None, perk2_bg_color=None, perk3_bg_color=None,
+                             perk_list_name=None, selected_note=None):
+    """Log a three-option perk selection decision to the log file."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    if effective_priority1 is None:
+        effective_priority1 = perk1_priority
+    if effective_priority2 is None:
+        effective_priority2 = perk2_priority
+    if effective_priority3 is None:
+        effective_priority3 = perk3_priority
+
+    lines = [
+        f"\n{'='*70}\n",
+        f"[{timestamp}] PERK SELECTION - {window_name}\n",
+        f"{'='*70}\n",
+    ]
+    if perk_list_name:
+        lines.append(f"  Perk List Used: {perk_list_name}\n")
+    lines += _format_perk_block(1, perk1_text, perk1_priority, perk1_bg_color, perk1_is_purple, effective_priority1)
+    lines += _format_perk_block(2, perk2_text, perk2_priority, perk2_bg_color, perk2_is_purple, effective_priority2)
+    lines += _format_perk_block(3, perk3_text, perk3_priority, perk3_bg_color, perk3_is_purple, effective_priority3)
+
+    selected_priority = None
+    if selected_perk == 1:
+        selected_priority = effective_priority1
+    elif selected_perk == 2:
+        selected_priority = effective_priority2
+    elif selected_perk == 3:
+        selected_priority = effective_priority3
+    # Append selected_note if provided
+    lines.append(f"  >>> SELECTED: Perk {selected_perk} (Effective Priority {selected_priority}){selected_note or ''}\n")
+    lines.append(f"{'='*70}\n\n")
+    LOG_WRITER.write(LOG_FILE, ''.join(lines))
+
+    # Log to simple perks-only log
+    log_perk_to_simple_list(window_name, perk1_text, perk1_priority, selected_perk == 1)
+    log_perk_to_simple_list(window_name, perk2_text, perk2_priority, selected_perk == 2)
+    log_perk_to_simple_list(window_name, perk3_text, perk3_priority, selected_perk == 3)
+
+# ============================================
+# WINDOW CONFIGURATION - Both BlueStacks instances
+# ============================================
+
+WINDOWS = [
+    "Daddy Bluestack",
+    "Maximus Bluestack",
+]
+
+# ============================================
+# WINDOW PROFILES - per-window settings (these replace the per-window script copies)
+# ============================================
+# Keys are matched case-insensitively against the window title; the first match wins and
+# its settings override DEFAULT_PROFILE. Any number of windows can be monitored from this
+# one process (see WINDOWS / --windows).
+#   perk_list     - name of the priority list used for the window
+#   cards         - perk cards read per decision (2 or 3)
+#   bar_threshold - gray level to binarize the perk bar at before OCR (None = plain grayscale)
+# Layout transforms applied to COORDS_WITH_AD / COORDS_NO_AD (see layouts.py):
+# Captures, clicks and the transformed coordinates are relative to the window's client area,
+# so title bars, borders and DPI-dependent frame sizes do not move them.
+#   client_origin  - (x, y) of the client area inside the window when COORDS_* were measured
+#                    (BlueStacks draws its own title bar inside the client area: (0, 0))
+#   perk1_top      - Y of the first perk card; cards and options are shifted to it (None = as laid out)
+#   scale          - (sx, sy) for every coordinate
+#   reference_size - client (width, height) the coordinates were measured at; other client sizes scale to fit (None = off)
+#   offset         - (dx, dy) added after scaling
+# The fixed probe points (AD_CHECK_POS_*, PLAY_PAUSE_CHECK_POS) are in the same base coordinates
+# and go through the same transform (see probe_transform()).
+DEFAULT_PROFILE = {'perk_list': 'PERK_PRIORITY', 'cards': 2, 'bar_threshold': 180, 'client_origin': (0, 0),
+                   'perk1_top': None, 'scale': (1.0, 1.0), 'reference_size': None, 'offset': (0, 0)}
+WINDOW_PROFILES = {
+    'Daddy': {'perk_list': 'PERK_PRIORITY_DADDY', 'cards': 3, 'bar_threshold': None},
+    'Maximus': {'cards': 3, 'perk1_top': 265, 'bar_threshold': None},
+}
+
+_window_profiles = {}
+
+def get_window_profile(window_name):
+    """Return the settings for a window (DEFAULT_PROFILE, its WINDOW_PROFILES entry and any
+    calibrated layout from CALIBRATION_FILE), cached per title."""
+    profile = _window_profiles.get(window_name)
+    if profile is None:
+        profile = dict(DEFAULT_PROFILE)
+        title = (window_name or '').lower()
+        for match, overrides in WINDOW_PROFILES.items():
+            if match.lower() in title:
+                profile.update(overrides)
+                break
+        calibrated = CALIBRATED_PROFILES.get(window_name)
+        if calibrated:
+            # A calibrated transform replaces the configured one (see LAYOUT CALIBRATION). It maps
+            # the base layouts straight to found client positions, so no client_origin applies on top.
+            profile.update(scale=tuple(calibrated['scale']), offset=tuple(calibrated['offset']),
+                           reference_size=None, client_origin=(0, 0))
+        _window_profiles[window_name] = profile
+    return profile
+
+def get_priority_list(window_name):
+    """Return the perk priority list configured for a window."""
+    return globals()[get_window_profile(window_name)['perk_list']]
+
+# ============================================
+# CONFIGURATION - Coordinates WITH AD showing
+# (These are RELATIVE to the window, not absolute screen coords; the window
+# profile maps them into the client area, see client_origin above)
+# ============================================
+
+COORDS_WITH_AD = {
+    'play_pause': (1135, 28),
+    'play_pause_region': ((1100, 10), (1170, 45)),
+    'new_perk_bar': (1128, 74),
+    'perk_option_1': (1133, 242),
+    'perk_option_2': (1138, 345),
+    'perk_option_3': (1135, 448),
+    'close_x': (1329, 132),
+    'new_perk_region': ((1018, 63), (1228, 92)),
+    # OLD Perk 1: ((890, 200), (1343, 284))
+    # OLD Perk 2: ((888, 305), (1345, 390))
+    'perk1_text_region': ((984, 205), (1341, 293)),
+    'perk2_text_region': ((984, 307), (1341, 396)),
+    'perk3_text_region': ((984, 409), (1341, 498)),
+    # 'wave_region': ((1130, 599), (1269, 624)),
+}
+
+# ============================================
+# CONFIGURATION - Coordinates WITHOUT AD showing
+# ============================================
+
+COORDS_NO_AD = {
+    'play_pause': (1135, 27),
+    'play_pause_region': ((916, 10), (986, 45)),
+    'new_perk_bar': (944, 79),
+    'perk_option_1': (956, 245),
+    'perk_option_2': (957, 349),
+    'perk_option_3': (956, 453),
+    'close_x': (1145, 134),
+    'new_perk_region': ((832, 62), (1044, 93)),
+    # OLD Perk 1: ((703, 199), (1159, 287))
+    # OLD Perk 2: ((709, 307), (1160, 391))
+    'perk1_text_region': ((804, 201), (1175, 288)),
+    'perk2_text_region': ((804, 307), (1175, 396)),
+    'perk3_text_region': ((804, 413), (1175, 502)),
+    # 'wave_region': ((946, 601), (1080, 628)),
+}
+
+# Base layouts by name; profiles transform them and the results are cached per window size
+LAYOUTS = {'ad': COORDS_WITH_AD, 'no_ad': COORDS_NO_AD}
+LAYOUT_ENGINE = layouts.LayoutEngine(LAYOUTS)
+
+# ============================================
+# LAYOUT CALIBRATION (see layout_calibration.py)
+# ============================================
+# Anchor templates (play/pause, New Perk bar, close X) are kept in CALIBRATION_DIR; create
+# them from a correctly laid-out window with:
+#     python -m tower_perk_selector.layout_calibration templates "<window title>"
+# The scale / offset calibrated for an exact window title is stored in CALIBRATION_FILE and
+# replaces that window's profile transform. Every ANCHOR_CHECK_EVERY ticks the anchors are
+# matched where the profile expects them; after ANCHOR_CHECK_FAILURES failed checks in a
+# row the window is recalibrated from a full frame (at most once per CALIBRATION_RETRY_SECONDS).
+AUTO_CALIBRATE = True
+CALIBRATION_DIR = DATA_DIR / "calibration"
+CALIBRATION_FILE = DATA_DIR / "layout_profiles.json"
+ANCHOR_CHECK_EVERY = 15
+ANCHOR_CHECK_THRESHOLD = 0.6
+ANCHOR_CHECK_FAILURES = 3
+CALIBRATION_RETRY_SECONDS = 300
+
+# Templates, calibrator and the calibrated profiles are loaded by init()
+CALIBRATION_TEMPLATES = None
+CALIBRATOR = None
+CALIBRATED_PROFILES = {}
+
+anchor_check_ticks = {}
+anchor_check_failures = {}
+last_calibration_time = {}
+
+# ============================================
+# ADB BACKEND (optional) - capture and taps over each instance's ADB endpoint
+# ============================================
+# Map a window to its ADB serial and the client-area rectangle where the game
+# screen is drawn (with and without the ad banner). Regions inside the viewport are
+# captured with screencap and clicks become 'input tap', independent of focus,
+# visibility and virtual desktops. Anything outside the viewport (emulator chrome)
+# still uses the window capture / actuator path.
+# Example:
+#   'Daddy Bluestack': {
+#       'serial': '127.0.0.1:5555',
+#       'viewport_with_ad': ((890, 0), (1350, 820)),
+#       'viewport_no_ad': ((706, 0), (1166, 820)),
+#   },
+ADB_INSTANCES = {}
+
+# Positions to check for ad detection (relative to window)
+AD_CHECK_POS_1 = (5, 500)
+AD_CHECK_POS_2 = (400, 500)
+
+# Play/Pause button detection
+PLAY_PAUSE_CHECK_POS = (1135, 24)  # Position to check for play/pause state
+PAUSE_BUTTON_COLOR = (0x1B, 0x1E, 0x38)  # #1B1E38 - Color when PAUSE button showing (game running)
+PLAY_BUTTON_COLOR = (0xB6, 0xB8, 0xCD)   # #B6B8CD - Color when PLAY button showing (game paused)
+COLOR_TOLERANCE = 20  # Allow some variation in color matching
+
+# ============================================
+# PURPLE BACKGROUND DETECTION (Bad perks)
+# ============================================
+# Purple background perks should be avoided unless it's Priority 1 perk
+# or if both perks have purple backgrounds
+
+# Sample position offset from perk text region top-left corner to get background color
+# This samples a point that should be on the perk card background
+PERK_BG_SAMPLE_OFFSET = (10, 10)  # Offset into the perk region to sample background
+
+# Purple background color - #1F0352 (dark purple)
+# Border color is #EF17FD (bright magenta) - can use as alternative detection
+PURPLE_BG_COLOR = (0x1F, 0x03, 0x52)  # RGB(31, 3, 82) - dark purple background
+PURPLE_BORDER_COLOR = (0xEF, 0x17, 0xFD)  # RGB(239, 23, 253) - bright magenta border
+PURPLE_TOLERANCE = 40  # How close to purple to be considered "purple background"
+
+# Priority 1 perk is exempt from purple penalty
+PURPLE_EXEMPT_PRIORITY = 1
+
+# ============================================
+# COLOR PROBES - play/pause, ad and purple detection
+# ============================================
+# Each probe samples client-area points and classifies the color into a state.
+# All probes needed for a frame are sampled in a single call and their rules are
+# evaluated exactly on the sampled pixels (see color_probes.py).
+# Extra UI states can be added in probes.json next to this script.
+
+def _is_dark_purple(r, g, b):
+    """Heuristic for the dark purple background: blue > red > green, green very low."""
+    return (b > r) & (b > g) & (g < 20) & (b > 40) & (r < 80)
+
+def _is_bright_magenta(r, g, b):
+    """Heuristic for the bright magenta border (#EF17FD): high red, low green, very high blue."""
+    return (r > 180) & (g < 80) & (b > 200)
+
+PURPLE_PROBE_RULES = [
+    # Require green to be very low to distinguish from dark blue backgrounds (purple green=3, blue green=35)
+    {'state': 'purple', 'color': PURPLE_BG_COLOR, 'tolerance': PURPLE_TOLERANCE, 'max': (255, 19, 255)},
+    {'state': 'purple', 'color': PURPLE_BORDER_COLOR, 'tolerance': PURPLE_TOLERANCE},
+    {'state': 'purple', 'test': _is_dark_purple},
+    {'state': 'purple', 'test': _is_bright_magenta},
+]
+
+PROBES = {
+    'play_pause': {
+        'points': [PLAY_PAUSE_CHECK_POS],
+        'rules': [
+            {'state': 'paused', 'color': PLAY_BUTTON_COLOR, 'tolerance': COLOR_TOLERANCE},
+            {'state': 'running', 'color': PAUSE_BUTTON_COLOR, 'tolerance': COLOR_TOLERANCE},
+        ],
+        'nearest': ['running', 'paused'],  # Fall back to the closer button color; ties go to running
+    },
+    'ad': {
+        'points': [AD_CHECK_POS_1, AD_CHECK_POS_2],
+        'mode': 'uniform',
+        'states': ('no_ad', 'ad'),  # Colors match -> no ad
+    },
+    'perk1_purple': {
+        'anchor': 'perk1_text_region',
+        'points': [PERK_BG_SAMPLE_OFFSET],
+        'rules': PURPLE_PROBE_RULES,
+        'default': 'normal',
+    },
+    'perk2_purple': {
+        'anchor': 'perk2_text_region',
+        'points': [PERK_BG_SAMPLE_OFFSET],
+        'rules': PURPLE_PROBE_RULES,
+        'default': 'normal',
+    },
+    'perk3_purple': {
+        'anchor': 'perk3_text_region',
+        'points': [PERK_BG_SAMPLE_OFFSET],
+        'rules': PURPLE_PROBE_RULES,
+        'default': 'normal',
+    },
+}
+
+# Extra probes from PROBE_CONFIG_FILE are added and compiled by init()
+PROBE_CONFIG_FILE = DATA_DIR / "probes.json"
+COMPILED_PROBES = color_probes.compile_probes(PROBES)
+
+# ============================================
+# CAPTURE PLANNING (see capture_planner.py)
+# ============================================
+# Each main-loop tick renders the window once and copies out only the union of what its
+# state reads, instead of copying the full client bitmap for every read. Plan entries are
+# coords keys (taken from every layout, since the ad state is not known yet) or
+# 'probe:<name>' for a color probe's sample points. Planning is off while recording or
+# replaying, so archives keep full frames. Bytes copied per tick are printed with the
+# timing summary.
+CAPTURE_PLANNING = True
+CAPTURE_PLANS = {
+    'idle': ('probe:ad', 'new_perk_region'),
+}
+CAPTURE_STATS = capture_planner.CaptureStats()
+
+# ============================================
+# PERK PRIORITY LIST - Using keyword matching
+# Format: (priority, [keywords that ALL must match], [keywords that must NOT match])
+# Lower priority number = better perk
+# ============================================
+
+PERK_PRIORITY = [
+    (1,  ["enemies damage", "tower damage"], []),           # enemies damage -50%, but tower damage -50%
+    (2,  ["perk wave requirement"], []),                     # perk wave requirement -20
+    (3,  ["chrono field"], []),                              # chrono field
+    (4,  ["golden tower"], []),                              # golden tower
+    (5,  ["death"], []),                                     # death wave
+    (6,  ["spotlight"], []),                                 # spotlight
+    (7,  ["black hole"], []),                                # black hole
+    (8,  ["game speed"], []),                                # game speed (increase max game speed by +1)
+    (9,  ["max health"], ["coins", "tower max"]),            # x1.20 max health (exclude perk 31)
+    (10, ["poison swamp"], []),                              # poison swamp
+    (11, ["swamp radius"], []),                              # swamp radius x1.5
+    (12, ["defense percent"], []),                           # defense percent +4
+    (13, ["free upgrade chance", "upgrade chance for all"], []),  # free upgrade chance for all +5
+    (14, ["cash bonus"], []),                                # x1.15 cash bonus
+    (15, ["all coin"], []),                                  # x1.15 all coin
+    (16, ["orbs"], []),                                      # orbs +1
+    (17, ["bounce shot"], []),                               # bounce shot +2
+    (18, ["damage"], ["land mine", "tower damage", "enemies damage", "distance"]),  # x1.15 damage (generic)
+    (19, ["interest"], []),                                  # interest x1.50
+    (20, ["land mine damage"], []),                          # land mine damage x3.50
+    (21, ["defense absolute"], []),                          # x1.15 defense absolute
+    (22, ["chain lightning"], []),                           # chain lightning
+    (23, ["smart missiles"], []),                            # smart missiles
+    (24, ["inner land mines"], []),                          # inner land mines
+    (25, ["health regen"], []),                               # health regen (generic)
+    (26, ["cash per wave"], []),                             # x12.00 cash per wave
+    (27, ["boss health"], []),                               # boss health -70%, but boss speed +50%
+    (28, ["ranged enemies", "attack distance"], []),         # ranged enemies attack distance reduced
+    (29, ["life", "steal"], []),                             # lifesteal x2.50
+    (30, ["enemies speed"], []),                             # enemies speed -40%
+    (31, ["enemies have", "health"], ["max health", "health regen"]),  # enemies have -50% health
+    (32, ["tower health regen"], []),                         # tower health regen x8
+    (33, ["coins", "tower max health"], []),                 # x1.80 coins, but tower max health
+    (34, ["tower damage", "bosses"], []),                    # x1.50 tower damage, but bosses
+]
+
+# Alternate perk priority for "Daddy" windows
+PERK_PRIORITY_DADDY = [
+    (1,  ["enemies damage", "tower damage"], []),           # enemies damage -50%, but tower damage -50%
+    (2,  ["perk wave requirement"], []),                     # perk wave requirement -20
+    (3,  ["golden tower"], []),                              # golden tower
+    (4,  ["death"], []),                                     # death wave
+    (5,  ["game speed"], []),                                # game speed (increase max game speed by +1)
+    (6,  ["max health"], ["coins", "tower max"]),            # x1.20 max health (exclude perk 31)
+    (7,  ["defense percent"], []),                           # defense percent +4
+    (8,  ["free upgrade chance", "upgrade chance for all"], []),  # free upgrade chance for all +5
+    (9,  ["cash bonus"], []),                                # x1.15 cash bonus
+    (10, ["all coin"], []),                                  # x1.15 all coin
+    (11, ["orbs"], []),                                      # orbs +1
+    (12, ["bounce shot"], []),                               # bounce shot +2
+    (13, ["chrono field"], []),                              # chrono field
+    (14, ["spotlight"], []),                                 # spotlight
+    (15, ["black hole"], []),                                # black hole
+    (16, ["poison swamp"], []),                              # poison swamp
+    (17, ["swamp radius"], []),                              # swamp radius
+    (18, ["chain lightning"], []),                           # chain lightning
+    (19, ["smart missiles"], []),                            # smart missiles
+    (20, ["inner land mines"], []),                          # inner land mines
+    (21, ["land mine damage"], []),                          # land mine damage x3.50
+    (22, ["damage"], ["land mine", "tower damage", "enemies damage", "distance"]),  # x1.15 damage (generic)
+    (23, ["interest"], []),                                  # interest x1.50
+    (24, ["defense absolute"], []),                          # x1.15 defense absolute
+    (25, ["health regen"], []),                               # health regen (generic)
+    (26, ["boss health"], []),                               # boss health -70%, but boss speed +50%
+    (27, ["cash per wave"], []),                             # x12.00 cash per wave
+    (28, ["tower damage", "bosses"], []),                    # x1.50 tower damage, but bosses
+    (29, ["ranged enemies", "attack distance"], []),         # ranged enemies attack distance reduced
+    (30, ["life", "steal"], []),                             # lifesteal x2.50
+    (31, ["enemies speed"], []),                              # enemies speed -40%
+    (32, ["enemies have", "health"], ["max health", "health regen"]),  # enemies have -50% health
+    (33, ["tower health regen"], []),                         # tower health regen x8
+    (34, ["coins", "tower max health"], []),                 # x1.80 coins, but tower max health
+]
+
+# ============================================
+# TIMING CONFIGURATION
+# ============================================
+
+CHECK_INTERVAL = 2
+STARTUP_DELAY = 3  # seconds between the startup banner and the window selector (no wait without it)
+CLICK_DELAY = 0.5
+WINDOW_OPEN_WAIT = 5.0
+WINDOW_CLOSE_WAIT = 5.0
+
+# ============================================
+# FUZZY MATCHING / OCR HELPERS
+# ============================================
+# Build a canonical map of phrases -> priority for fuzzy matching
+PERK_CANONICAL = {}
+
+def _build_perk_canonical():
+    """Populate PERK_CANONICAL mapping using both PERK_PRIORITY and PERK_PRIORITY_DADDY."""
+    try:
+        lists = [PERK_PRIORITY, PERK_PRIORITY_DADDY]
+        for plist in lists:
+            for priority, include_keywords, _ in plist:
+                # Add full phrase joins and individual include keywords
+                full = ' '.join(include_keywords).lower()
+                PERK_CANONICAL[full] = priority
+                for k in include_keywords:
+                    PERK_CANONICAL[k.lower()] = priority
+                    PERK_CANONICAL[k.lower().replace('  ', ' ')] = priority
+    except Exception:
+        pass
+
+_build_perk_canonical()
+# Candidate phrases for difflib, in PERK_CANONICAL order (built once, not per call)
+PERK_CANONICAL_PHRASES = list(PERK_CANONICAL)
+
+import difflib
+
+@TIMINGS.timed('match:fuzzy', window_arg=1)
+def fuzzy_match_perk(text, window_name=None, cutoff=0.6):
+    """Fuzzy match the given OCR text to known perk phrases and return a priority or 9999."""
+    if not text:
+        return 9999
+    # Compare against canonical phrases
+    candidates = PERK_CANONICAL_PHRASES
+    # Use get_close_matches on the full text
+    match = difflib.get_close_matches(text, candidates, n=1, cutoff=cutoff)
+    if match:
+        return PERK_CANONICAL[match[0]]
+    # Also try token-wise matching: find any canonical phrase that is close to any substring
+    words = text.split()
+    for n in range(len(words), 0, -1):
+        for i in range(0, len(words)-n+1):
+            sub = ' '.join(words[i:i+n])
+            m = difflib.get_close_matches(sub, candidates, n=1, cutoff=cutoff)
+            if m:
+                return PERK_CANONICAL[m[0]]
+    return 9999
+
+# Diagnostic focus logging / small settle delay to help troubleshoot hotkey focus issues
+DIAGNOSTIC_FOCUS_LOGS = True
+FOCUS_SETTLE_DELAY = 0.15  # seconds to wait after attempting to set foreground (0 to disable)
+# Focus retry settings: number of attempts and delay between them
+MAX_FOCUS_ATTEMPTS = 10
+FOCUS_RETRY_DELAY = 0.15  # seconds between focus attempts
+
+# Subscribe to window move/foreground/destroy events (WinEvent hooks) instead of polling
+USE_WINDOW_EVENTS = True
+
+# How clicks and the play/pause hotkey are delivered:
+#   'message'    - post window messages (no focus switching; play/pause is a click, see PLAY_PAUSE_CLICK);
+#                  falls back to foreground if posting fails
+#   'foreground' - bring the window to the front and use pyautogui (original behavior)
+ACTUATOR_MODE = 'message'
+# With a background actuator, handle perk selection for several windows at the same time
+PARALLEL_PERK_SELECTION = True
+
+# New-perk foreground verification: attempts and delay when verifying before opening New Perk window
+NEW_PERK_FOREGROUND_ATTEMPTS = 10
+NEW_PERK_FOREGROUND_RETRY_DELAY = 0.15
+
+# Control saving of debug images to disk (set False to avoid creating files)
+SAVE_DEBUG_IMAGES = True
+
+# Session recording: append every captured image to a frame archive (see frame_archive.py), e.g.
+#   RECORD_ARCHIVE = DATA_DIR / "sessions" / "today.pfa"
+# Replay: serve captures from an archive instead of the emulator (clicks are only logged).
+RECORD_ARCHIVE = None
+REPLAY_ARCHIVE = None
+
+# Recent OCR crops are kept in memory per window; images are built and saved by a background
+# thread only after an OCR error, an unrecognized perk, a perk selection or save_debug_artifacts().
+# At most DEBUG_MAX_FILES images are kept per window and kind. Each perk card and bar read also
+# keeps its crop and the image OCR read; those are saved side by side by the same triggers.
+DEBUG_RING_SIZE = 6
+DEBUG_MAX_FILES = 6
+DEBUG_ARTIFACTS = None
+
+
+def save_debug_artifacts(window_name=None, reason="manual", perk_count=3):
+    """Save the recent New Perk bar crops (all windows) and, for window_name, the last perk cards
+    and the latest crop / OCR image pair of each region."""
+    if not SAVE_DEBUG_IMAGES:
+        return
+    DEBUG_ARTIFACTS.trigger_channel_composite('new_perk_region', DATA_DIR / 'debug_newperk_combined.png')
+    if window_name:
+        DEBUG_ARTIFACTS.trigger_stack(window_name, 'perks', perk_count, 'perks', reason=reason)
+        DEBUG_ARTIFACTS.trigger_compare(window_name, reason=reason)
+
+# Global timer for wave 1 handling (cooldown per window)
+last_wave1_times = {}
+# Flag to skip clicking the New Perk bar until numeric detection recovers
+SKIP_NEW_PERK_BAR_UNTIL_NUMBERS = False
+
+# ============================================
+# FAILSAFE CONFIGURATION
+# ============================================
+
+FAILSAFE_MARGIN = 10
+
+# ============================================
+# WINDOW MANAGEMENT
+# ============================================
+
+def is_window_on_current_desktop(hwnd):
+    """
+    Check if a window is visible on the current virtual desktop.
+    """
+    if not WIN32_SUPPORT:
+        return True
+    
+    try:
+        import ctypes
+        DWMWA_CLOAKED = 14
+        dwm = ctypes.windll.dwmapi
+        cloaked = ctypes.c_int(0)
+        result = dwm.DwmGetWindowAttribute(
+            hwnd, 
+            DWMWA_CLOAKED, 
+            ctypes.byref(cloaked), 
+            ctypes.sizeof(cloaked)
+        )
+        
+        if result == 0:
+            if cloaked.value != 0:
+                return False
+        
+        if not win32gui.IsWindowVisible(hwnd):
+            return False
+            
+        return True
+        
+    except Exception as e:
+        return True
+
+def start_window_events():
+    """Attach a WinEvent hook source to the window registry if enabled."""
+    if not USE_WINDOW_EVENTS or WINDOW_REGISTRY is None:
+        return False
+    WINDOW_REGISTRY.attach_event_source(window_events.WinEventHookSource())
+    if WINDOW_REGISTRY.events_active:
+        print("Window event hooks active (geometry/focus changes are pushed, not polled)")
+        return True
+    return False
+
+@TIMINGS.timed('focus:wait')
+def wait_for_foreground(window_name, timeout):
+    """Wait up to timeout seconds for the target window to become foreground.
+
+    Returns as soon as a foreground-change event arrives when window events are
+    active; otherwise this is a plain sleep.
+    """
+    hwnd = None
+    if WINDOW_REGISTRY is not None and WINDOW_REGISTRY.events_active:
+        hwnd = WINDOW_REGISTRY.resolve(window_name, partial=True)
+    if hwnd is None:
+        time.sleep(timeout)
+        return
+    WINDOW_REGISTRY.wait_for_foreground(hwnd, timeout)
+
+def get_target_window(window_name):
+    """Get the target BlueStacks window using EXACT title match only."""
+    if REPLAY_BACKEND is not None:
+        # Replayed windows only exist in the archive
+        return window_registry.WindowInfo(0, window_name, 0, 0, 0, 0) if REPLAY_BACKEND.handles(window_name) else None
+    if WINDOW_REGISTRY is not None:
+        try:
+            return WINDOW_REGISTRY.get_window(window_name)
+        except Exception as e:
+            print(f"Error getting window: {e}")
+            return None
+
+    if not WINDOW_SUPPORT:
+        return None
+    
+    try:
+        all_windows = gw.getAllWindows()
+        for win in all_windows:
+            if win.title == window_name:
+                return win
+        return None
+    except Exception as e:
+        print(f"Error getting window: {e}")
+        return None
+
+def is_target_window_on_current_desktop(window_name):
+    """Check if our target window is on the currently active virtual desktop."""
+    if not WINDOW_SUPPORT or not WIN32_SUPPORT:
+        return True
+    
+    try:
+        hwnd = WINDOW_REGISTRY.resolve(window_name)
+        if hwnd is None:
+            return False
+        return is_window_on_current_desktop(hwnd)
+    except Exception as e:
+        return True
+
+def get_window_offset(window_name):
+    """Get the screen position of the target window's client area."""
+    window = get_target_window(window_name)
+    if window:
+        left, top, _, _ = window_registry.client_geometry(window)
+        return (left, top)
+    return (0, 0)
+
+def get_client_size(window_name):
+    """Return the (width, height) of the window's client area, or None if unknown."""
+    window = get_target_window(window_name)
+    if window is None:
+        return None
+    _, _, width, height = window_registry.client_geometry(window)
+    return (width, height) if width and height else None
+
+def to_absolute_coords(relative_coords, window_name):
+    """Convert client-area coordinates to absolute screen coordinates."""
+    offset_x, offset_y = get_window_offset(window_name)
+    
+    if isinstance(relative_coords, tuple) and len(relative_coords) == 2:
+        if isinstance(relative_coords[0], tuple):
+            (x1, y1), (x2, y2) = relative_coords
+            return ((x1 + offset_x, y1 + offset_y), (x2 + offset_x, y2 + offset_y))
+        else:
+            x, y = relative_coords
+            return (x + offset_x, y + offset_y)
+    
+    return relative_coords
+
+FIRST_CAPTURE_SECONDS = None  # seconds from the start of the imports to the first live capture
+
+def capture_window_screenshot(window_name, region=None):
+    """
+    Capture a screenshot of the target window's client area (or a client-area region of it),
+    even if the window is on another virtual desktop. Returns a PIL image (see capture_window_frame).
+    """
+    return frame_buffers.to_image(capture_window_frame(window_name, region))
+
+def capture_window_frame(window_name, region=None):
+    """
+    Capture the client area or a region of it without converting to PIL.
+
+    Live window captures come back as a frame_buffers.FrameView over a reused buffer, valid
+    until the window's next capture; other sources (replay, ADB, screen) return PIL images.
+    In replay mode the image comes from REPLAY_ARCHIVE; when recording, every capture is
+    appended to RECORD_ARCHIVE. Inside planned_capture() regions it covers are cropped from
+    the tick's planned frame instead of being captured again.
+    """
+    if REPLAY_BACKEND is not None:
+        return REPLAY_BACKEND.grab(window_name, region)
+    planned = _planned_frame(window_name)
+    if planned is not None and region:
+        img = planned.crop(region)
+        if img is not None:
+            CAPTURE_STATS.record(window_name, 0, _full_frame_bytes(planned.size), grabs=0)
+            return img
+    global FIRST_CAPTURE_SECONDS
+    with TIMINGS.span('capture', window_name):
+        img = _capture_live_screenshot(window_name, region)
+    if FIRST_CAPTURE_SECONDS is None:
+        FIRST_CAPTURE_SECONDS = time.perf_counter() - _IMPORT_STARTED
+    METRICS.inc('perk_captures_total', window=window_name)
+    if FRAME_RECORDER is not None and img is not None:
+        FRAME_RECORDER.record(window_name, region, frame_buffers.to_image(img))
+    return img
+
+def _full_frame_bytes(size):
+    return size[0] * size[1] * capture_planner.BYTES_PER_PIXEL
+
+def _capture_live_screenshot(window_name, region=None):
+    """Capture from ADB, the window DC (PrintWindow) or the screen."""
+    if region and ADB_BACKEND is not None and ADB_BACKEND.handles(window_name):
+        try:
+            img = ADB_BACKEND.grab(window_name, region)
+            if img is not None:
+                return img
+        except Exception as e:
+            print(f"  [{window_name}] ADB capture error: {e}")
+
+    if not WIN32_SUPPORT:
+        if region:
+            (x1, y1), (x2, y2) = to_absolute_coords(region, window_name)
+            return pyautogui.screenshot(region=(x1, y1, x2-x1, y2-y1))
+        window = get_target_window(window_name)
+        if window:
+            return pyautogui.screenshot(region=window_registry.client_geometry(window))
+        return None
+    
+    try:
+        rects = [capture_planner.as_rect(region)] if region else None
+        captured = _print_window_tiles(window_name, rects)
+        if captured is None:
+            return None
+        size, tiles = captured
+        copied = sum(capture_planner.rect_area(rect) for rect, _ in tiles) * capture_planner.BYTES_PER_PIXEL
+        CAPTURE_STATS.record(window_name, copied, _full_frame_bytes(size), rendered=_full_frame_bytes(size))
+        METRICS.inc('perk_capture_bytes_total', copied, window=window_name)
+        return tiles[0][1]
+        
+    except Exception as e:
+        print(f"  Window capture error: {e}")
+        if region:
+            (x1, y1), (x2, y2) = to_absolute_coords(region, window_name)
+            return pyautogui.screenshot(region=(x1, y1, x2-x1, y2-y1))
+        return None
+
+# Reused capture buffers (see frame_buffers.py); pooled per window and capture purpose
+FRAME_BUFFERS = frame_buffers.BufferPool()
+
+def _print_window_tiles(window_name, rects=None, purpose='grab'):
+    """Render the client area once with PrintWindow and copy out only `rects`.
+
+    rects are client-area (x1, y1, x2, y2); None copies the whole client area. Each rect
+    is BitBlt-ed at its source offset into a reused buffer and returned as a
+    frame_buffers.FrameView over it (valid until the window's next capture of the same
+    size for the same purpose). Parts outside the client area come back black.
+    Returns ((client width, client height), [(rect, view)]) or None if the window is gone.
+    """
+    window = WINDOW_REGISTRY.get_window(window_name)
+    if window is None:
+        return None
+    _, _, window_width, window_height = window_registry.client_geometry(window)
+    size = (window_width, window_height)
+    rects = rects or [(0, 0, window_width, window_height)]
+    return size, frame_buffers.print_window(window.hwnd, size, rects, FRAME_BUFFERS, (window_name, purpose))
+
+_planned_frames = threading.local()
+
+def _planned_frame(window_name):
+    return getattr(_planned_frames, 'frames', {}).get(window_name)
+
+def plan_capture_regions(window_name, state):
+    """Return the client-area rects covering everything CAPTURE_PLANS[state] reads."""
+    profile = get_window_profile(window_name)
+    window_size = get_client_size(window_name)
+    transform = probe_transform(window_name)
+    regions = []
+    for entry in CAPTURE_PLANS[state]:
+        for layout in LAYOUTS:
+            coords = LAYOUT_ENGINE.resolve(layout, profile, window_size if profile['reference_size'] else None)
+            if entry.startswith('probe:'):
+                regions.extend(COMPILED_PROBES[entry[len('probe:'):]].resolve_points(coords, transform) or [])
+            else:
+                regions.append(coords[entry])
+    return capture_planner.plan(regions, bounds=window_size)
+
+class planned_capture:
+    """Capture the regions a tick state reads once; captures inside the block are cropped from it.
+
+        with planned_capture(window_name, 'idle'):
+            coords = get_coords(window_name)      # ad probe pixels
+            get_text_from_region(window_name, coords['new_perk_region'])
+    """
+
+    def __init__(self, window_name, state):
+        self.window_name = window_name
+        self.state = state
+
+    def __enter__(self):
+        CAPTURE_STATS.tick(self.window_name)
+        if (not CAPTURE_PLANNING or not WIN32_SUPPORT or REPLAY_BACKEND is not None or FRAME_RECORDER is not None
+                or (ADB_BACKEND is not None and ADB_BACKEND.handles(self.window_name))):
+            return None
+        try:
+            rects = plan_capture_regions(self.window_name, self.state)
+            with TIMINGS.span('capture', self.window_name):
+                captured = _print_window_tiles(self.window_name, rects, 'plan') if rects else None
+        except Exception as e:
+            print(f"  [{self.window_name}] Planned capture failed ({e}) - capturing per region")
+            return None
+        if captured is None:
+            return None
+        size, tiles = captured
+        frame = capture_planner.RegionFrame(size, tiles)
+        CAPTURE_STATS.record(self.window_name, frame.nbytes, 0, rendered=_full_frame_bytes(size))
+        METRICS.inc('perk_captures_total', window=self.window_name)
+        METRICS.inc('perk_capture_bytes_total', frame.nbytes, window=self.window_name)
+        if not hasattr(_planned_frames, 'frames'):
+            _planned_frames.frames = {}
+        _planned_frames.frames[self.window_name] = frame
+        return frame
+
+    def __exit__(self, *exc):
+        getattr(_planned_frames, 'frames', {}).pop(self.window_name, None)
+        return False
+
+def capture_window_pixel(window_name, x, y):
+    """Capture a single pixel from the window at relative coordinates."""
+    img = capture_window_screenshot(window_name, ((x, y), (x+1, y+1)))
+    if img:
+        return img.getpixel((0, 0))
+    return None
+
+def capture_probe_states(window_name, names, coords=None, colors=None):
+    """Capture the window once and evaluate the named color probes against it.
+
+    Returns a dict of probe name -> state (None if the pixels could not be captured).
+    Inside planned_capture() the planned frame is used when it holds the probe points.
+    """
+    frame = _planned_frame(window_name)
+    if frame is not None:
+        CAPTURE_STATS.record(window_name, 0, _full_frame_bytes(frame.size), grabs=0)
+    else:
+        frame = capture_window_frame(window_name)  # probes read the buffer directly, no PIL copy
+    if frame is None:
+        return {name: None for name in names}
+    return color_probes.evaluate_probes(frame, COMPILED_PROBES, names=names, coords=coords, colors=colors,
+                                        transform=probe_transform(window_name))
+
+def check_failsafe():
+    """Check if mouse is in any corner - if so, raise exception to stop."""
+    if WIN32_SUPPORT:
+        # Polled every tick: ask Windows directly instead of importing pyautogui
+        x, y = win32gui.GetCursorPos()
+        screen_width, screen_height = windll.user32.GetSystemMetrics(0), windll.user32.GetSystemMetrics(1)
+    elif pyautogui.available:
+        x, y = pyautogui.position()
+        screen_width, screen_height = pyautogui.size()
+    else:
+        return
+    
+    in_left = x <= FAILSAFE_MARGIN
+    in_right = x >= screen_width - FAILSAFE_MARGIN
+    in_top = y <= FAILSAFE_MARGIN
+    in_bottom = y >= screen_height - FAILSAFE_MARGIN
+    
+    if (in_left and in_top) or (in_right and in_top) or (in_left and in_bottom) or (in_right and in_bottom):
+        raise Exception("FAILSAFE: Mouse in corner - stopping script!")
+
+# ============================================
+# FUNCTIONS
+# ============================================
+
+def is_ad_showing(window_name):
+    """Check if an ad is showing by comparing colors at two positions."""
+    colors = {}
+    state = capture_probe_states(window_name, ['ad'], colors=colors)['ad']
+    
+    if state is None:
+        print(f"  [{window_name}] WARNING: Could not capture ad detection pixels!")
+        return False
+    
+    # Debug logging
+    pixel1, pixel2 = colors['ad']
+    pos1, pos2 = COMPILED_PROBES['ad'].resolve_points(transform=probe_transform(window_name))
+    print(f"  [{window_name}] Ad check - Pixel1 {pos1}: RGB{pixel1}, Pixel2 {pos2}: RGB{pixel2}, Match: {state == 'no_ad'}")
+    
+    last_ad_state[window_name] = state == 'ad'
+    return state == 'ad'
+
+# Last ad-banner state seen per window (selects the ADB viewport mapping)
+last_ad_state = {}
+
+def get_coords(window_name):
+    """Get the correct coordinates based on ad presence.
+
+    Returns the window profile's transformed layout (read-only, cached per window size).
+    """
+    check_failsafe()
+    
+    if is_ad_showing(window_name):
+        print(f"  [{window_name}] Ad detected - using ad coordinates")
+        layout = 'ad'
+    else:
+        print(f"  [{window_name}] No ad - using no-ad coordinates")
+        layout = 'no_ad'
+
+    profile = get_window_profile(window_name)
+    window_size = get_client_size(window_name) if profile['reference_size'] else None
+    return LAYOUT_ENGINE.resolve(layout, profile, window_size)
+
+def check_layout_anchors(window_name):
+    """Every ANCHOR_CHECK_EVERY ticks, match the anchor templates where the window's profile
+    expects them; recalibrate after ANCHOR_CHECK_FAILURES failed checks in a row."""
+    if not AUTO_CALIBRATE or not CALIBRATOR.ready:
+        return
+    ticks = anchor_check_ticks.get(window_name, 0) + 1
+    anchor_check_ticks[window_name] = ticks
+    if ticks % ANCHOR_CHECK_EVERY:
+        return
+    frame = capture_window_screenshot(window_name)
+    if frame is None:
+        return
+    layout = 'ad' if last_ad_state.get(window_name) else 'no_ad'
+    _, transform = layouts.profile_transforms(LAYOUTS[layout], get_window_profile(window_name), frame.size)
+    with TIMINGS.span('calibration:check', window_name):
+        score = CALIBRATOR.verify(frame, layout, transform)
+    if score < 0:
+        return  # no templates recorded for this layout
+    if score >= ANCHOR_CHECK_THRESHOLD:
+        anchor_check_failures[window_name] = 0
+        return
+    failures = anchor_check_failures.get(window_name, 0) + 1
+    anchor_check_failures[window_name] = failures
+    print(f"  [{window_name}] Anchor check failed (score {score:.2f}, {failures}/{ANCHOR_CHECK_FAILURES})")
+    if failures < ANCHOR_CHECK_FAILURES:
+        return
+    if time.time() - last_calibration_time.get(window_name, 0) < CALIBRATION_RETRY_SECONDS:
+        return
+    recalibrate_layout(window_name, frame)
+
+def recalibrate_layout(window_name, frame=None):
+    """Find the anchors in a full frame and store the window's new layout transform."""
+    last_calibration_time[window_name] = time.time()
+    if frame is None:
+        frame = capture_window_screenshot(window_name)
+        if frame is None:
+            return False
+    print(f"  [{window_name}] Recalibrating layout...")
+    with TIMINGS.span('calibration:solve', window_name):
+        result = CALIBRATOR.calibrate(frame)
+    if result is None:
+        print(f"  [{window_name}] Calibration found no anchors - keeping the current layout")
+        write_to_log(f"Layout calibration failed for {window_name}: no anchors found")
+        METRICS.inc('perk_layout_calibrations_total', window=window_name, result='failed')
+        return False
+    CALIBRATED_PROFILES[window_name] = result
+    try:
+        layout_calibration.save_profile(CALIBRATION_FILE, window_name, result)
+    except OSError as e:
+        print(f"  [{window_name}] WARNING: Could not save {CALIBRATION_FILE}: {e}")
+    _window_profiles.pop(window_name, None)
+    anchor_check_failures[window_name] = 0
+    message = (f"layout {result['layout']}, scale {result['scale']}, offset {result['offset']}, "
+               f"score {result['score']} ({', '.join(result['anchors'])})")
+    print(f"  [{window_name}] Calibrated: {message}")
+    write_to_log(f"Layout calibrated for {window_name}: {message}")
+    METRICS.inc('perk_layout_calibrations_total', window=window_name, result='ok')
+    return True
+
+def get_window_transform(window_name):
+    """Return the layouts.Transform the window's profile applies to base coordinates (other than perk cards)."""
+    profile = get_window_profile(window_name)
+    window_size = get_client_size(window_name) if profile['reference_size'] else None
+    _, transform = layouts.profile_transforms(COORDS_NO_AD, profile, window_size)
+    return transform
+
+def get_window_scale(window_name):
+    """Return the (sx, sy) the window's profile applies to the base layouts at its current client size."""
+    transform = get_window_transform(window_name)
+    return transform.sx, transform.sy
+
+def probe_transform(window_name):
+    """Point transform for the unanchored color probes (play/pause, ad), matching the window's layout."""
+    transform = get_window_transform(window_name)
+    return lambda point: layouts.apply(transform, point)
+
+@TIMINGS.timed('focus')
+def bring_window_to_focus(window_name):
+    """Bring the target window to the foreground."""
+    if not WIN32_SUPPORT:
+        print(f"  [{window_name}] WARNING: Window targeting not supported")
+        return False
+    
+    try:
+        # Diagnostic: log current foreground window
+        if DIAGNOSTIC_FOCUS_LOGS:
+            cur_hwnd, cur_title = get_current_foreground_window()
+            print(f"  [{window_name}] Current foreground before focus attempt: hwnd={cur_hwnd}, title='{cur_title}'")
+
+        # Find window by partial title match (cached; re-enumerates only if the handle went stale)
+        target_hwnd = WINDOW_REGISTRY.resolve(window_name, partial=True)
+        
+        if target_hwnd is None:
+            print(f"  [{window_name}] WARNING: Window containing '{window_name}' not found")
+            return False
+        
+        print(f"  [{window_name}] Found window with hwnd {target_hwnd}, title: '{win32gui.GetWindowText(target_hwnd)}'")
+        
+        if win32gui.IsIconic(target_hwnd):
+            win32gui.ShowWindow(target_hwnd, win32con.SW_RESTORE)
+            print(f"  [{window_name}] Restored minimized window")
+        
+        win32gui.SetForegroundWindow(target_hwnd)
+        # Allow OS to settle focus slightly; use diagnostic-configured delay
+        # (returns early on the foreground-change event when window events are active)
+        if DIAGNOSTIC_FOCUS_LOGS and FOCUS_SETTLE_DELAY > 0:
+            wait_for_foreground(window_name, FOCUS_SETTLE_DELAY)
+        else:
+            wait_for_foreground(window_name, 0.05)
+        
+        # Verify the window is now foreground
+        fg_hwnd, fg_title = get_current_foreground_window()
+        if DIAGNOSTIC_FOCUS_LOGS:
+            print(f"  [{window_name}] Foreground window AFTER focus attempt: hwnd={fg_hwnd}, title='{fg_title}'")
+        
+        if fg_hwnd == target_hwnd:
+            print(f"  [{window_name}] Successfully switched to window")
+            return True
+        else:
+            print(f"  [{window_name}] WARNING: Failed to switch to window, still on '{fg_title}'")
+            return False
+    except Exception as e:
+        print(f"  [{window_name}] Could not focus window: {e}")
+        return False
+
+
+FAILED_FOCUS_COOLDOWN = 30  # seconds to wait before retrying focus on a window that failed
+failed_focus_until = {}
+METRICS.gauge_callback('perk_focus_cooldown_active', lambda: [
+    ({'window': name}, int(time.time() < until)) for name, until in list(failed_focus_until.items())])
+
+def record_focus_abort(window_name, stage, attempts):
+    """Record an aborted focus attempt in the history store and metrics."""
+    HISTORY_STORE.record_focus_abort(window_name, stage, attempts)
+    METRICS.inc('perk_focus_failures_total', window=window_name, stage=stage)
+
+
+@TIMINGS.timed('focus:ensure')
+def ensure_window_foreground(window_name, max_attempts=3, retry_delay=0.2, verify_ui=True):
+    """Ensure the target window is the foreground window.
+
+    - Tries up to max_attempts to bring the window to foreground and verifies by checking the active window title.
+    - If verify_ui=True then also does a lightweight UI verification using play/pause color (via check_play_pause_state).
+    - Implements a cooldown: if recent attempts failed, skip trying again until cooldown expires.
+
+    Returns True if the target window is confirmed foreground and UI verified, False otherwise.
+    """
+    # Respect cooldown if previous focus attempts failed
+    now = time.time()
+    if window_name in failed_focus_until and now < failed_focus_until[window_name]:
+        if DIAGNOSTIC_FOCUS_LOGS:
+            print(f"  [{window_name}] Skipping focus attempts until {failed_focus_until[window_name]} (cooldown)")
+        return False
+
+    for attempt in range(1, max_attempts + 1):
+        cur_hwnd, cur_title = get_current_foreground_window()
+        if cur_title and window_name.lower() in cur_title.lower():
+            if DIAGNOSTIC_FOCUS_LOGS:
+                print(f"  [{window_name}] Foreground confirmed on attempt {attempt}: '{cur_title}'")
+            # Optional lightweight UI verification
+            if verify_ui:
+                try:
+                    coords = get_coords(window_name)
+                    state = check_play_pause_state(window_name, coords)
+                    if state == 'unknown':
+                        if DIAGNOSTIC_FOCUS_LOGS:
+                            print(f"  [{window_name}] UI verification returned 'unknown' - treating as not verified")
+                        # Try to focus again instead of accepting unknown
+                        pass
+                    else:
+                        return True
+                except Exception as e:
+                    if DIAGNOSTIC_FOCUS_LOGS:
+                        print(f"  [{window_name}] UI verification error: {e}")
+                    # Fall through to attempt focusing
+            else:
+                return True
+
+        if DIAGNOSTIC_FOCUS_LOGS:
+            print(f"  [{window_name}] Foreground not yet target (attempt {attempt}); trying to focus...")
+
+        # Try to bring to focus (primary method)
+        brought = bring_window_to_focus(window_name)
+
+        # If primary method succeeded but we still don't see it in the foreground, try a fallback sequence
+        if not brought or True:
+            # Fallback: temporarily make window topmost to try to force it to front
+            try:
+                if WIN32_SUPPORT:
+                    hwnd = WINDOW_REGISTRY.resolve(window_name)
+                    if hwnd:
+                        if DIAGNOSTIC_FOCUS_LOGS:
+                            print(f"  [{window_name}] Attempting topmost fallback for hwnd {hwnd}")
+                        win32gui.SetWindowPos(hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0, win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
+                        time.sleep(0.05)
+                        win32gui.SetWindowPos(hwnd, win32con.HWND_NOTOPMOST, 0, 0, 0, 0, win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
+                        wait_for_foreground(window_name, retry_delay)
+            except Exception as e:
+                if DIAGNOSTIC_FOCUS_LOGS:
+                    print(f"  [{window_name}] Topmost fallback failed: {e}")
+
+        # Small wait before re-checking (ends early on a foreground-change event)
+        wait_for_foreground(window_name, retry_delay)
+        cur_hwnd2, cur_title2 = get_current_foreground_window()
+        if cur_title2 and window_name.lower() in cur_title2.lower():
+            if DIAGNOSTIC_FOCUS_LOGS:
+                print(f"  [{window_name}] Foreground confirmed after focus/fallback on attempt {attempt}")
+            # UI verification
+            if verify_ui:
+                try:
+                    coords = get_coords(window_name)
+                    state = check_play_pause_state(window_name, coords)
+                    if state == 'unknown':
+                        if DIAGNOSTIC_FOCUS_LOGS:
+                            print(f"  [{window_name}] UI verification returned 'unknown' after focus - treating as not verified")
+                        # continue retrying
+                        continue
+                    else:
+                        return True
+                except Exception as e:
+                    if DIAGNOSTIC_FOCUS_LOGS:
+                        print(f"  [{window_name}] UI verification error after focus: {e}")
+                    continue
+            else:
+                return True
+
+    # If we get here, verification failed
+    print(f"  [{window_name}] WARNING: Could not verify window is foreground after {max_attempts} attempts")
+    write_to_log(f"WARNING: Could not focus window '{window_name}' for perk selection")
+    record_focus_abort(window_name, 'ensure_window_foreground', max_attempts)
+    # Set cooldown to avoid repeated immediate attempts
+    failed_focus_until[window_name] = time.time() + FAILED_FOCUS_COOLDOWN
+    return False
+
+
+@TIMINGS.timed('purple')
+def check_purple_backgrounds(window_name, coords, region_keys):
+    """Check several perk backgrounds from a single capture.
+
+    Returns a dict of region key -> (is_purple, sampled_color).
+    """
+    names = [key.replace('_text_region', '_purple') for key in region_keys]
+    colors = {}
+    states = capture_probe_states(window_name, names, coords=coords, colors=colors)
+    results = {}
+    for key, name in zip(region_keys, names):
+        state = states.get(name)
+        if state is None:
+            print(f"  [{window_name}] Could not sample background color")
+            results[key] = (False, None)
+            continue
+        pixel = colors[name][0]
+        r, g, b = pixel
+        print(f"  [{window_name}] {key} background color: RGB({r}, {g}, {b}) | Hex: #{r:02X}{g:02X}{b:02X}")
+        is_purple = state == 'purple'
+        print(f"  [{window_name}] -> {'PURPLE detected' if is_purple else 'Not purple'}")
+        results[key] = (is_purple, pixel)
+    return results
+
+@TIMINGS.timed('purple')
+def is_purple_background(window_name, perk_region):
+    """
+    Check if a perk has a purple background by sampling the background color.
+    Returns a tuple: (is_purple: bool, sampled_color: tuple or None)
+    
+    Purple background: #1F0352 - RGB(31, 3, 82) - dark purple
+    Purple border: #EF17FD - RGB(239, 23, 253) - bright magenta
+    """
+    # Anchor the perk1 probe on whichever region was passed in
+    coords = {'perk1_text_region': perk_region}
+    probe_name = 'perk1_purple'
+    (x1, y1), (x2, y2) = perk_region
+    sample_x = x1 + PERK_BG_SAMPLE_OFFSET[0]
+    sample_y = y1 + PERK_BG_SAMPLE_OFFSET[1]
+    
+    colors = {}
+    state = capture_probe_states(window_name, [probe_name], coords=coords, colors=colors)[probe_name]
+    
+    if state is None:
+        print(f"  [{window_name}] Could not sample background color")
+        return False, None
+    
+    pixel = colors[probe_name][0]
+    r, g, b = pixel
+    print(f"  [{window_name}] Perk background color at ({sample_x}, {sample_y}): RGB({r}, {g}, {b}) | Hex: #{r:02X}{g:02X}{b:02X}")
+    
+    if state == 'purple':
+        print(f"  [{window_name}] -> PURPLE detected")
+        return True, pixel
+    
+    print(f"  [{window_name}] -> Not purple")
+    return False, pixel
+
+def check_play_pause_state(window_name, coords):
+    """
+    Check if the game is paused or running by checking the play/pause button color.
+    """
+    colors = {}
+    state = capture_probe_states(window_name, ['play_pause'], coords=coords, colors=colors)['play_pause']
+    
+    if state is None:
+        return 'unknown'
+    
+    pixel = colors['play_pause'][0]
+    print(f"  [{window_name}] Play/Pause button color: RGB({pixel[0]}, {pixel[1]}, {pixel[2]})")
+    
+    return state
+
+def click_play_pause_raw(window_name, coords=None, force_foreground=False):
+    """Toggle play/pause without state checking.
+
+    Uses the configured actuator: the Ctrl+Shift+U hotkey, or with PLAY_PAUSE_CLICK a click
+    on the play/pause button when the actuator can click but not send that hotkey without
+    focus. force_foreground=True always takes the focus-and-pyautogui hotkey path (used when
+    a background attempt had no effect).
+    """
+    check_failsafe()
+    actuator = FOREGROUND_ACTUATOR if force_foreground else ACTUATOR
+    if (PLAY_PAUSE_CLICK and not actuators.runs_in_background(actuator, 'hotkey', PLAY_PAUSE_HOTKEY)
+            and actuators.runs_in_background(actuator, 'click')):
+        coords = coords or get_coords(window_name)
+        print(f"  [{window_name}] Clicking Play/Pause at {coords['play_pause']} (background)")
+        with TIMINGS.span('click', window_name):
+            delivered = actuator.click(window_name, coords['play_pause'], "Play/Pause")
+    else:
+        if actuators.runs_in_background(actuator, 'hotkey', PLAY_PAUSE_HOTKEY):
+            print(f"  [{window_name}] Sending Ctrl+Shift+U for Play/Pause (background)")
+        with TIMINGS.span('hotkey', window_name):
+            delivered = actuator.hotkey(window_name, PLAY_PAUSE_HOTKEY)
+    if delivered:
+        TIMINGS.sleep(CLICK_DELAY, 'wait:click', window_name)
+    return delivered
+
+def _retry_in_foreground(attempt):
+    """Repeat play/pause attempts take the foreground path, unless the actuator never takes focus."""
+    return attempt > 0 and actuators.may_take_focus(ACTUATOR)
+
+def _foreground_hotkey(window_name, keys):
+    """Focus the window and press a hotkey with pyautogui.
+
+    Robustness: attempt to set the target window to foreground up to
+    MAX_FOCUS_ATTEMPTS times and verify the foreground window before
+    sending the hotkey. If focus cannot be acquired, abort the hotkey
+    to avoid affecting the wrong window.
+    """
+    # Attempt to focus target window with retries
+    focused = False
+    for attempt in range(1, MAX_FOCUS_ATTEMPTS + 1):
+        if DIAGNOSTIC_FOCUS_LOGS:
+            print(f"  [{window_name}] Focus attempt {attempt}/{MAX_FOCUS_ATTEMPTS}...")
+        bring_window_to_focus(window_name)
+        cur_hwnd, cur_title = get_current_foreground_window()
+        if cur_title and window_name.lower() in cur_title.lower():
+            focused = True
+            if DIAGNOSTIC_FOCUS_LOGS:
+                print(f"  [{window_name}] Focus confirmed on attempt {attempt}: hwnd={cur_hwnd}, title='{cur_title}'")
+            # Allow a small settle delay before sending keystroke
+            if FOCUS_SETTLE_DELAY > 0:
+                time.sleep(FOCUS_SETTLE_DELAY)
+            break
+        else:
+            if DIAGNOSTIC_FOCUS_LOGS:
+                print(f"  [{window_name}] Focus not yet acquired (foreground: '{cur_title}'), waiting up to {FOCUS_RETRY_DELAY}s before retrying")
+            wait_for_foreground(window_name, FOCUS_RETRY_DELAY)
+
+    if not focused:
+        print(f"  [{window_name}] WARNING: Could not focus target window after {MAX_FOCUS_ATTEMPTS} attempts; aborting hotkey to avoid affecting wrong window.")
+        record_focus_abort(window_name, 'play_pause_hotkey', MAX_FOCUS_ATTEMPTS)
+        return False
+
+    # Diagnostic: log current foreground before sending hotkey
+    if DIAGNOSTIC_FOCUS_LOGS:
+        cur_hwnd2, cur_title2 = get_current_foreground_window()
+        print(f"  [{window_name}] About to press Ctrl+Shift+U — foreground: hwnd={cur_hwnd2}, title='{cur_title2}'")
+
+    print(f"  [{window_name}] Pressing Ctrl+Shift+U for Play/Pause")
+    pyautogui.hotkey(*keys)
+
+    if DIAGNOSTIC_FOCUS_LOGS:
+        cur_hwnd3, cur_title3 = get_current_foreground_window()
+        print(f"  [{window_name}] After hotkey — foreground: hwnd={cur_hwnd3}, title='{cur_title3}'")
+
+    return True
+
+def ensure_game_paused(window_name, coords, max_attempts=3):
+    """Ensure the game is paused before proceeding."""
+    for attempt in range(max_attempts):
+        state = check_play_pause_state(window_name, coords)
+        
+        if state == 'paused':
+            print(f"  [{window_name}] Game is paused (confirmed)")
+            return True
+        elif state == 'running':
+            print(f"  [{window_name}] Game is running, pressing play/pause... (attempt {attempt + 1})")
+            # A background hotkey that did not take effect is retried through the foreground
+            click_play_pause_raw(window_name, coords, force_foreground=_retry_in_foreground(attempt))
+            TIMINGS.sleep(CLICK_DELAY * 2, 'wait:play_pause', window_name)
+        else:
+            print(f"  [{window_name}] Could not determine state, pressing play/pause... (attempt {attempt + 1})")
+            click_play_pause_raw(window_name, coords, force_foreground=_retry_in_foreground(attempt))
+            TIMINGS.sleep(CLICK_DELAY * 2, 'wait:play_pause', window_name)
+    
+    final_state = check_play_pause_state(window_name, coords)
+    if final_state == 'paused':
+        print(f"  [{window_name}] Game is paused (confirmed)")
+        return True
+    else:
+        print(f"  [{window_name}] WARNING: Could not confirm game is paused")
+        return False
+
+def ensure_game_running(window_name, coords, max_attempts=3):
+    """Ensure the game is running after perk selection."""
+    for attempt in range(max_attempts):
+        state = check_play_pause_state(window_name, coords)
+        
+        if state == 'running':
+            print(f"  [{window_name}] Game is running (confirmed)")
+            return True
+        elif state == 'paused':
+            print(f"  [{window_name}] Game is paused, pressing play/pause... (attempt {attempt + 1})")
+            # A background hotkey that did not take effect is retried through the foreground
+            click_play_pause_raw(window_name, coords, force_foreground=_retry_in_foreground(attempt))
+            TIMINGS.sleep(CLICK_DELAY * 2, 'wait:play_pause', window_name)
+        else:
+            print(f"  [{window_name}] Could not determine state, pressing play/pause... (attempt {attempt + 1})")
+            click_play_pause_raw(window_name, coords, force_foreground=_retry_in_foreground(attempt))
+            TIMINGS.sleep(CLICK_DELAY * 2, 'wait:play_pause', window_name)
+    
+    final_state = check_play_pause_state(window_name, coords)
+    if final_state == 'running':
+        print(f"  [{window_name}] Game is running (confirmed)")
+        return True
+    else:
+        print(f"  [{window_name}] WARNING: Could not confirm game is running")
+        return False
+
+def click_at(window_name, coords, description="", force_foreground=False):
+    """Click at the specified client-area coordinates using the configured actuator."""
+    check_failsafe()
+    actuator = FOREGROUND_ACTUATOR if force_foreground else ACTUATOR
+    if actuators.runs_in_background(actuator, 'click'):
+        print(f"  [{window_name}] Clicking {description} at {coords} (background)")
+    with TIMINGS.span('click', window_name):
+        actuator.click(window_name, coords, description)
+    TIMINGS.sleep(CLICK_DELAY, 'wait:click', window_name)
+
+def _foreground_click(window_name, coords, description=""):
+    """Click at the specified coordinates after focusing window."""
+    bring_window_to_focus(window_name)
+    abs_coords = to_absolute_coords(coords, window_name)
+    x, y = abs_coords
+    print(f"  [{window_name}] Clicking {description} at ({x}, {y})")
+    pyautogui.click(x, y)
+    return True
+
+PLAY_PAUSE_HOTKEY = ('ctrl', 'shift', 'u')
+# Posted messages cannot carry Ctrl+Shift, so with ACTUATOR_MODE = 'message' (or ADB) play/pause
+# is a click on the play/pause button instead of a hotkey that would fall back to taking focus
+PLAY_PAUSE_CLICK = True
+FOREGROUND_ACTUATOR = actuators.ForegroundActuator(_foreground_click, _foreground_hotkey)
+
+# ADB, replay and recording backends and ACTUATOR are created by init()
+ADB_BACKEND = None
+REPLAY_BACKEND = None
+FRAME_RECORDER = None
+
+def build_actuator():
+    """Create the actuator selected by ACTUATOR_MODE, with ADB taps first when configured."""
+    if REPLAY_BACKEND is not None:
+        return actuators.RecordingActuator()
+    actuator = FOREGROUND_ACTUATOR
+    if ACTUATOR_MODE == 'message' and WIN32_SUPPORT:
+        actuator = actuators.FallbackActuator(actuators.MessageActuator(WINDOW_REGISTRY), FOREGROUND_ACTUATOR)
+    if ADB_BACKEND is not None:
+        # Windows without an ADB instance (and emulator hotkeys) fall through to the next actuator
+        actuator = actuators.FallbackActuator(ADB_BACKEND, actuator)
+    return actuator
+
+ACTUATOR = None
+
+def correct_perk_text(text, window_name=None, is_purple=False):
+    """Apply simple fuzzy corrections to OCR text using a small dictionary and fuzzy matching.
+
+    - Tokenizes text and attempts to correct each token by matching against a list of known keywords.
+    - Preserves tokens that already match.
+    - Returns corrected text.
+    """
+    try:
+        import difflib
+        text_lower = text.lower()
+        tokens = text_lower.split()
+        # Known words/keywords to prefer
+        keywords = [
+            'free','upgrade','chance','for','all','max','health','enemies','damage','tower','damage',
+            'cash','coins','coin','per','wave','boss','health','game','speed','chrono','field','golden','tower',
+            'death','spotlight','black','hole','poison','swamp','radius','defense','percent','interest','orbs',
+            'bounce','shot','land','mine','chain','lightning','smart','missiles','inner','life','steal','enemies','speed'
+        ]
+        corrected = []
+        for t in tokens:
+            # If it's short (like 'x1.80' or '1.80') keep it
+            if re.match(r"^x?\d+(?:\.\d+)?%?$", t):
+                corrected.append(t)
+                continue
+            # If exact match in keywords, keep
+            if t in keywords:
+                corrected.append(t)
+                continue
+            # Try close matches
+            match = difflib.get_close_matches(t, keywords, n=1, cutoff=0.75)
+            if match:
+                corrected.append(match[0])
+            else:
+                # As a last resort, keep original token
+                corrected.append(t)
+        # Rebuild and do a few phrase corrections
+        result = ' '.join(corrected)
+        # Common phrase corrections
+        result = re.sub(r'free upgrade chance', 'free upgrade chance', result)
+        result = re.sub(r'upgrade chance for all', 'upgrade chance for all', result)
+        result = re.sub(r'enemies damage', 'enemies damage', result)
+        result = re.sub(r'tower damage', 'tower damage', result)
+        return result
+    except Exception:
+        return text
+
+
+def get_text_from_region(window_name, region, save_debug_image=True, is_perk=False, region_label=None, ocr_info=None):
+    """Capture a region and extract text using OCR.
+
+    If is_perk=True, apply enhanced preprocessing and multiple OCR variants to improve recognition for perk text.
+    If ocr_info is a dict it receives the chosen variant, the raw OCR text and the elapsed time in ms.
+    With region_label set, the crop and the image OCR read are kept for save_debug_artifacts(),
+    which saves them side by side as debug_<window>_<label>_*.png.
+    """
+    check_failsafe()
+    ocr_started = time.time()
+    screenshot = capture_window_screenshot(window_name, region)
+    if screenshot is None:
+        print(f"  [{window_name}] Warning: Could not capture region for OCR")
+        return ""
+    # Keep the raw crop in the per-window ring buffer; images are only composited and saved when triggered
+    if save_debug_image and window_name:
+        DEBUG_ARTIFACTS.add_crop(window_name, 'perks' if is_perk else 'new_perk_region', screenshot)
+    # Preprocess: grayscale, threshold, sharpen (same as New Perk bar)
+    # For Daddy and Maximus, use grayscale only, no thresholding
+    # If this is a perk text region, use enhanced preprocessing and multiple OCR variants
+    if is_perk and screenshot is not None:
+        def _ocr_variants(img):
+            """Run OCR on multiple preprocessed variants and choose the best result.
+
+            Strategy:
+            - Generate resized, contrast-enhanced, sharpened, inverted, and thresholded variants
+            - Run pytesseract on each variant with a reasonable psm/oem
+            - For each variant compute average confidence and check if it maps to a known perk (using get_perk_priority)
+            - Prefer variants that map to a known perk (priority != 9999), choosing the lowest priority (best perk). Otherwise pick the highest average confidence.
+            """
+            variants = []
+            preprocess_started = time.perf_counter()
+            try:
+                w, h = img.size
+                # Resize for better OCR
+                resized = img.resize((max(1, w*2), max(1, h*2)), Image.LANCZOS)
+                gray = resized.convert('L')
+                # Basic enhancement
+                enh = ImageEnhance.Contrast(gray).enhance(1.6)
+                sharp = enh.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=2))
+                ac = ImageOps.autocontrast(sharp)
+                inv = ImageOps.invert(ac)
+
+                variants.append(('orig', img))
+                variants.append(('gray', gray))
+                variants.append(('enh', enh))
+                variants.append(('sharp', sharp))
+                variants.append(('autocontrast', ac))
+                variants.append(('invert', inv))
+
+                # Add thresholded variants
+                for t in (120, 140, 160):
+                    thr = ac.point(lambda p, th=t: 255 if p > th else 0)
+                    variants.append((f'th_{t}', thr))
+
+                # Add color-channel variants from the resized image
+                try:
+                    r,g,b = resized.split()
+                    variants.append(('r', r))
+                    variants.append(('g', g))
+                    variants.append(('b', b))
+                except Exception:
+                    pass
+            except Exception:
+                variants = [('orig', img)]
+            TIMINGS.record('preprocess', time.perf_counter() - preprocess_started, window_name)
+
+            results = []
+            cfg = "--psm 6 --oem 3"
+            for name, var in variants:
+                variant_started = time.perf_counter()
+                try:
+                    METRICS.inc('perk_ocr_calls_total', window=window_name, kind='perk')
+                    with TIMINGS.span(f'ocr:{name}', window_name):
+                        data = OCR_POOL.image_to_data(var, window_name, output_type=pytesseract.Output.DICT, config=cfg)
+                    words = [w for w in data.get('text', []) if w and w.strip()]
+                    confs = [int(c) for c in data.get('conf', []) if c.strip() and c != '-1']
+                    avg_conf = sum(confs)/len(confs) if confs else -1
+                    text = ' '.join(words).strip()
+                except Exception:
+                    try:
+                        text = OCR_POOL.image_to_string(var, window_name, config=cfg)
+                        # No confidences available
+                        avg_conf = -1
+                    except Exception:
+                        text = ''
+                        avg_conf = -1
+                variant_ms = (time.perf_counter() - variant_started) * 1000
+                # Evaluate mapping to known perk priority
+                with TIMINGS.span('match', window_name):
+                    pr = get_perk_priority(text, window_name)
+                results.append((name, text, avg_conf, pr, variant_ms))
+
+            # Prefer a variant that maps to a known perk (lower priority number is better)
+            mapped = [r for r in results if r[3] != 9999]
+            if mapped:
+                # choose with lowest priority, tie-breaker highest avg_conf
+                mapped.sort(key=lambda x: (x[3], -x[2] if x[2] != -1 else float('inf')))
+                best = mapped[0]
+            else:
+                # Otherwise choose highest average confidence
+                results.sort(key=lambda x: (-x[2], x[0]))
+                best = results[0]
+            # best is tuple: (name, text, avg_conf, pr, ms)
+            if PROFILE_OCR_VARIANTS:
+                OCR_PROFILER.record_card(window_name, results, best[0])
+            # Find the corresponding image for the best name
+            best_name = best[0]
+            best_img = None
+            for name, var in variants:
+                if name == best_name:
+                    best_img = var
+                    break
+            return best[1], best_img, best_name
+
+        try:
+            text, chosen_img, chosen_name = _ocr_variants(screenshot)
+            # Basic cleanup
+            text = re.sub(r"[^\x00-\x7F]+", "", text)
+            text = ' '.join(text.split())
+            print(f"  [{window_name}] OCR (variants) read: '{text}' (variant: {chosen_name})")
+
+            # Check background color before applying corrections
+            try:
+                is_purple, bg_color = is_purple_background(window_name, region)
+            except Exception:
+                is_purple, bg_color = False, None
+            print(f"  [{window_name}] Perk background purple: {is_purple}, sampled color: {bg_color}")
+
+            # Apply fuzzy corrections using known keywords
+            with TIMINGS.span('correct', window_name):
+                corrected = correct_perk_text(text, window_name=window_name, is_purple=is_purple)
+            print(f"  [{window_name}] OCR corrected to: '{corrected}'")
+            if ocr_info is not None:
+                ocr_info.update(variant=chosen_name, raw_text=text, ms=round((time.time() - ocr_started) * 1000, 1))
+
+            # Keep original + processed variant for a side-by-side image if something triggers one
+            if SAVE_DEBUG_IMAGES and region_label:
+                DEBUG_ARTIFACTS.add_compare(window_name, region_label, screenshot, chosen_img)
+
+            return corrected
+        except Exception as e:
+            print(f"  [{window_name}] OCR variants failed: {e}")
+            save_debug_artifacts(window_name, reason="ocr_error")
+            # Fallback to simple OCR if variants fail
+            img = screenshot.convert('L')
+    threshold = get_window_profile(window_name)['bar_threshold']
+    img = screenshot.convert('L')
+    if threshold is not None:
+        img = img.point(lambda x: 0 if x < threshold else 255, '1')
+    METRICS.inc('perk_ocr_calls_total', window=window_name, kind='bar')
+    with TIMINGS.span('ocr:bar', window_name):
+        text = OCR_POOL.image_to_string(img, window_name, config='--psm 7')
+    if SAVE_DEBUG_IMAGES and region_label:
+        DEBUG_ARTIFACTS.add_compare(window_name, region_label, screenshot, img)
+    # Extra cleaning: remove non-ascii, collapse whitespace
+    import re
+    if text is None:
+        text = ""
+    text = re.sub(r'[^\x00-\x7F]+', '', text)
+    text = ' '.join(text.split())
+    return text
+
+@TIMINGS.timed('select_best_perk')
+def select_best_perk(window_name, coords):
+    """Read both perk options and click the better one.
+    
+    Purple background perks are deprioritized unless:
+    - The perk is Priority 1 (exempt from purple penalty)
+    - Both perks have purple backgrounds (no choice)
+    """
+    global SKIP_NEW_PERK_BAR_UNTIL_NUMBERS
+    started = time.time()
+    ocr_infos = [{}, {}, {}]
+    # Read top two options always (use enhanced OCR for perk text)
+    perk1_text = get_text_from_region(window_name, coords['perk1_text_region'], is_perk=True,
+                                      region_label='perk1', ocr_info=ocr_infos[0])
+    perk2_text = get_text_from_region(window_name, coords['perk2_text_region'], is_perk=True,
+                                      region_label='perk2', ocr_info=ocr_infos[1])
+
+    # Optionally read third perk region if the window's profile has three cards (Maximus and Daddy)
+    has_third = get_window_profile(window_name)['cards'] >= 3 and 'perk3_text_region' in coords and 'perk_option_3' in coords
+    perk3_text = None
+    if has_third:
+        perk3_text = get_text_from_region(window_name, coords['perk3_text_region'], is_perk=True,
+                                          region_label='perk3', ocr_info=ocr_infos[2])
+    ocr_done = time.time()
+
+    print(f"  [{window_name}] Perk 1: {perk1_text[:50]}..." if len(perk1_text) > 50 else f"  [{window_name}] Perk 1: {perk1_text}")
+    print(f"  [{window_name}] Perk 2: {perk2_text[:50]}..." if len(perk2_text) > 50 else f"  [{window_name}] Perk 2: {perk2_text}")
+    if has_third:
+        print(f"  [{window_name}] Perk 3: {perk3_text[:50]}..." if len(perk3_text) > 50 else f"  [{window_name}] Perk 3: {perk3_text}")
+
+    # Pass window_name to get_perk_priority for alternate list support
+    priority1 = get_perk_priority(perk1_text, window_name)
+    priority2 = get_perk_priority(perk2_text, window_name)
+    priority3 = get_perk_priority(perk3_text, window_name) if has_third else None
+
+    # Snapshot of the offered cards from the crops just read (no extra captures)
+    card_count = 3 if has_third else 2
+    if 9999 in (priority1, priority2, priority3):
+        save_debug_artifacts(window_name, reason="unrecognized", perk_count=card_count)
+    elif has_third:
+        DEBUG_ARTIFACTS.trigger_stack(window_name, 'perks', card_count, 'perks')
+
+    # Determine which perk list was used
+    perk_list_name = get_window_profile(window_name)['perk_list']
+
+    print(f"  [{window_name}] Priority 1: {priority1}, Priority 2: {priority2}" + (f", Priority 3: {priority3}" if has_third else ""))
+
+    # Check for purple backgrounds of all cards from one capture (tuple: (is_purple, color))
+    print(f"  [{window_name}] Checking perk backgrounds...")
+    region_keys = ['perk1_text_region', 'perk2_text_region'] + (['perk3_text_region'] if has_third else [])
+    backgrounds = check_purple_backgrounds(window_name, coords, region_keys)
+    perk1_is_purple, perk1_bg_color = backgrounds['perk1_text_region']
+    perk2_is_purple, perk2_bg_color = backgrounds['perk2_text_region']
+    perk3_is_purple = False
+    perk3_bg_color = None
+    if has_third:
+        perk3_is_purple, perk3_bg_color = backgrounds['perk3_text_region']
+    background_done = time.time()
+
+    # List of keywords for acceptable purple perks
+    ACCEPTABLE_PURPLE_KEYWORDS = [
+        ["cash per wave"],
+        ["boss health"],
+        ["tower damage", "bosses"]
+    ]
+
+    def is_acceptable_purple(perk_text):
+        if not perk_text:
+            return False
+        text = perk_text.lower()
+        for keywords in ACCEPTABLE_PURPLE_KEYWORDS:
+            if all(k in text for k in keywords):
+                return True
+        return False
+
+    effective_priority1 = priority1
+    effective_priority2 = priority2
+    effective_priority3 = priority3 if has_third else None
+    PURPLE_PENALTY = 10000
+
+    def journal(selected):
+        """Record this decision in the JSONL journal and history store (reads the current effective priorities)."""
+        texts = [perk1_text, perk2_text, perk3_text]
+        bases = [priority1, priority2, priority3]
+        effectives = [effective_priority1, effective_priority2, effective_priority3]
+        purples = [perk1_is_purple, perk2_is_purple, perk3_is_purple]
+        bg_colors = [perk1_bg_color, perk2_bg_color, perk3_bg_color]
+        cards = []
+        for i in range(3 if has_third else 2):
+            cards.append({
+                'text': texts[i], 'priority': bases[i], 'effective_priority': effectives[i],
+                'purple': purples[i], 'bg_color': bg_colors[i],
+                'ocr_variant': ocr_infos[i].get('variant'), 'ocr_raw': ocr_infos[i].get('raw_text'),
+                'ocr_ms': ocr_infos[i].get('ms'),
+            })
+        timings = {
+            'ocr_ms': round((ocr_done - started) * 1000, 1),
+            'background_ms': round((background_done - ocr_done) * 1000, 1),
+            'total_ms': round((time.time() - started) * 1000, 1),
+        }
+        log_decision(window_name, perk_list_name, cards, selected, timings)
+        for card in cards:
+            card['perk_id'] = get_perk_id(card['priority'], window_name)
+        HISTORY_STORE.record_decision(window_name, cards, selected)
+        if isinstance(selected, int):
+            METRICS.inc('perk_selected_total', window=window_name, priority=str(bases[selected - 1]))
+        else:
+            reason = str(selected).split(' - ', 1)[-1].lower().replace(' ', '_')
+            METRICS.inc('perk_skipped_total', window=window_name, reason=reason)
+
+    # If all available perks are purple
+    if has_third:
+        if perk1_is_purple and perk2_is_purple and perk3_is_purple:
+            perk1_ok = is_acceptable_purple(perk1_text)
+            perk2_ok = is_acceptable_purple(perk2_text)
+            perk3_ok = is_acceptable_purple(perk3_text)
+            if not (perk1_ok or perk2_ok or perk3_ok):
+                print(f"  [{window_name}] All three perks are purple and none acceptable. Skipping selection and closing window.")
+                log_perk_selection_three(window_name, perk1_text, priority1, perk2_text, priority2, perk3_text, priority3, "NONE - ALL PURPLE",
+                                         perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple, perk3_is_purple=perk3_is_purple,
+                                         effective_priority1=effective_priority1, effective_priority2=effective_priority2, effective_priority3=effective_priority3,
+                                         perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color, perk3_bg_color=perk3_bg_color,
+                                         perk_list_name=perk_list_name, selected_note=None)
+                journal("NONE - ALL PURPLE")
+                click_at(window_name, coords['close_x'], "Close X (skip purple perks)")
+                time.sleep(0.5)
+                click_at(window_name, coords['play_pause'], "Resume Game (skip purple perks)")
+                time.sleep(0.5)
+                globals()['SKIP_NEW_PERK_BAR_UNTIL_NUMBERS'] = True
+                return False
+    else:
+        # Two-perk case: original behavior
+        if perk1_is_purple and perk2_is_purple:
+            perk1_ok = is_acceptable_purple(perk1_text)
+            perk2_ok = is_acceptable_purple(perk2_text)
+            if not perk1_ok and not perk2_ok:
+                print(f"  [{window_name}] Both perks are purple and neither is acceptable. Skipping selection and closing window.")
+                log_perk_selection(window_name, perk1_text, priority1, perk2_text, priority2, "NONE - BOTH PURPLE",
+                                  perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple,
+                                  effective_priority1=effective_priority1, effective_priority2=effective_priority2,
+                                  perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color,
+                                  perk_list_name=perk_list_name)
+                journal("NONE - BOTH PURPLE")
+                click_at(window_name, coords['close_x'], "Close X (skip purple perks)")
+                time.sleep(0.5)
+                click_at(window_name, coords['play_pause'], "Resume Game (skip purple perks)")
+                time.sleep(0.5)
+                globals()['SKIP_NEW_PERK_BAR_UNTIL_NUMBERS'] = True
+                return False
+
+    # Apply purple penalty (add large penalty to deprioritize)
+    if perk1_is_purple and priority1 != PURPLE_EXEMPT_PRIORITY and not is_acceptable_purple(perk1_text):
+        print(f"  [{window_name}] Perk 1 has PURPLE background - applying penalty")
+        effective_priority1 = priority1 + PURPLE_PENALTY
+
+    if perk2_is_purple and priority2 != PURPLE_EXEMPT_PRIORITY and not is_acceptable_purple(perk2_text):
+        print(f"  [{window_name}] Perk 2 has PURPLE background - applying penalty")
+        effective_priority2 = priority2 + PURPLE_PENALTY
+
+    if has_third and perk3_is_purple and priority3 != PURPLE_EXEMPT_PRIORITY and not is_acceptable_purple(perk3_text):
+        print(f"  [{window_name}] Perk 3 has PURPLE background - applying penalty")
+        effective_priority3 = priority3 + PURPLE_PENALTY
+
+    print(f"  [{window_name}] Effective Priority 1: {effective_priority1}, Effective Priority 2: {effective_priority2}" + (f", Effective Priority 3: {effective_priority3}" if has_third else ""))
+
+    # If none recognized
+    if priority1 == 9999 and priority2 == 9999 and (not has_third or priority3 == 9999):
+        print(f"  [{window_name}] WARNING: No perk recognized!")
+        if has_third:
+            log_perk_selection_three(window_name, perk1_text, priority1, perk2_text, priority2, perk3_text, priority3, "NONE - UNRECOGNIZED",
+                                     perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple, perk3_is_purple=perk3_is_purple,
+                                     effective_priority1=effective_priority1, effective_priority2=effective_priority2, effective_priority3=effective_priority3,
+                                     perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color, perk3_bg_color=perk3_bg_color,
+                                     perk_list_name=perk_list_name, selected_note=None)
+            journal("NONE - UNRECOGNIZED")
+        else:
+            log_perk_selection(window_name, perk1_text, priority1, perk2_text, priority2, "NONE - UNRECOGNIZED",
+                              perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple,
+                              effective_priority1=effective_priority1, effective_priority2=effective_priority2,
+                              perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color,
+                              perk_list_name=perk_list_name)
+            journal("NONE - UNRECOGNIZED")
+        return False
+
+    # Choose the minimal effective priority
+    if has_third:
+        # Build list and pick first occurrence of minimal value
+        effs = [effective_priority1, effective_priority2, effective_priority3]
+        min_val = min(effs)
+        selected_index = effs.index(min_val) + 1
+        # Determine purple note (exempt if base priority equals PURPLE_EXEMPT_PRIORITY)
+        base_priorities = [priority1, priority2, priority3]
+        is_purples = [perk1_is_purple, perk2_is_purple, perk3_is_purple]
+        sel_base = base_priorities[selected_index-1]
+        sel_is_purple = is_purples[selected_index-1]
+        purple_note = " (purple but exempt)" if sel_is_purple and sel_base == PURPLE_EXEMPT_PRIORITY else ""
+        print(f"  [{window_name}] Selecting Perk {selected_index} (priority {base_priorities[selected_index-1]}){purple_note}")
+        # Log and click
+        log_perk_selection_three(window_name, perk1_text, priority1, perk2_text, priority2, perk3_text, priority3, selected_index,
+                                 perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple, perk3_is_purple=perk3_is_purple,
+                                 effective_priority1=effective_priority1, effective_priority2=effective_priority2, effective_priority3=effective_priority3,
+                                 perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color, perk3_bg_color=perk3_bg_color,
+                                 perk_list_name=perk_list_name, selected_note=purple_note)
+        journal(selected_index)
+        # Click the selected option
+        if selected_index == 1:
+            click_at(window_name, coords['perk_option_1'], "Perk Option 1")
+        elif selected_index == 2:
+            click_at(window_name, coords['perk_option_2'], "Perk Option 2")
+        else:
+            click_at(window_name, coords['perk_option_3'], "Perk Option 3")
+    else:
+        # Two-option selection (preserve previous behavior)
+        if effective_priority1 <= effective_priority2:
+            purple_note = " (purple but exempt)" if perk1_is_purple and priority1 == PURPLE_EXEMPT_PRIORITY else ""
+            purple_note = " (purple but other is worse)" if perk1_is_purple and perk2_is_purple else purple_note
+            print(f"  [{window_name}] Selecting Perk 1 (priority {priority1}){purple_note}")
+            log_perk_selection(window_name, perk1_text, priority1, perk2_text, priority2, 1,
+                              perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple,
+                              effective_priority1=effective_priority1, effective_priority2=effective_priority2,
+                              perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color,
+                              perk_list_name=perk_list_name)
+            journal(1)
+            click_at(window_name, coords['perk_option_1'], "Perk Option 1")
+        else:
+            purple_note = " (purple but exempt)" if perk2_is_purple and priority2 == PURPLE_EXEMPT_PRIORITY else ""
+            purple_note = " (purple but other is worse)" if perk1_is_purple and perk2_is_purple else purple_note
+            print(f"  [{window_name}] Selecting Perk 2 (priority {priority2}){purple_note}")
+            log_perk_selection(window_name, perk1_text, priority1, perk2_text, priority2, 2,
+                              perk1_is_purple=perk1_is_purple, perk2_is_purple=perk2_is_purple,
+                              effective_priority1=effective_priority1, effective_priority2=effective_priority2,
+                              perk1_bg_color=perk1_bg_color, perk2_bg_color=perk2_bg_color,
+                              perk_list_name=perk_list_name)
+            journal(2)
+            click_at(window_name, coords['perk_option_2'], "Perk Option 2")
+
+    return True
+
+def get_current_foreground_window():
+    """Get the handle and title of the currently active foreground window."""
+    if not WIN32_SUPPORT:
+        return None, None
+    
+    try:
+        # Always read the real foreground window; the hook-tracked value may be stale
+        if WINDOW_REGISTRY is not None:
+            hwnd = WINDOW_REGISTRY.refresh_foreground()
+        else:
+            hwnd = win32gui.GetForegroundWindow()
+        if hwnd:
+            title = win32gui.GetWindowText(hwnd)
+            return hwnd, title
+        return None, None
+    except Exception as e:
+        print(f"  Error getting foreground window: {e}")
+        return None, None
+
+def restore_foreground_window(hwnd, title):
+    """Restore a previously saved window to the foreground."""
+    if not WIN32_SUPPORT or hwnd is None:
+        return False
+    
+    try:
+        # Check if window still exists
+        if not win32gui.IsWindow(hwnd):
+            print(f"  Previous window no longer exists: '{title}'")
+            return False
+        
+        # Restore if minimized
+        if win32gui.IsIconic(hwnd):
+            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+        
+        # Bring to foreground
+        win32gui.SetForegroundWindow(hwnd)
+        print(f"  Restored previous window: '{title}'")
+        return True
+    except Exception as e:
+        print(f"  Error restoring window '{title}': {e}")
+        return False
+
+@TIMINGS.timed('perk_selection')
+def handle_perk_selection(window_name):
+    """Handle the complete perk selection process for a window."""
+    
+    # Clicks through a background actuator need no focus, so there is nothing to verify first
+    needs_focus = not actuators.runs_in_background(ACTUATOR, 'click')
+    
+    # Save the current foreground window so we can restore it later, whenever any action
+    # may still take focus (a foreground actuator, or a fallback to one)
+    saved_hwnd, saved_title = (get_current_foreground_window() if actuators.may_take_focus(ACTUATOR)
+                               else (None, None))
+    if saved_title:
+        print(f"  Saving current window: '{saved_title}'")
+    
+    coords = get_coords(window_name)
+    
+    print(f">>> [{window_name}] NEW PERK DETECTED! <<<")
+    
+    print(f"  [{window_name}] Step 1: Ensuring game is paused...")
+    ensure_game_paused(window_name, coords)
+    paused_since = time.time()
+    perks_handled = 0
+    
+    # Loop to select all available perks
+    while True:
+        print(f"  [{window_name}] Step 2: Ensuring window is foreground and opening perk window...")
+        # Verify and attempt to switch to the game window on each iteration (retry loop)
+        attempt = 0
+        max_attempts = NEW_PERK_FOREGROUND_ATTEMPTS if needs_focus else 0
+        while attempt < max_attempts:
+            attempt += 1
+            if ensure_window_foreground(window_name, max_attempts=1, retry_delay=0.05, verify_ui=True):
+                if DIAGNOSTIC_FOCUS_LOGS:
+                    print(f"  [{window_name}] Foreground verification succeeded on attempt {attempt}/{max_attempts}")
+                break
+            else:
+                print(f"  [{window_name}] Foreground verification attempt {attempt}/{max_attempts} failed; retrying in {NEW_PERK_FOREGROUND_RETRY_DELAY}s...")
+                wait_for_foreground(window_name, NEW_PERK_FOREGROUND_RETRY_DELAY)
+        if needs_focus and attempt >= max_attempts:
+            print(f"  [{window_name}] Aborting perk selection - could not focus/verify window after {max_attempts} attempts. Restoring previous window.")
+            write_to_log(f"Aborted perk selection on {window_name}: could not verify foreground after {max_attempts} attempts")
+            record_focus_abort(window_name, 'perk_selection', max_attempts)
+            if saved_hwnd:
+                restore_foreground_window(saved_hwnd, saved_title)
+            return
+
+        # At this point the target window is foreground and UI verified
+        click_at(window_name, coords['new_perk_bar'], "New Perk Bar")
+        TIMINGS.sleep(WINDOW_OPEN_WAIT, 'wait:open', window_name)
+        # Re-ensure the game is still paused in case someone toggled it while we switched windows
+        print(f"  [{window_name}] Verifying game is paused after opening perk window...")
+        ensure_game_paused(window_name, coords)
+        
+        print(f"  [{window_name}] Step 3: Selecting best perk...")
+        coords = get_coords(window_name)
+        perk_selected = select_best_perk(window_name, coords)
+        perks_handled += 1
+        
+        if perk_selected:
+            TIMINGS.sleep(WINDOW_CLOSE_WAIT, 'wait:close', window_name)
+        
+        print(f"  [{window_name}] Step 4: Closing perk window...")
+        click_at(window_name, coords['close_x'], "Close X")
+        TIMINGS.sleep(WINDOW_CLOSE_WAIT, 'wait:close', window_name)
+        
+        print(f"  [{window_name}] Step 5: Checking if more perks available...")
+        coords = get_coords(window_name)
+        if check_for_new_perk(window_name, coords):
+            print(f"  [{window_name}] More perks available! Selecting another...")
+        else:
+            print(f"  [{window_name}] No more perks available.")
+            break
+    
+    print(f"  [{window_name}] Step 6: Ensuring game is running...")
+    ensure_game_running(window_name, coords)
+    paused = time.time() - paused_since
+    METRICS.inc('perk_game_paused_seconds_total', paused, window=window_name)
+    TIMINGS.record('paused_per_perk', paused / max(1, perks_handled), window_name)
+    
+    print(f">>> [{window_name}] Perk selection complete! <<<")
+    
+    # Restore the previous foreground window
+    if saved_hwnd:
+        print(f"  [{window_name}] Step 7: Restoring previous window...")
+        TIMINGS.sleep(0.3, 'wait:restore', window_name)  # Brief pause before switching back
+        restore_foreground_window(saved_hwnd, saved_title)
+    
+    print()
+
+perk_selection_threads = {}
+
+def is_perk_selection_running(window_name):
+    """True if a background perk selection thread is still working on this window."""
+    thread = perk_selection_threads.get(window_name)
+    return thread is not None and thread.is_alive()
+
+def start_perk_selection(window_name):
+    """Run handle_perk_selection, on its own thread when the actuator does not need focus."""
+    if not (actuators.runs_in_background(ACTUATOR, 'click') and PARALLEL_PERK_SELECTION):
+        handle_perk_selection(window_name)
+        return
+    if is_perk_selection_running(window_name):
+        print(f"  [{window_name}] Perk selection already in progress")
+        return
+
+    def run():
+        try:
+            handle_perk_selection(window_name)
+        except Exception as e:
+            print(f"  [{window_name}] Perk selection stopped: {e}")
+
+    thread = threading.Thread(target=run, name=f"perk-{window_name}", daemon=True)
+    perk_selection_threads[window_name] = thread
+    thread.start()
+
+def check_window(window_name):
+    """Check a single window for new perks and handle if found."""
+    window = get_target_window(window_name)
+    if not window:
+        return False
+    
+    coords = get_coords(window_name)
+    
+    if check_for_new_perk(window_name, coords):
+        start_perk_selection(window_name)
+        return True
+    
+    return False
+
+def handle_wave_1_detected(window_name):
+    """Handle when wave 1 is detected - bring window to focus, then switch back after 10 seconds."""
+    # Save the current foreground window
+    saved_hwnd, saved_title = get_current_foreground_window()
+    if saved_title:
+        print(f"  Saving current window: '{saved_title}'")
+    
+    print(f"\n{'!'*60}")
+    print(f"  WAVE 1 DETECTED ON: {window_name}")
+    print(f"  Bringing window to focus...")
+    print(f"{'!'*60}\n")
+    
+    # Log the event
+    write_to_log(f"WAVE 1 DETECTED on {window_name} - bringing to focus")
+    HISTORY_STORE.record_wave1(window_name)
+    
+    # Bring the window to focus
+    bring_window_to_focus(window_name)
+    
+    # Start a thread to restore the original window after 10 seconds
+    if saved_hwnd:
+        def restore_after_delay():
+            time.sleep(10)
+            print(f"  Restoring previous window after 10 seconds...")
+            restore_foreground_window(saved_hwnd, saved_title)
+        
+        threading.Thread(target=restore_after_delay, daemon=True).start()
+
+# Seconds a window is skipped after its check raised an error; the other windows keep going
+WINDOW_ERROR_BACKOFF = 5
+window_error_until = {}
+
+def check_all_windows():
+    """One main-loop pass: check every enabled window for wave 1 and new perks.
+
+    An error in one window's check only pauses that window for WINDOW_ERROR_BACKOFF seconds.
+    """
+    for window_name in WINDOWS:
+        check_failsafe()
+        if is_perk_selection_running(window_name) or time.time() < window_error_until.get(window_name, 0):
+            continue
+        try:
+            check_window_tick(window_name)
+        except Exception as e:
+            if "FAILSAFE" in str(e):
+                raise
+            print(f"  [{window_name}] ERROR: {e} - skipping this window for {WINDOW_ERROR_BACKOFF}s")
+            write_to_log(f"Error checking {window_name}: {e}")
+            METRICS.inc('perk_window_errors_total', window=window_name)
+            window_error_until[window_name] = time.time() + WINDOW_ERROR_BACKOFF
+
+def check_window_tick(window_name):
+    """Main-loop check of one window: wave 1 detection and new perk handling."""
+    window = get_target_window(window_name)
+    if not window:
+        return
+    METRICS.inc('perk_ticks_total', window=window_name)
+    check_layout_anchors(window_name)
+    # The ad probe and both bar reads share one capture of just those regions
+    with planned_capture(window_name, 'idle'):
+        coords = get_coords(window_name)
+        # Check for wave 1 using New Perk bar
+        print(f"[{window_name}] Checking for Wave 1 using New Perk bar...")
+        perk_bar_text = get_text_from_region(window_name, coords['new_perk_region'], region_label='wave_bar')
+        perk_bar_text_clean = perk_bar_text.strip().lower().replace('|', '').replace(' ', '')
+        print(f"  [{window_name}] Perk bar OCR (for wave): '{perk_bar_text}'")
+        import re
+        match = re.match(r'^1/\d+', perk_bar_text_clean)
+        if match and (window_name not in last_wave1_times or time.time() - last_wave1_times[window_name] > 30):
+            print(f"  [{window_name}] >>> WAVE 1 DETECTED! <<<")
+            handle_wave_1_detected(window_name)
+            last_wave1_times[window_name] = time.time()
+        # Check for new perk
+        print(f"[{window_name}] Checking for New Perk...")
+        perk_text = get_text_from_region(window_name, coords['new_perk_region'], region_label='new_perk_bar')
+    perk_text_lower = perk_text.strip().lower()
+    print(f"  [{window_name}] Perk bar OCR: '{perk_text_lower}'")
+    if "new perk" in perk_text_lower or "perk" in perk_text_lower:
+        print(f"  [{window_name}] New Perk detected!")
+        start_perk_selection(window_name)
+    else:
+        print(f"  [{window_name}] No new perk available.")
+
+def print_startup_report():
+    """Print import time, time to the first capture and the modules imported on demand so far."""
+    line = f"Startup: imports {IMPORT_SECONDS * 1000:.0f} ms"
+    if FIRST_CAPTURE_SECONDS is not None:
+        line += f", first capture at {FIRST_CAPTURE_SECONDS * 1000:.0f} ms"
+    print(line + " (from the start of the automator's imports)")
+    if lazy_imports.IMPORT_TIMES:
+        print("Deferred imports: " + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                              for name, seconds in lazy_imports.IMPORT_TIMES.items()))
+
+def main_loop(show_gui=True, start_delay=None):
+    """Main automation loop.
+
+    show_gui=False skips the tkinter window selector and monitors WINDOWS as configured;
+    start_delay overrides STARTUP_DELAY, which only applies when the selector is shown.
+    """
+    global last_wave1_times
+    init()
+    print("=" * 60)
+    print("Tower Idle Defense - Perk Automator v5 (Combined)")
+    print("=" * 60)
+    print()
+    
+    # Clear and recreate log files at startup
+    initialize_log_files()
+    print()
+    
+    # Log startup
+    write_to_log("=" * 70)
+    write_to_log("PERK AUTOMATOR STARTED")
+    write_to_log("=" * 70)
+    
+    # Check all windows
+    if DPI_AWARENESS:
+        print(f"DPI awareness: {DPI_AWARENESS}")
+    print("Configured windows:")
+    for window_name in WINDOWS:
+        window = get_target_window(window_name)
+        if window:
+            _, _, client_width, client_height = window_registry.client_geometry(window)
+            scale_x, scale_y = get_window_scale(window_name)
+            print(f"  ✓ {window_name}: Position ({window.left}, {window.top}), Size {window.width}x{window.height}, "
+                  f"client {client_width}x{client_height}, layout scale {scale_x:.3g}x{scale_y:.3g}")
+            write_to_log(f"Window found: {window_name} at ({window.left}, {window.top})")
+        else:
+            print(f"  ✗ {window_name}: NOT FOUND")
+            write_to_log(f"Window NOT found: {window_name}")
+    
+    print()
+    print(f"Log file: {os.path.abspath(LOG_FILE)}")
+    print()
+    print("TO STOP: Move mouse to ANY corner of the screen")
+    print("         OR press Ctrl+C in this window")
+    print()
+    print("Features enabled:")
+    print("  - Auto perk selection")
+    print("  - Purple background detection")
+    print("  - Wave 1 detection (will bring window to focus)")
+    print()
+    if start_delay is None:
+        start_delay = STARTUP_DELAY if show_gui and TKINTER_AVAILABLE else 0
+    if start_delay > 0:
+        print(f"Starting in {start_delay:g} seconds...")
+        print()
+        time.sleep(start_delay)
+    
+    start_window_events()
+
+    # Show a simple GUI to allow toggling which windows to monitor
+    if not show_gui:
+        print(f"Window selector skipped — monitoring: {', '.join(WINDOWS) or '(none)'}")
+    elif TKINTER_AVAILABLE:
+        try:
+            def show_window_selector():
+                root = tk.Tk()
+                root.title("Perk Automator - Window Selector")
+
+                tk.Label(root, text="Select windows to enable for perk selection:").pack(padx=10, pady=(10, 0))
+
+                vars = {}
+                # Show each configured window with a checkbox
+                for name in list(WINDOWS):
+                    found = False
+                    try:
+                        if WINDOW_SUPPORT:
+                            for w in gw.getAllWindows():
+                                if w.title and name.lower() in w.title.lower():
+                                    found = True
+                                    break
+                    except Exception:
+                        found = False
+                    var = tk.BooleanVar(value=found)
+                    cb_text = f"{name} {'(found)' if found else '(not found)'}"
+                    chk = tk.Checkbutton(root, text=cb_text, variable=var)
+                    chk.pack(anchor='w', padx=12)
+                    vars[name] = var
+
+                # Option: Save debug images (Maximus/Daddy snapshots and combined image)
+                save_debug_var = tk.BooleanVar(value=SAVE_DEBUG_IMAGES)
+                save_chk = tk.Checkbutton(root, text="Save Debug Images (save perk snapshots)", variable=save_debug_var)
+                save_chk.pack(anchor='w', padx=12, pady=(6, 0))
+
+                def select_all():
+                    for v in vars.values():
+                        v.set(True)
+
+                def clear_all():
+                    for v in vars.values():
+                        v.set(False)
+
+                btn_frame = tk.Frame(root)
+                btn_frame.pack(pady=8)
+                tk.Button(btn_frame, text="Select All", command=select_all).pack(side='left', padx=6)
+                tk.Button(btn_frame, text="Clear All", command=clear_all).pack(side='left', padx=6)
+
+                def on_start():
+                    selected = [n for n, v in vars.items() if v.get()]
+                    if not selected:
+                        if not messagebox.askyesno("No Windows Selected", "No windows are selected — continue with none?"):
+                            return
+                    # Update global WINDOWS list
+                    global WINDOWS, SAVE_DEBUG_IMAGES
+                    WINDOWS = selected
+                    # Update Save Debug Images setting from GUI
+                    SAVE_DEBUG_IMAGES = bool(save_debug_var.get())
+                    DEBUG_ARTIFACTS.enabled = SAVE_DEBUG_IMAGES
+                    print(f"Save Debug Images set to: {SAVE_DEBUG_IMAGES}")
+                    root.destroy()
+
+                tk.Button(root, text="Start", command=on_start).pack(pady=(0, 12))
+                # Center window
+                root.update_idletasks()
+                w = root.winfo_width()
+                h = root.winfo_height()
+                x = (root.winfo_screenwidth() // 2) - (w // 2)
+                y = (root.winfo_screenheight() // 2) - (h // 2)
+                root.geometry(f"+{x}+{y}")
+                root.mainloop()
+
+            # Show selector before starting
+            show_window_selector()
+        except Exception as e:
+            print(f"GUI selector failed: {e}")
+    else:
+        print("Tkinter not available — running with configured WINDOWS list.")
+    
+    start_metrics_server()
+    last_timing_summary = time.time()
+    startup_reported = False
+    while True:
+        try:
+            check_failsafe()
+            if TIMING_SUMMARY_INTERVAL and time.time() - last_timing_summary >= TIMING_SUMMARY_INTERVAL:
+                print_timing_summary()
+                last_timing_summary = time.time()
+            check_all_windows()
+            if not startup_reported:
+                TIMINGS.record('startup:imports', IMPORT_SECONDS)
+                if FIRST_CAPTURE_SECONDS is not None:
+                    TIMINGS.record('startup:first_capture', FIRST_CAPTURE_SECONDS)
+                print_startup_report()
+                startup_reported = True
+            print(f"Waiting {CHECK_INTERVAL} seconds...")
+            print("-" * 60)
+            for _ in range(CHECK_INTERVAL * 5):
+                check_failsafe()
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            print("\n\nStopped by user (Ctrl+C)")
+            shutdown_logging()
+            break
+        except Exception as e:
+            if "FAILSAFE" in str(e):
+                print(f"\n\n{e}")
+                write_to_log(f"STOPPED: {e}")
+                shutdown_logging()
+                break
+            else:
+                print(f"\nERROR: {e}")
+                print("Waiting 5 seconds before retrying...")
+                time.sleep(5)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tower Idle Defense perk automator")
+    parser.add_argument("--no-gui", action="store_true", help="skip the tkinter window selector")
+    parser.add_argument("--windows", nargs="+", metavar="NAME",
+                        help="window titles to monitor instead of WINDOWS (implies --no-gui)")
+    parser.add_argument("--start-delay", type=float, default=None,
+                        help=f"seconds to wait before the first check (default {STARTUP_DELAY} "
+                             "with the window selector, 0 without)")
+    return parser.parse_args(argv)
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+_INITIALIZED = False
+
+def init():
+    """Create the log writer, journal, history, debug images, window registry and backends.
+
+    Importing this script only defines settings and functions, so the OCR worker processes
+    (which re-import it) open nothing; main_loop() and the tools that drive the automator call
+    this first. Calling it again does nothing.
+    """
+    global _INITIALIZED, DPI_AWARENESS, WINDOW_REGISTRY, LOG_WRITER, DECISION_JOURNAL, HISTORY_STORE
+    global OCR_PROFILER, CALIBRATION_TEMPLATES, CALIBRATOR, CALIBRATED_PROFILES, COMPILED_PROBES
+    global DEBUG_ARTIFACTS, ADB_BACKEND, REPLAY_BACKEND, FRAME_RECORDER, ACTUATOR
+    if _INITIALIZED:
+        return
+    _INITIALIZED = True
+    # Must be set before the first window query
+    if WIN32_SUPPORT and DPI_AWARE:
+        DPI_AWARENESS = window_registry.enable_dpi_awareness()
+    if WIN32_SUPPORT:
+        WINDOW_REGISTRY = window_registry.WindowRegistry(window_registry.Win32WindowBackend())
+
+    LOG_WRITER = log_writer.BufferedLogWriter(overflow=LOG_OVERFLOW)
+    DECISION_JOURNAL = decision_journal.DecisionJournal(JOURNAL_DIR, max_bytes=JOURNAL_MAX_BYTES,
+                                                        compress=JOURNAL_COMPRESS,
+                                                        retention_days=JOURNAL_RETENTION_DAYS)
+    HISTORY_STORE = history_store.HistoryStore(HISTORY_DB, writer=LOG_WRITER)
+    OCR_PROFILER = ocr_profiler.OcrProfiler(HISTORY_DB, writer=LOG_WRITER)
+
+    CALIBRATION_TEMPLATES = layout_calibration.TemplateStore(CALIBRATION_DIR)
+    CALIBRATOR = layout_calibration.Calibrator(CALIBRATION_TEMPLATES)
+    try:
+        CALIBRATED_PROFILES = layout_calibration.load_profiles(CALIBRATION_FILE)
+        if CALIBRATED_PROFILES:
+            print(f"Loaded calibrated layouts for {len(CALIBRATED_PROFILES)} window(s) from {CALIBRATION_FILE}")
+    except Exception as e:
+        print(f"WARNING: Could not load {CALIBRATION_FILE}: {e}")
+
+    if PROBE_CONFIG_FILE.exists():
+        try:
+            PROBES.update(color_probes.load_probe_definitions(PROBE_CONFIG_FILE))
+            print(f"Loaded extra probes from {PROBE_CONFIG_FILE}")
+        except Exception as e:
+            print(f"WARNING: Could not load {PROBE_CONFIG_FILE}: {e}")
+        COMPILED_PROBES = color_probes.compile_probes(PROBES)
+
+    DEBUG_ARTIFACTS = debug_artifacts.DebugArtifactService(DATA_DIR, ring_size=DEBUG_RING_SIZE,
+                                                           max_files=DEBUG_MAX_FILES, enabled=SAVE_DEBUG_IMAGES)
+
+    if ADB_INSTANCES:
+        ADB_BACKEND = adb_backend.AdbBackend(ADB_INSTANCES, ad_state_fn=lambda w: last_ad_state.get(w, False))
+    if REPLAY_ARCHIVE:
+        REPLAY_BACKEND = frame_archive.ReplayCaptureBackend(REPLAY_ARCHIVE)
+    elif RECORD_ARCHIVE:
+        Path(RECORD_ARCHIVE).parent.mkdir(parents=True, exist_ok=True)
+        # Frames are encoded on their own writer thread; under pressure frames are dropped, never the game loop
+        FRAME_RECORDER = frame_archive.FrameRecorder(RECORD_ARCHIVE, writer=log_writer.BufferedLogWriter(
+            max_queue=256, batch_size=frame_archive.CHUNK_FRAMES, overflow='drop'))
+    ACTUATOR = build_actuator()
+
+def main(argv=None):
+    """Console entry point (perk-automator): one process for all configured windows."""
+    global WINDOWS
+    args = parse_args(argv)
+    if args.windows:
+        WINDOWS = args.windows
+    main_loop(show_gui=not (args.no_gui or args.windows), start_delay=args.start_delay)
+
+if __name__ == "__main__":
+    main()
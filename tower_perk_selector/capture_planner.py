@@ -0,0 +1,186 @@
+"""
+Region-of-interest capture planning.
+
+A main-loop tick only reads a few things from a window: while idle, the two
+ad probe pixels and the New Perk bar. Copying the whole client bitmap for each
+of those reads moves megabytes per tick; the planner instead turns the regions
+a state needs into a small set of rectangles, which the automator copies out
+of one PrintWindow with BitBlt, once per tick:
+
+    rects = plan([(5, 500), (400, 500), ((832, 62), (1044, 93))], bounds=(1400, 830))
+    frame = RegionFrame((1400, 830), [(rect, image) for each rect])
+    frame.crop((840, 62, 1040, 93))        # served from the captured tile
+
+plan() merges rectangles while one larger copy is cheaper than several small
+ones (BLIT_OVERHEAD_BYTES stands in for the fixed cost of each extra copy).
+CaptureStats counts the bytes actually copied per tick against what copying
+the full frame for every read would have cost. Every PrintWindow still renders
+the whole client area into a bitmap first; those bytes are counted separately
+as rendered, since planning saves copies and renders but not the render size.
+"""
+
+import threading
+
+BYTES_PER_PIXEL = 4               # GDI bitmaps are copied as BGRX
+BLIT_OVERHEAD_BYTES = 64 * 1024   # fixed cost of one more BitBlt into a pooled buffer, in copied-byte terms
+
+
+def as_rect(value):
+    """(x1, y1, x2, y2) for a point (x, y), a region ((x1, y1), (x2, y2)) or a rect."""
+    if len(value) == 4:
+        return tuple(int(v) for v in value)
+    if isinstance(value[0], (tuple, list)):
+        (x1, y1), (x2, y2) = value
+        return (int(x1), int(y1), int(x2), int(y2))
+    x, y = value
+    return (int(x), int(y), int(x) + 1, int(y) + 1)
+
+
+def rect_area(rect):
+    x1, y1, x2, y2 = rect
+    return max(0, x2 - x1) * max(0, y2 - y1)
+
+
+def union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def clip(rect, bounds):
+    """Clip a rect to (0, 0, width, height); None if nothing is left."""
+    width, height = bounds
+    x1, y1, x2, y2 = max(0, rect[0]), max(0, rect[1]), min(width, rect[2]), min(height, rect[3])
+    return (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+
+
+def _cost(rect, overhead):
+    return rect_area(rect) * BYTES_PER_PIXEL + overhead
+
+
+def plan(regions, bounds=None, overhead=BLIT_OVERHEAD_BYTES):
+    """Return the rectangles to copy so every region is covered at the lowest estimated cost.
+
+    Greedily merges the pair with the largest saving until no merge saves anything;
+    regions are few (a handful per state), so the quadratic scan is negligible.
+    """
+    rects = []
+    for region in regions:
+        rect = as_rect(region)
+        if bounds is not None:
+            rect = clip(rect, bounds)
+        if rect is not None and rect_area(rect):
+            rects.append(rect)
+    rects = list(dict.fromkeys(rects))
+    while len(rects) > 1:
+        best = None
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                merged = union(rects[i], rects[j])
+                saving = _cost(rects[i], overhead) + _cost(rects[j], overhead) - _cost(merged, overhead)
+                if saving >= 0 and (best is None or saving > best[0]):
+                    best = (saving, i, j, merged)
+        if best is None:
+            break
+        _, i, j, merged = best
+        rects = [merged] + [r for k, r in enumerate(rects) if k not in (i, j) and not contains(merged, r)]
+    return sorted(rects)
+
+
+def planned_bytes(rects):
+    return sum(rect_area(rect) for rect in rects) * BYTES_PER_PIXEL
+
+
+class RegionFrame:
+    """A client-area frame of which only some rectangles were captured.
+
+    tiles is a list of (rect, image), the image being a PIL image or a
+    frame_buffers.FrameView. crop() and pixel() use client-area coordinates and
+    return None for anything no single tile covers.
+    """
+
+    def __init__(self, size, tiles):
+        self.size = tuple(size)
+        self.tiles = list(tiles)
+
+    @property
+    def nbytes(self):
+        return planned_bytes(rect for rect, _ in self.tiles)
+
+    def _tile(self, rect):
+        for tile_rect, image in self.tiles:
+            if contains(tile_rect, rect):
+                return tile_rect, image
+        return None
+
+    def covers(self, region):
+        return self._tile(as_rect(region)) is not None
+
+    def crop(self, region):
+        """Crop of a region ((x1, y1), (x2, y2)) or rect (same type as the tiles), or None if it was not captured."""
+        rect = as_rect(region)
+        tile = self._tile(rect)
+        if tile is None:
+            return None
+        (tx, ty, _, _), image = tile
+        return image.crop((rect[0] - tx, rect[1] - ty, rect[2] - tx, rect[3] - ty))
+
+    def pixel(self, x, y):
+        """RGB tuple at a client-area point, or None if it was not captured."""
+        tile = self._tile((x, y, x + 1, y + 1))
+        if tile is None:
+            return None
+        (tx, ty, _, _), image = tile
+        return tuple(image.getpixel((x - tx, y - ty))[:3])
+
+
+class CaptureStats:
+    """Bytes rendered and copied per window and tick, next to what full-frame copies would have cost."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.windows = {}
+
+    def _entry(self, window_name):
+        return self.windows.setdefault(window_name, {'ticks': 0, 'grabs': 0, 'renders': 0, 'rendered': 0,
+                                                        'copied': 0, 'full_frame': 0})
+
+    def tick(self, window_name):
+        with self._lock:
+            self._entry(window_name)['ticks'] += 1
+
+    def record(self, window_name, copied, full_frame, grabs=1, rendered=0):
+        """copied: bytes actually copied; full_frame: bytes the full-frame path would have copied;
+        rendered: bytes of the client-area bitmap PrintWindow rendered for this grab (0 if none)."""
+        with self._lock:
+            entry = self._entry(window_name)
+            entry['grabs'] += grabs
+            if rendered:
+                entry['renders'] += 1
+                entry['rendered'] += rendered
+            entry['copied'] += copied
+            entry['full_frame'] += full_frame
+
+    def rows(self):
+        """[(window, ticks, renders per tick, KB rendered per tick, KB copied per tick,
+        KB per tick with full-frame copies)]."""
+        with self._lock:
+            rows = []
+            for window_name, entry in sorted(self.windows.items()):
+                ticks = max(1, entry['ticks'])
+                rows.append((window_name, entry['ticks'], entry['renders'] / ticks, entry['rendered'] / ticks / 1024,
+                             entry['copied'] / ticks / 1024, entry['full_frame'] / ticks / 1024))
+            return rows
+
+    def print_summary(self):
+        rows = self.rows()
+        if not rows:
+            return
+        print(f"{'capture':24} {'ticks':>7} {'renders/tick':>13} {'rendered KB/tick':>17} "
+              f"{'copied KB/tick':>15} {'full-frame KB/tick':>19}")
+        for window_name, ticks, renders, rendered, copied, full_frame in rows:
+            print(f"{window_name[:24]:24} {ticks:7} {renders:13.2f} {rendered:17.1f} {copied:15.1f} {full_frame:19.1f}")
+        print("rendered: PrintWindow draws the whole client area each time; "
+              "copied and full-frame count only the copies out of it")
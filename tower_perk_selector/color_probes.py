@@ -0,0 +1,305 @@
+"""
+Color-state probes for the perk automator.
+
+A probe samples one or more window-relative pixels and classifies the sampled
+color into a named UI state (e.g. 'paused' / 'running', 'purple' / 'normal').
+Probes are declared as plain dicts (see PROBES in automator.py)
+and compiled once; all probes needed for a frame are sampled in one pass and
+their rules are evaluated with NumPy over just the sampled pixels, so the
+states are exactly what the rules say for every color.
+
+Probe definition keys:
+    points   - list of (x, y) sample points, relative to the window or to 'anchor'
+    anchor   - optional coords key (e.g. 'perk1_text_region'); its top-left corner
+               is added to every point, so the probe follows ad / no-ad layouts.
+               Points without an anchor go through the caller's transform, so they
+               follow the window profile like the layouts do
+    mode     - 'classify' (default) to classify colors, or 'uniform' to compare points
+    rules    - ordered list of {'state', 'color', 'tolerance', 'min', 'max', 'test'};
+               the first matching rule wins
+    nearest  - if set and no rule matches, use the state of the closest 'color' rule.
+               True breaks distance ties by rule order; a list of states gives the
+               tie order instead (e.g. ['running', 'paused'])
+    default  - state when nothing matches (default 'unknown')
+    states   - for 'uniform' probes: (state_when_all_equal, state_when_different)
+
+    python -m tower_perk_selector.color_probes check [--samples 200000]   # play_pause probe vs. the original check
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+    print("WARNING: numpy not installed. Run: pip install numpy")
+    print("Color probes will be classified pixel by pixel.")
+
+
+def color_distance(color1, color2):
+    """Manhattan distance between two RGB colors (works on ints or NumPy arrays)."""
+    return abs(color1[0] - color2[0]) + abs(color1[1] - color2[1]) + abs(color1[2] - color2[2])
+
+
+def _rule_matches(rule, r, g, b):
+    """Evaluate one rule; r, g, b may be ints or NumPy arrays of the same shape."""
+    result = True
+    if 'color' in rule:
+        result = result & (color_distance((r, g, b), rule['color']) <= rule.get('tolerance', 0))
+    if 'min' in rule:
+        lo = rule['min']
+        result = result & (r >= lo[0]) & (g >= lo[1]) & (b >= lo[2])
+    if 'max' in rule:
+        hi = rule['max']
+        result = result & (r <= hi[0]) & (g <= hi[1]) & (b <= hi[2])
+    if 'test' in rule:
+        result = result & rule['test'](r, g, b)
+    return result
+
+
+class CompiledProbe:
+    """A probe definition with its state names."""
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.definition = definition
+        self.mode = definition.get('mode', 'classify')
+        self.anchor = definition.get('anchor')
+        self.points = [tuple(p) for p in definition.get('points', [])]
+        self.rules = list(definition.get('rules', []))
+        nearest = definition.get('nearest', False)
+        self.nearest = bool(nearest)
+        # 'color' rules in distance tie order: the listed states first, then rule order
+        tie_order = list(nearest) if isinstance(nearest, (list, tuple)) else []
+        self.color_rules = sorted((rule for rule in self.rules if 'color' in rule),
+                                  key=lambda rule: tie_order.index(rule['state'])
+                                  if rule['state'] in tie_order else len(tie_order))
+        self.default = definition.get('default', 'unknown')
+        self.tolerance = definition.get('tolerance', 0)
+
+        if self.mode == 'uniform':
+            self.states = list(definition.get('states', ('same', 'different')))
+        else:
+            self.states = []
+            for rule in self.rules:
+                if rule['state'] not in self.states:
+                    self.states.append(rule['state'])
+            if self.default not in self.states:
+                self.states.append(self.default)
+
+    def resolve_points(self, coords=None, transform=None):
+        """Return the absolute window-relative sample points for this probe.
+
+        transform maps an unanchored base-layout point to the window (anchored
+        points are already transformed through coords).
+        """
+        if not self.anchor:
+            return [transform(p) for p in self.points] if transform else self.points
+        if not coords or self.anchor not in coords:
+            return None
+        anchor = coords[self.anchor]
+        ax, ay = anchor[0] if isinstance(anchor[0], tuple) else anchor
+        return [(ax + x, ay + y) for x, y in self.points]
+
+    def _classify(self, r, g, b):
+        """Vectorized rule evaluation over NumPy arrays; returns the state of each pixel."""
+        labels = np.full(r.shape, self.states.index(self.default))
+
+        if self.nearest and self.color_rules:
+            distances = np.stack([color_distance((r, g, b), rule['color']) for rule in self.color_rules])
+            # argmin takes the first of equal distances, i.e. the tie order of color_rules
+            closest = np.argmin(distances, axis=0)
+            labels = np.array([self.states.index(rule['state']) for rule in self.color_rules])[closest]
+
+        # Apply rules in reverse so the first matching rule has the final word
+        for rule in reversed(self.rules):
+            labels = np.where(_rule_matches(rule, r, g, b), self.states.index(rule['state']), labels)
+        return [self.states[int(i)] for i in np.ravel(labels)]
+
+    def classify_pixel(self, pixel):
+        """Classify a single RGB pixel (the path without NumPy)."""
+        r, g, b = int(pixel[0]), int(pixel[1]), int(pixel[2])
+        for rule in self.rules:
+            if _rule_matches(rule, r, g, b):
+                return rule['state']
+        if self.nearest and self.color_rules:
+            # min() keeps the first of equal distances, like argmin in _classify
+            closest = min(self.color_rules, key=lambda rule: color_distance((r, g, b), rule['color']))
+            return closest['state']
+        return self.default
+
+
+def compile_probes(definitions):
+    """Compile a dict of probe definitions into CompiledProbe objects."""
+    return {name: CompiledProbe(name, definition) for name, definition in definitions.items()}
+
+
+def load_probe_definitions(path):
+    """Load extra probe definitions from a JSON file (colors as [r, g, b] lists)."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    definitions = {}
+    for name, definition in raw.items():
+        definition = dict(definition)
+        definition['points'] = [tuple(p) for p in definition.get('points', [])]
+        rules = []
+        for rule in definition.get('rules', []):
+            rule = dict(rule)
+            for key in ('color', 'min', 'max'):
+                if key in rule:
+                    rule[key] = tuple(rule[key])
+            rules.append(rule)
+        definition['rules'] = rules
+        if 'states' in definition:
+            definition['states'] = tuple(definition['states'])
+        definitions[name] = definition
+    return definitions
+
+
+def _frame_array(frame):
+    """Return an (H, W, C) uint8 array view of a PIL image, frame_buffers.FrameView or NumPy frame."""
+    if hasattr(frame, 'rgb'):
+        return frame.rgb
+    if hasattr(frame, 'mode'):
+        if frame.mode not in ('RGB', 'RGBA'):
+            frame = frame.convert('RGB')
+        return np.asarray(frame)
+    return frame
+
+
+def _sample_pixels(frame, points):
+    """Sample all points from the frame; returns (colors, in_bounds) lists/arrays."""
+    if hasattr(frame, 'tiles'):
+        # capture_planner.RegionFrame: only the planned rectangles were captured
+        pixels = [frame.pixel(x, y) for x, y in points]
+        in_bounds = [p is not None for p in pixels]
+        colors = [p if p is not None else (0, 0, 0) for p in pixels]
+        if NUMPY_SUPPORT:
+            return np.asarray(colors, dtype=np.int32).reshape(-1, 3), np.asarray(in_bounds, dtype=bool)
+        return colors, in_bounds
+    if NUMPY_SUPPORT:
+        arr = _frame_array(frame)
+        height, width = arr.shape[0], arr.shape[1]
+        pts = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        in_bounds = (pts[:, 0] >= 0) & (pts[:, 0] < width) & (pts[:, 1] >= 0) & (pts[:, 1] < height)
+        xs = np.clip(pts[:, 0], 0, width - 1)
+        ys = np.clip(pts[:, 1], 0, height - 1)
+        colors = arr[ys, xs, :3].astype(np.int32)
+        return colors, in_bounds
+    width, height = frame.size
+    colors = []
+    in_bounds = []
+    for x, y in points:
+        ok = 0 <= x < width and 0 <= y < height
+        in_bounds.append(ok)
+        colors.append(tuple(frame.getpixel((x, y))[:3]) if ok else (0, 0, 0))
+    return colors, in_bounds
+
+
+def evaluate_probes(frame, probes, names=None, coords=None, colors=None, transform=None):
+    """Evaluate probes against a full-window frame in one vectorized pass.
+
+    Returns a dict of probe name -> state. A probe whose points could not be
+    resolved or fall outside the frame maps to None. If a 'colors' dict is
+    passed it is filled with probe name -> list of sampled RGB tuples.
+    transform is passed to resolve_points() for probes without an anchor.
+    """
+    if names is None:
+        names = list(probes.keys())
+
+    states = {}
+    spans = []
+    all_points = []
+    for name in names:
+        probe = probes[name]
+        points = probe.resolve_points(coords, transform)
+        if not points:
+            states[name] = None
+            continue
+        spans.append((probe, len(all_points), len(points)))
+        all_points.extend(points)
+
+    if not all_points or frame is None:
+        for probe, _, _ in spans:
+            states[probe.name] = None
+        return states
+
+    sampled, in_bounds = _sample_pixels(frame, all_points)
+
+    for probe, start, count in spans:
+        pixels = [tuple(int(c) for c in sampled[i]) for i in range(start, start + count)]
+        if colors is not None:
+            colors[probe.name] = pixels
+        if not all(bool(in_bounds[i]) for i in range(start, start + count)):
+            states[probe.name] = None
+            continue
+
+        if probe.mode == 'uniform':
+            first = pixels[0]
+            same = all(color_distance(first, p) <= probe.tolerance for p in pixels[1:])
+            states[probe.name] = probe.states[0] if same else probe.states[1]
+            continue
+
+        if NUMPY_SUPPORT:
+            # Exact rules, vectorized over this probe's few sampled pixels
+            block = sampled[start:start + count]
+            labels = probe._classify(block[:, 0], block[:, 1], block[:, 2])
+        else:
+            labels = [probe.classify_pixel(p) for p in pixels]
+        # Multi-point probes report the most common state (ties go to the first point)
+        counts = Counter(labels)
+        best = max(counts.values())
+        states[probe.name] = next(label for label in labels if counts[label] == best)
+
+    return states
+
+
+def original_play_pause(pixel, play_color, pause_color, tolerance):
+    """The play/pause decision of the original check_play_pause_state (ties go to 'running')."""
+    pause_distance = color_distance(pixel, pause_color)
+    play_distance = color_distance(pixel, play_color)
+    if play_distance <= tolerance:
+        return 'paused'
+    if pause_distance <= tolerance:
+        return 'running'
+    return 'paused' if play_distance < pause_distance else 'running'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the play_pause probe against the original color check")
+    parser.add_argument("command", choices=("check",))
+    parser.add_argument("--samples", type=int, default=200000, help="random colors checked besides the ties")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import random
+    from . import automator
+    probe = compile_probes(automator.PROBES)['play_pause']
+    play, pause, tolerance = automator.PLAY_BUTTON_COLOR, automator.PAUSE_BUTTON_COLOR, automator.COLOR_TOLERANCE
+
+    rng = random.Random(args.seed)
+    colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(args.samples)]
+    # Every color at equal distance from both buttons, where the tie-break decides
+    colors += [(r, g, b) for r in range(0, 256, 3) for g in range(0, 256, 3) for b in range(256)
+               if color_distance((r, g, b), play) == color_distance((r, g, b), pause)]
+    if NUMPY_SUPPORT:
+        block = np.asarray(colors)
+        states = probe._classify(block[:, 0], block[:, 1], block[:, 2])
+    else:
+        states = [probe.classify_pixel(color) for color in colors]
+    expected = [original_play_pause(color, play, pause, tolerance) for color in colors]
+    mismatches = [(color, state, want) for color, state, want in zip(colors, states, expected) if state != want]
+    for color, state, want in mismatches[:20]:
+        print(f"  RGB{color}: probe {state}, original {want}")
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} of {len(colors)} colors classified differently")
+        sys.exit(1)
+    print(f"OK: {len(colors)} colors classified like the original check")
+
+
+if __name__ == "__main__":
+    main()
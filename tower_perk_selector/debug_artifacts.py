@@ -0,0 +1,245 @@
+"""
+Debug image service for the perk automator.
+
+Captured crops are kept as raw bytes in a small ring buffer per window and
+channel (no PIL copies, no PNG encoding on the hot path). Composites are only
+built and encoded on a background thread when something asks for them: an OCR
+error, an unrecognized perk, a per-selection snapshot, or an explicit request.
+Each OCR read can also leave its crop and the image OCR read as a compare pair;
+the pair is kept by reference (the images are already private copies) and only
+saved side by side by trigger_compare().
+
+Output names carry milliseconds and a sequence number, so two images saved in
+the same second never overwrite each other.
+
+Each output category keeps at most max_files images. The directory is scanned
+once per category to pick up files from earlier runs; after that, written paths
+are tracked in memory and the oldest is deleted as new ones are written.
+"""
+
+import glob
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+try:
+    from PIL import Image
+    PIL_SUPPORT = True
+except ImportError:
+    PIL_SUPPORT = False
+
+RING_SIZE = 6          # crops kept per (window, channel)
+MAX_FILES = 6          # images kept on disk per category
+MAX_PENDING_JOBS = 32  # encode jobs waiting before new ones are dropped
+COMPARE_PREFIX = 'compare:'  # channel of the (original, processed) pairs for one OCR label
+
+
+def _safe_name(window_name):
+    return window_name.lower().replace(' ', '_')
+
+
+class DebugArtifactService:
+    """Ring buffers of raw crops plus a background compositing/encoding worker."""
+
+    def __init__(self, directory, ring_size=RING_SIZE, max_files=MAX_FILES, enabled=True):
+        self.directory = Path(directory)
+        self.ring_size = ring_size
+        self.max_files = max_files
+        self.enabled = enabled
+        self.stats = {'crops': 0, 'jobs': 0, 'saved': 0, 'dropped_jobs': 0, 'pruned': 0}
+        self._rings = {}          # (window, channel) -> deque of (ts, mode, size, raw bytes)
+                                  # or, for compare channels, (ts, original, processed)
+        self._written = {}        # category -> deque of paths, oldest first
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue(maxsize=MAX_PENDING_JOBS)
+        self._thread = threading.Thread(target=self._run, name="DebugArtifacts", daemon=True)
+        self._thread.start()
+
+    # ---------- hot path ----------
+
+    def add_crop(self, window_name, channel, image):
+        """Remember a crop as raw bytes (cheap; nothing is encoded here)."""
+        if not self.enabled or image is None:
+            return
+        entry = (time.time(), image.mode, image.size, image.tobytes())
+        with self._lock:
+            ring = self._rings.get((window_name, channel))
+            if ring is None:
+                ring = self._rings[(window_name, channel)] = deque(maxlen=self.ring_size)
+            ring.append(entry)
+            self.stats['crops'] += 1
+
+    def add_compare(self, window_name, label, original, processed):
+        """Remember a crop and the image OCR read from it (kept by reference, nothing is copied)."""
+        if not self.enabled or original is None or processed is None:
+            return
+        with self._lock:
+            ring = self._rings.get((window_name, COMPARE_PREFIX + label))
+            if ring is None:
+                ring = self._rings[(window_name, COMPARE_PREFIX + label)] = deque(maxlen=self.ring_size)
+            ring.append((time.time(), original, processed))
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _snapshot(self, window_name, channel, count=None):
+        with self._lock:
+            ring = list(self._rings.get((window_name, channel), ()))
+        return ring[-count:] if count else ring
+
+    def _output_path(self, prefix, suffix=""):
+        """Unique output path: milliseconds plus a sequence number."""
+        now = datetime.now()
+        stamp = f"{now.strftime('%Y%m%d_%H%M%S')}_{now.microsecond // 1000:03d}_{next(self._sequence):04d}"
+        return self.directory / f"{prefix}_{stamp}{suffix}.png"
+
+    def _submit(self, job):
+        if not self.enabled:
+            return False
+        try:
+            self._jobs.put_nowait(job)
+            self._count('jobs')
+            return True
+        except queue.Full:
+            self._count('dropped_jobs')
+            return False
+
+    # ---------- triggers ----------
+
+    def trigger_channel_composite(self, channel, path, windows=None):
+        """Save the last crops of a channel as a grid: one column per window, newest at the bottom."""
+        with self._lock:
+            names = windows or sorted({w for w, c in self._rings if c == channel})
+        columns = [(name, self._snapshot(name, channel)) for name in names]
+        return self._submit(('grid', Path(path), columns))
+
+    def trigger_stack(self, window_name, channel, count, category, reason=""):
+        """Save the last `count` crops of a window/channel stacked vertically (e.g. the 3 perk cards)."""
+        crops = self._snapshot(window_name, channel, count)
+        if not crops:
+            return False
+        suffix = f"_{reason}" if reason else ""
+        path = self._output_path(f"{_safe_name(window_name)}_{category}", suffix)
+        return self._submit(('stack', path, crops, f"{_safe_name(window_name)}_{category}_*.png"))
+
+    def trigger_compare(self, window_name, labels=None, reason=""):
+        """Save the latest compare pair of each label (all labels of the window by default) side by side."""
+        with self._lock:
+            if labels is None:
+                labels = sorted(c[len(COMPARE_PREFIX):] for w, c in self._rings
+                                if w == window_name and c.startswith(COMPARE_PREFIX))
+        submitted = False
+        suffix = f"_{reason}" if reason else ""
+        for label in labels:
+            pairs = self._snapshot(window_name, COMPARE_PREFIX + label, 1)
+            if not pairs:
+                continue
+            prefix = f"debug_{_safe_name(window_name)}_{label}"
+            path = self._output_path(prefix, suffix)
+            submitted = self._submit(('side_by_side', path, pairs[0][1:], f"{prefix}_*.png")) or submitted
+        return submitted
+
+    def flush(self, timeout=5.0):
+        """Wait until queued jobs are written."""
+        done = threading.Event()
+        try:
+            self._jobs.put(('flush', done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    # ---------- worker ----------
+
+    @staticmethod
+    def _decode(entry):
+        _, mode, size, raw = entry
+        return Image.frombytes(mode, size, raw).convert('RGB')
+
+    def _prune(self, category, path):
+        """Track a written file and delete the oldest beyond max_files (no directory rescans)."""
+        written = self._written.get(category)
+        if written is None:
+            # One-time scan picks up files left by earlier runs
+            existing = sorted(p for p in glob.glob(str(self.directory / category)) if p != str(path))
+            written = self._written[category] = deque(existing)
+        written.append(str(path))
+        while len(written) > self.max_files:
+            old = written.popleft()
+            try:
+                os.remove(old)
+                self._count('pruned')
+            except OSError:
+                pass
+
+    def _build_grid(self, columns):
+        rows = self.ring_size
+        widths = [max((e[2][0] for e in crops), default=1) for _, crops in columns]
+        row_height = max([e[2][1] for _, crops in columns for e in crops] or [1])
+        combined = Image.new('RGB', (max(1, sum(widths)), row_height * rows), color=(128, 128, 128))
+        x = 0
+        for (name, crops), width in zip(columns, widths):
+            blank = Image.new('RGB', (width, row_height), color=(64, 64, 64))
+            for i in range(rows):
+                y = row_height * i
+                offset = rows - len(crops)
+                if i < offset:
+                    combined.paste(blank, (x, y))
+                else:
+                    combined.paste(self._decode(crops[i - offset]).resize((width, row_height)), (x, y))
+            x += width
+        return combined
+
+    def _build_stack(self, crops):
+        images = [self._decode(e) for e in crops]
+        max_width = max(im.width for im in images)
+        combined = Image.new('RGB', (max_width, sum(im.height for im in images)), color=(0, 0, 0))
+        y = 0
+        for im in images:
+            combined.paste(im, ((max_width - im.width) // 2, y))
+            y += im.height
+        return combined
+
+    def _build_side_by_side(self, images):
+        orig, proc = (im.convert('RGB') for im in images)
+        h = max(orig.height, proc.height)
+        proc = proc.resize((int(proc.width * (h / proc.height)), h), Image.LANCZOS)
+        orig = orig.resize((int(orig.width * (h / orig.height)), h), Image.LANCZOS)
+        combined = Image.new('RGB', (orig.width + proc.width + 10, h), color=(0, 0, 0))
+        combined.paste(orig, (0, 0))
+        combined.paste(proc, (orig.width + 10, 0))
+        return combined
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            kind = job[0]
+            if kind == 'flush':
+                job[1].set()
+                continue
+            if not PIL_SUPPORT:
+                continue
+            try:
+                if kind == 'grid':
+                    _, path, columns = job
+                    self._build_grid(columns).save(path)
+                    print(f"[DEBUG] Saved combined debug image to {path}")
+                elif kind == 'stack':
+                    _, path, crops, category = job
+                    self._build_stack(crops).save(path)
+                    self._prune(category, path)
+                    print(f"[DEBUG] Saved snapshot to {path}")
+                elif kind == 'side_by_side':
+                    _, path, images, category = job
+                    self._build_side_by_side(images).save(path)
+                    self._prune(category, path)
+                    print(f"[DEBUG] Saved debug compare image to {path}")
+                self._count('saved')
+            except Exception as e:
+                print(f"[DEBUG] Could not save debug image: {e}")
@@ -0,0 +1,255 @@
+"""
+Machine-readable perk decision journal.
+
+Every perk decision is appended as one JSON line to the active segment in
+JOURNAL_DIR. When a segment grows past max_bytes it is closed, optionally
+gzip-compressed, and recorded in journal_index.json together with its first/last
+timestamp, record count and window names. Segments older than the retention
+period are deleted; nothing is ever truncated.
+
+JournalReader uses the index to skip whole segments outside the requested time
+range or window, so weeks of history load quickly.
+
+    python -m tower_perk_selector.decision_journal [--days 7] [--window "Daddy Bluestack"]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from . import data_dir
+
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+RETENTION_DAYS = 60
+INDEX_NAME = "journal_index.json"
+SEGMENT_PREFIX = "decisions-"
+
+
+def _load_index(directory):
+    path = Path(directory) / INDEX_NAME
+    if not path.exists():
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"WARNING: Could not read journal index {path}: {e}")
+        return []
+
+
+def _open_segment(path):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class DecisionJournal:
+    """Size-rotated JSONL journal. write_batch() is called from the log writer thread."""
+
+    def __init__(self, directory, max_bytes=SEGMENT_MAX_BYTES, compress=True, retention_days=RETENTION_DAYS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._index = _load_index(self.directory)
+        self._active = None
+        self._active_size = 0
+        self._active_meta = None
+        # Segments left open by an earlier run are closed and indexed, never overwritten
+        indexed = {entry['file'] for entry in self._index}
+        for leftover in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*.jsonl")):
+            if leftover.name not in indexed:
+                self._finalize(leftover, self._scan_meta(leftover))
+        self._save_index()
+
+    @staticmethod
+    def make_record(**fields):
+        """Return a journal line for a decision (adds the timestamp)."""
+        record = {'ts': time.time()}
+        record.update(fields)
+        return json.dumps(record, separators=(',', ':'), default=str) + "\n"
+
+    def _scan_meta(self, path):
+        meta = {'first_ts': None, 'last_ts': None, 'count': 0, 'windows': set()}
+        with _open_segment(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._update_meta(meta, record)
+        return meta
+
+    @staticmethod
+    def _update_meta(meta, record):
+        ts = record.get('ts')
+        if ts is not None:
+            if meta['first_ts'] is None:
+                meta['first_ts'] = ts
+            meta['last_ts'] = ts
+        meta['count'] += 1
+        if record.get('window'):
+            meta['windows'].add(record['window'])
+
+    def _new_segment(self):
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self._active = self.directory / f"{SEGMENT_PREFIX}{stamp}.jsonl"
+        self._active_size = 0
+        self._active_meta = {'first_ts': None, 'last_ts': None, 'count': 0, 'windows': set()}
+
+    def _finalize(self, path, meta):
+        """Compress a closed segment and add it to the index."""
+        final = path
+        if self.compress:
+            final = path.with_name(path.name + ".gz")
+            with open(path, "rb") as src, gzip.open(final, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        self._index.append({
+            'file': final.name,
+            'first_ts': meta['first_ts'],
+            'last_ts': meta['last_ts'],
+            'count': meta['count'],
+            'windows': sorted(meta['windows']),
+        })
+
+    def _apply_retention(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        keep = []
+        for entry in self._index:
+            if entry['last_ts'] is not None and entry['last_ts'] < cutoff:
+                try:
+                    os.remove(self.directory / entry['file'])
+                except FileNotFoundError:
+                    pass
+            else:
+                keep.append(entry)
+        self._index = keep
+
+    def _save_index(self):
+        tmp = self.directory / (INDEX_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self.directory / INDEX_NAME)
+
+    def rotate(self):
+        """Close the active segment (if any) so the next write starts a new one."""
+        with self._lock:
+            if self._active is None or not self._active.exists():
+                self._active = None
+                return
+            self._finalize(self._active, self._active_meta)
+            self._active = None
+            self._apply_retention()
+            self._save_index()
+
+    def write_batch(self, lines):
+        """Append journal lines, rotating when the segment exceeds max_bytes."""
+        with self._lock:
+            if self._active is None:
+                self._new_segment()
+            data = ''.join(lines)
+            with open(self._active, "a", encoding="utf-8") as f:
+                f.write(data)
+            self._active_size += len(data.encode("utf-8"))
+            for line in lines:
+                try:
+                    self._update_meta(self._active_meta, json.loads(line))
+                except ValueError:
+                    pass
+        if self._active_size >= self.max_bytes:
+            self.rotate()
+
+
+class JournalReader:
+    """Reads journal records, using the segment index to skip irrelevant files."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def segments(self, since=None, until=None, window=None):
+        """Return the segment paths that may contain matching records, oldest first."""
+        paths = []
+        indexed = set()
+        for entry in _load_index(self.directory):
+            indexed.add(entry['file'])
+            if since is not None and entry['last_ts'] is not None and entry['last_ts'] < since:
+                continue
+            if until is not None and entry['first_ts'] is not None and entry['first_ts'] > until:
+                continue
+            if window is not None and window not in entry.get('windows', []):
+                continue
+            paths.append(self.directory / entry['file'])
+        # The active (unindexed) segment always has to be read
+        for active in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*.jsonl")):
+            if active.name not in indexed:
+                paths.append(active)
+        return paths
+
+    def iter_records(self, since=None, until=None, window=None):
+        for path in self.segments(since, until, window):
+            try:
+                with _open_segment(path) as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        ts = record.get('ts', 0)
+                        if since is not None and ts < since:
+                            continue
+                        if until is not None and ts > until:
+                            continue
+                        if window is not None and record.get('window') != window:
+                            continue
+                        yield record
+            except FileNotFoundError:
+                continue
+
+    def load(self, since=None, until=None, window=None):
+        return list(self.iter_records(since, until, window))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the perk decision journal")
+    parser.add_argument("--dir", default=None, help="default: journal/ in PERK_AUTOMATOR_HOME or here")
+    parser.add_argument("--days", type=float, default=7.0, help="look back this many days")
+    parser.add_argument("--window", default=None)
+    args = parser.parse_args()
+
+    reader = JournalReader(args.dir or data_dir() / "journal")
+    started = time.time()
+    records = reader.load(since=time.time() - args.days * 86400, window=args.window)
+    elapsed = time.time() - started
+    print(f"Loaded {len(records)} decisions in {elapsed:.2f}s")
+
+    per_window = Counter(r.get('window') for r in records)
+    chosen = Counter()
+    for r in records:
+        index = r.get('selected')
+        cards = r.get('cards', [])
+        if isinstance(index, int) and 1 <= index <= len(cards):
+            chosen[cards[index - 1].get('priority')] += 1
+        else:
+            chosen[str(index)] += 1
+    print("\nDecisions per window:")
+    for name, count in per_window.most_common():
+        print(f"  {name}: {count}")
+    print("\nSelected priority (or outcome):")
+    for key, count in chosen.most_common():
+        print(f"  {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Compact frame archive for recording and replaying capture sessions.
+
+Every captured image (full window or just the requested region) is appended
+with its timestamp, window and region. Frames are grouped into chunks of
+CHUNK_FRAMES; each chunk is zlib-compressed and starts with a small plain JSON
+header listing the window names and how many frames of each stream
+(window + region) it holds. Inside a chunk, a frame of the same stream and size
+as the previous one is stored as an XOR delta, which is mostly zeros for a
+static game screen and compresses very well. Delta state resets at every chunk,
+so any chunk decodes on its own.
+
+There is no trailing index: opening an archive memory-maps the file and walks
+the chunk headers (no decompression), which also means an archive cut short by
+a crash is readable up to its last complete chunk.
+
+    python -m tower_perk_selector.frame_archive info session.pfa
+    python -m tower_perk_selector.frame_archive export session.pfa 120 frame.png
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+try:
+    from PIL import Image
+    PIL_SUPPORT = True
+except ImportError:
+    PIL_SUPPORT = False
+
+FILE_MAGIC = b'PKFA\x01\x00\x00\x00'
+CHUNK_HEADER = struct.Struct('<4sIIIIdd')      # magic, meta_len, comp_len, raw_len, count, first_ts, last_ts
+CHUNK_MAGIC = b'CHNK'
+RECORD_HEADER = struct.Struct('<dHiiiiHHBBI')  # ts, window, x1, y1, x2, y2, width, height, mode, flags, data_len
+FLAG_DELTA = 1
+MODES = ['RGB', 'L', 'RGBA', '1']
+NO_REGION = (-1, -1, -1, -1)
+
+CHUNK_FRAMES = 64
+COMPRESS_LEVEL = 6
+
+Frame = namedtuple('Frame', 'ts window region image')
+
+
+def _region_tuple(region):
+    if region is None:
+        return NO_REGION
+    (x1, y1), (x2, y2) = region
+    return (int(x1), int(y1), int(x2), int(y2))
+
+
+def _region_from_tuple(values):
+    if tuple(values) == NO_REGION:
+        return None
+    x1, y1, x2, y2 = values
+    return ((x1, y1), (x2, y2))
+
+
+def _stream_key(window_index, region_values):
+    return f"{window_index}:{','.join(str(v) for v in region_values)}"
+
+
+def _xor(a, b):
+    if NUMPY_SUPPORT:
+        return np.bitwise_xor(np.frombuffer(a, dtype=np.uint8), np.frombuffer(b, dtype=np.uint8)).tobytes()
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+class FrameRecorder:
+    """Appends frames to an archive.
+
+    With a writer (a log_writer.BufferedLogWriter) record() only queues the raw
+    bytes and the writer thread encodes chunks; without one, frames are encoded
+    on the calling thread.
+    """
+
+    def __init__(self, path, writer=None, chunk_frames=CHUNK_FRAMES, level=COMPRESS_LEVEL):
+        self.path = Path(path)
+        self.writer = writer
+        self.chunk_frames = chunk_frames
+        self.level = level
+        self.stats = {'frames': 0, 'chunks': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+        self._lock = threading.Lock()
+        self._windows = []
+        self._pending = []
+        valid_end = None
+        if self.path.exists() and self.path.stat().st_size > 0:
+            # Keep the window numbering of the existing archive and drop any truncated tail
+            with FrameArchive(self.path) as existing:
+                self._windows = list(existing.windows)
+                valid_end = existing.end_offset
+        self._file = open(self.path, 'r+b' if valid_end else 'wb')
+        if valid_end:
+            self._file.truncate(valid_end)
+            self._file.seek(valid_end)
+        else:
+            self._file.write(FILE_MAGIC)
+            self._file.flush()
+
+    def record(self, window_name, region, image, ts=None):
+        """Add one captured image (region is the window-relative box it came from, or None)."""
+        if image is None:
+            return
+        if image.mode not in MODES:
+            image = image.convert('RGB')
+        entry = (time.time() if ts is None else ts, window_name, _region_tuple(region),
+                 image.mode, image.size, image.tobytes())
+        if self.writer is not None:
+            self.writer.write(self, entry)
+        else:
+            self.write_batch([entry])
+
+    def write_batch(self, entries):
+        """Buffer frames and write full chunks (called on the writer thread)."""
+        with self._lock:
+            self._pending.extend(entries)
+            while len(self._pending) >= self.chunk_frames:
+                self._write_chunk(self._pending[:self.chunk_frames])
+                del self._pending[:self.chunk_frames]
+
+    def _window_index(self, name):
+        try:
+            return self._windows.index(name)
+        except ValueError:
+            self._windows.append(name)
+            return len(self._windows) - 1
+
+    def _write_chunk(self, entries):
+        previous = {}
+        streams = {}
+        parts = []
+        raw_total = 0
+        for ts, window_name, region_values, mode, size, data in entries:
+            window_index = self._window_index(window_name)
+            key = _stream_key(window_index, region_values)
+            streams[key] = streams.get(key, 0) + 1
+            flags = 0
+            payload = data
+            prev = previous.get(key)
+            if prev is not None and prev[0] == mode and prev[1] == size:
+                payload = _xor(data, prev[2])
+                flags |= FLAG_DELTA
+            previous[key] = (mode, size, data)
+            parts.append(RECORD_HEADER.pack(ts, window_index, *region_values, size[0], size[1],
+                                            MODES.index(mode), flags, len(payload)))
+            parts.append(payload)
+            raw_total += len(data)
+        raw = b''.join(parts)
+        compressed = zlib.compress(raw, self.level)
+        meta = json.dumps({'windows': self._windows, 'streams': streams}, separators=(',', ':')).encode('utf-8')
+        header = CHUNK_HEADER.pack(CHUNK_MAGIC, len(meta), len(compressed), len(raw), len(entries),
+                                   entries[0][0], entries[-1][0])
+        self._file.write(header + meta + compressed)
+        self._file.flush()
+        self.stats['frames'] += len(entries)
+        self.stats['chunks'] += 1
+        self.stats['raw_bytes'] += raw_total
+        self.stats['stored_bytes'] += len(header) + len(meta) + len(compressed)
+
+    def close(self):
+        """Write the last partial chunk and close the file."""
+        if self.writer is not None:
+            self.writer.flush()
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._pending:
+                self._write_chunk(self._pending)
+                self._pending = []
+            self._file.close()
+
+
+class FrameArchive:
+    """Random-access reader over a memory-mapped archive."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        size = self.path.stat().st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if size and self._map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a frame archive")
+        self.chunks = []      # (payload offset, comp_len, raw_len, count, first_ts, last_ts, streams)
+        self.windows = []
+        self._starts = []     # global index of each chunk's first frame
+        self._cached = (None, None)
+        self._stream_chunks = {}     # stream key -> (chunk indices, stream frames before each, total)
+        self._positions = (None, {})  # (chunk index, {(window, region): entry positions in that chunk})
+        self._scan(size)
+
+    def _scan(self, size):
+        offset = len(FILE_MAGIC)
+        total = 0
+        while offset + CHUNK_HEADER.size <= size:
+            magic, meta_len, comp_len, raw_len, count, first_ts, last_ts = CHUNK_HEADER.unpack_from(self._map, offset)
+            end = offset + CHUNK_HEADER.size + meta_len + comp_len
+            if magic != CHUNK_MAGIC or end > size:
+                break  # truncated tail from an interrupted recording
+            meta = json.loads(bytes(self._map[offset + CHUNK_HEADER.size:offset + CHUNK_HEADER.size + meta_len]))
+            self.windows = meta['windows']
+            self.chunks.append((offset + CHUNK_HEADER.size + meta_len, comp_len, raw_len, count,
+                                first_ts, last_ts, meta['streams']))
+            self._starts.append(total)
+            total += count
+            offset = end
+        self.frame_count = total
+        self.end_offset = offset if size else 0
+
+    def __len__(self):
+        return self.frame_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _decode_chunk(self, chunk_index):
+        if self._cached[0] == chunk_index:
+            return self._cached[1]
+        offset, comp_len, raw_len, count, _, _, _ = self.chunks[chunk_index]
+        raw = zlib.decompress(self._map[offset:offset + comp_len])
+        frames = []
+        previous = {}
+        pos = 0
+        for _ in range(count):
+            ts, window_index, x1, y1, x2, y2, width, height, mode, flags, length = RECORD_HEADER.unpack_from(raw, pos)
+            pos += RECORD_HEADER.size
+            data = raw[pos:pos + length]
+            pos += length
+            key = _stream_key(window_index, (x1, y1, x2, y2))
+            if flags & FLAG_DELTA:
+                data = _xor(data, previous[key])
+            previous[key] = data
+            frames.append((ts, self.windows[window_index], (x1, y1, x2, y2), MODES[mode], (width, height), data))
+        self._cached = (chunk_index, frames)
+        return frames
+
+    @staticmethod
+    def _to_frame(entry):
+        ts, window_name, region_values, mode, size, data = entry
+        image = Image.frombytes(mode, size, data) if PIL_SUPPORT else data
+        return Frame(ts, window_name, _region_from_tuple(region_values), image)
+
+    def _locate(self, index):
+        if not 0 <= index < self.frame_count:
+            raise IndexError(index)
+        chunk_index = bisect.bisect_right(self._starts, index) - 1
+        return chunk_index, index - self._starts[chunk_index]
+
+    def frame(self, index):
+        """Return frame number index (0-based, in recording order)."""
+        chunk_index, position = self._locate(index)
+        return self._to_frame(self._decode_chunk(chunk_index)[position])
+
+    def iter_frames(self, window_name=None, region=None, since=None, until=None):
+        """Yield frames in order, optionally for one window/region and time range.
+
+        Chunks that cannot contain a match are skipped without decompressing.
+        """
+        wanted_region = _region_tuple(region) if region is not None else None
+        for chunk_index, chunk in enumerate(self.chunks):
+            first_ts, last_ts = chunk[4], chunk[5]
+            if (since is not None and last_ts < since) or (until is not None and first_ts > until):
+                continue
+            if window_name is not None:
+                if window_name not in self.windows:
+                    return
+                prefix = f"{self.windows.index(window_name)}:"
+                if not any(key.startswith(prefix) for key in chunk[6]):
+                    continue
+            for entry in self._decode_chunk(chunk_index):
+                ts, name, region_values = entry[0], entry[1], entry[2]
+                if window_name is not None and name != window_name:
+                    continue
+                if wanted_region is not None and region_values != wanted_region:
+                    continue
+                if (since is not None and ts < since) or (until is not None and ts > until):
+                    continue
+                yield self._to_frame(entry)
+
+    def streams(self):
+        """Return {(window_name, region): frame count}."""
+        totals = {}
+        for chunk in self.chunks:
+            for key, count in chunk[6].items():
+                window_index, values = key.split(':', 1)
+                stream = (self.windows[int(window_index)], _region_from_tuple(tuple(int(v) for v in values.split(','))))
+                totals[stream] = totals.get(stream, 0) + count
+        return totals
+
+    def _stream_index(self, key):
+        """Chunks holding a stream and how many of its frames come before each (built once per stream)."""
+        index = self._stream_chunks.get(key)
+        if index is None:
+            chunk_indices, starts, total = [], [], 0
+            for chunk_index, chunk in enumerate(self.chunks):
+                count = chunk[6].get(key, 0)
+                if count:
+                    chunk_indices.append(chunk_index)
+                    starts.append(total)
+                    total += count
+            index = self._stream_chunks[key] = (chunk_indices, starts, total)
+        return index
+
+    def _stream_positions(self, chunk_index):
+        """{(window, region values): positions of its frames} for one chunk, kept with the decoded chunk."""
+        if self._positions[0] != chunk_index:
+            positions = {}
+            for position, entry in enumerate(self._decode_chunk(chunk_index)):
+                positions.setdefault((entry[1], entry[2]), []).append(position)
+            self._positions = (chunk_index, positions)
+        return self._positions[1]
+
+    def stream_frame(self, window_name, region, n):
+        """Return the n-th frame of one stream, decoding only the chunk that holds it."""
+        if window_name not in self.windows:
+            return None
+        region_values = _region_tuple(region)
+        chunk_indices, starts, total = self._stream_index(_stream_key(self.windows.index(window_name), region_values))
+        if not 0 <= n < total:
+            return None
+        i = bisect.bisect_right(starts, n) - 1
+        positions = self._stream_positions(chunk_indices[i])[(window_name, region_values)]
+        return self._to_frame(self._decode_chunk(chunk_indices[i])[positions[n - starts[i]]])
+
+
+class ReplayCaptureBackend:
+    """Serves captures from an archive instead of a live window.
+
+    Each grab(window, region) returns the next recorded frame of that stream.
+    A region that was never captured on its own is cropped from the window's
+    full-frame stream when one exists. When a stream runs out, its last frame
+    is repeated (or replay restarts with loop=True).
+    """
+
+    def __init__(self, path, loop=False):
+        self.archive = FrameArchive(path)
+        self.loop = loop
+        self._streams = self.archive.streams()
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def handles(self, window_name):
+        return window_name in self.archive.windows
+
+    def _next(self, window_name, region):
+        key = (window_name, region)
+        total = self._streams.get(key, 0)
+        if not total:
+            return None
+        n = self._cursors.get(key, 0)
+        if n >= total:
+            n = 0 if self.loop else total - 1
+        self._cursors[key] = n + 1
+        return self.archive.stream_frame(window_name, region, n)
+
+    def grab(self, window_name, region=None):
+        with self._lock:
+            frame = self._next(window_name, region)
+            if frame is not None:
+                return frame.image
+            if region is not None:
+                full = self._next(window_name, None)
+                if full is not None:
+                    (x1, y1), (x2, y2) = region
+                    return full.image.crop((x1, y1, x2, y2))
+        return None
+
+    def close(self):
+        self.archive.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a frame archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info")
+    info.add_argument("archive")
+    export = sub.add_parser("export")
+    export.add_argument("archive")
+    export.add_argument("index", type=int)
+    export.add_argument("output")
+    args = parser.parse_args()
+
+    with FrameArchive(args.archive) as archive:
+        if args.command == "info":
+            size = archive.path.stat().st_size
+            print(f"{archive.path}: {len(archive)} frames in {len(archive.chunks)} chunks, {size / 1e6:.1f} MB")
+            if len(archive):
+                print(f"  {size / len(archive) / 1024:.1f} KB per frame, "
+                      f"{archive.chunks[0][4]:.0f} - {archive.chunks[-1][5]:.0f}")
+            for (window_name, region), count in sorted(archive.streams().items(), key=lambda s: -s[1]):
+                print(f"  {window_name:25} {str(region):28} {count:7} frames")
+        else:
+            frame = archive.frame(args.index)
+            frame.image.save(args.output)
+            print(f"Saved frame {args.index} ({frame.window}, {frame.region}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
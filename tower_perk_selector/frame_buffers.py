@@ -0,0 +1,249 @@
+"""
+Reusable capture buffers with NumPy views instead of per-capture PIL copies.
+
+The old capture path copied every frame several times: GetBitmapBits into a
+bytes object, Image.frombuffer(... 'BGRX' ...) into a PIL image, then crop()
+and convert() for each read. Here each capture BitBlts into a DIB section
+owned by a BufferPool and reused across ticks, and NumPy views straight into
+its bits:
+
+    tiles = print_window(hwnd, (width, height), rects, POOL, (window_name, 'plan'))
+    rect, view = tiles[0]
+    view.crop((10, 5, 200, 30))        # FrameView, still no copy
+    view.rgb[y, x]                     # probe sample, no copy
+    view.crop(box).to_image()          # PIL copy, only at the OCR boundary
+
+A FrameView is only valid until the next capture of the same size into the
+same pool slot (window, purpose and rect index); anything kept longer must be
+converted with to_image() or copy() first.
+"""
+
+import ctypes
+import threading
+import weakref
+
+from PIL import Image
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+try:
+    from ctypes import windll, wintypes
+    GDI_SUPPORT = True
+except ImportError:
+    GDI_SUPPORT = False
+
+PW_CLIENTONLY = 0x1
+PW_RENDERFULLCONTENT = 0x2
+SRCCOPY = 0x00CC0020
+BI_RGB = 0
+DIB_RGB_COLORS = 0
+# DIB sections kept per pool; beyond either limit the least recently used leave the pool. Each
+# section is deleted only once no view of it is left, so a view held by another thread stays
+# readable. A tick needs a few per window, so only long-unused sizes are evicted.
+MAX_POOLED_BUFFERS = 256
+MAX_POOLED_BYTES = 128 * 1024 * 1024
+
+
+class FrameView:
+    """BGRX pixels of a capture: an (H, W, 4) uint8 array, usually a view into a pooled buffer."""
+
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        self.array = array
+
+    @property
+    def size(self):
+        return (self.array.shape[1], self.array.shape[0])
+
+    @property
+    def rgb(self):
+        """(H, W, 3) view in RGB order (negative channel stride, no copy)."""
+        return self.array[:, :, 2::-1]
+
+    def crop(self, box):
+        """View of the (x1, y1, x2, y2) box; copies (black padded) only if the box leaves the frame."""
+        x1, y1, x2, y2 = box
+        height, width = self.array.shape[:2]
+        if 0 <= x1 <= x2 <= width and 0 <= y1 <= y2 <= height:
+            return FrameView(self.array[y1:y2, x1:x2])
+        padded = np.zeros((max(0, y2 - y1), max(0, x2 - x1), 4), dtype=np.uint8)
+        sx1, sy1, sx2, sy2 = max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+        if sx2 > sx1 and sy2 > sy1:
+            padded[sy1 - y1:sy2 - y1, sx1 - x1:sx2 - x1] = self.array[sy1:sy2, sx1:sx2]
+        return FrameView(padded)
+
+    def getpixel(self, point):
+        x, y = point
+        b, g, r = self.array[y, x, :3]
+        return (int(r), int(g), int(b))
+
+    def copy(self):
+        return FrameView(self.array.copy())
+
+    def to_image(self):
+        """RGB PIL image, decoded by PIL from the BGRX rows (a copy, never aliasing the pooled buffer)."""
+        array = np.ascontiguousarray(self.array)      # no-op for whole tiles
+        return Image.frombuffer('RGB', self.size, array, 'raw', 'BGRX', 0, 1)
+
+
+def to_image(frame):
+    """PIL image for a FrameView; PIL images and None pass through."""
+    return frame.to_image() if isinstance(frame, FrameView) else frame
+
+
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [('biSize', ctypes.c_uint32), ('biWidth', ctypes.c_int32), ('biHeight', ctypes.c_int32),
+                ('biPlanes', ctypes.c_uint16), ('biBitCount', ctypes.c_uint16), ('biCompression', ctypes.c_uint32),
+                ('biSizeImage', ctypes.c_uint32), ('biXPelsPerMeter', ctypes.c_int32),
+                ('biYPelsPerMeter', ctypes.c_int32), ('biClrUsed', ctypes.c_uint32), ('biClrImportant', ctypes.c_uint32)]
+
+
+_gdi_lock = threading.Lock()
+_gdi_ready = False
+
+
+def _gdi():
+    """user32 / gdi32 with handle-sized signatures (the ctypes int default truncates 64-bit handles)."""
+    global _gdi_ready
+    user32, gdi32 = windll.user32, windll.gdi32
+    if _gdi_ready:
+        return user32, gdi32
+    with _gdi_lock:
+        handle = ctypes.c_void_p
+        user32.GetWindowDC.restype = handle
+        user32.GetWindowDC.argtypes = [wintypes.HWND]
+        user32.ReleaseDC.argtypes = [wintypes.HWND, handle]
+        user32.PrintWindow.argtypes = [wintypes.HWND, handle, wintypes.UINT]
+        gdi32.CreateCompatibleDC.restype = handle
+        gdi32.CreateCompatibleDC.argtypes = [handle]
+        gdi32.CreateCompatibleBitmap.restype = handle
+        gdi32.CreateCompatibleBitmap.argtypes = [handle, ctypes.c_int, ctypes.c_int]
+        gdi32.CreateDIBSection.restype = handle
+        gdi32.CreateDIBSection.argtypes = [handle, ctypes.c_void_p, wintypes.UINT,
+                                           ctypes.POINTER(ctypes.c_void_p), handle, wintypes.DWORD]
+        gdi32.SelectObject.restype = handle
+        gdi32.SelectObject.argtypes = [handle, handle]
+        gdi32.DeleteObject.argtypes = [handle]
+        gdi32.DeleteDC.argtypes = [handle]
+        gdi32.BitBlt.argtypes = [handle, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 handle, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+        _gdi_ready = True
+    return user32, gdi32
+
+
+def _delete_bitmap(hbitmap):
+    _gdi()[1].DeleteObject(hbitmap)
+
+
+class BufferPool:
+    """32-bit top-down DIB sections reused per (key, size), each exposed as an (H, W, 4) NumPy array.
+
+    Keyed by size as well, so single-region grabs of different regions (cards, the New
+    Perk bar, a probe pixel) each keep their own buffer instead of recreating one.
+    The arrays do not own the section's memory; a finalizer on the ctypes buffer behind
+    them deletes the section when the pool and every view have let go of it.
+    """
+
+    def __init__(self, limit=MAX_POOLED_BUFFERS, max_bytes=MAX_POOLED_BYTES):
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._buffers = {}      # (key, width, height) -> (hbitmap, array); least recently used first
+        self._lock = threading.Lock()
+        self.stats = {'reused': 0, 'created': 0, 'evicted': 0}
+
+    def get(self, key, width, height, hdc):
+        """Return (hbitmap, array) for key at this size, creating the DIB section on first use."""
+        slot = (key, width, height)
+        with self._lock:
+            entry = self._buffers.pop(slot, None)
+            if entry is not None:
+                self._buffers[slot] = entry
+                self.stats['reused'] += 1
+                return entry
+            entry = self._create(width, height, hdc)
+            self._buffers[slot] = entry
+            self.nbytes += entry[1].nbytes
+            self.stats['created'] += 1
+            while len(self._buffers) > 1 and (len(self._buffers) > self.limit or self.nbytes > self.max_bytes):
+                self._free(self._buffers.pop(next(iter(self._buffers))))
+                self.stats['evicted'] += 1
+            return entry
+
+    def _free(self, entry):
+        """Drop the pool's reference; the section itself goes with the last view (see _create)."""
+        self.nbytes -= entry[1].nbytes
+
+    @staticmethod
+    def _create(width, height, hdc):
+        _, gdi32 = _gdi()
+        header = _BITMAPINFOHEADER(ctypes.sizeof(_BITMAPINFOHEADER), width, -height, 1, 32, BI_RGB, 0, 0, 0, 0, 0)
+        bits = ctypes.c_void_p()
+        hbitmap = gdi32.CreateDIBSection(hdc, ctypes.byref(header), DIB_RGB_COLORS, ctypes.byref(bits), None, 0)
+        if not hbitmap or not bits.value:
+            raise OSError(f"CreateDIBSection failed for {width}x{height}")
+        raw = (ctypes.c_ubyte * (width * height * 4)).from_address(bits.value)
+        # Every array and view made from raw keeps it alive through its base chain
+        weakref.finalize(raw, _delete_bitmap, hbitmap)
+        return hbitmap, np.ctypeslib.as_array(raw).reshape(height, width, 4)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._buffers.values():
+                self._free(entry)
+            self._buffers.clear()
+
+
+def _clip(rect, size):
+    x1, y1, x2, y2 = max(0, rect[0]), max(0, rect[1]), min(size[0], rect[2]), min(size[1], rect[3])
+    return (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+
+
+def print_window(hwnd, size, rects, pool, key):
+    """Render a window's client area with PrintWindow and BitBlt each rect into a pooled buffer.
+
+    size is the client (width, height); rects are client-area (x1, y1, x2, y2), parts outside
+    the client area come back black. Buffers are pooled under (key, slot index).
+    Returns [(rect, FrameView)] in the order of rects.
+    """
+    user32, gdi32 = _gdi()
+    width, height = size
+    hwnd_dc = user32.GetWindowDC(hwnd)
+    render_dc = gdi32.CreateCompatibleDC(hwnd_dc)
+    render_bitmap = gdi32.CreateCompatibleBitmap(hwnd_dc, width, height)
+    previous_render = gdi32.SelectObject(render_dc, render_bitmap)
+    tile_dc = gdi32.CreateCompatibleDC(hwnd_dc)
+    previous_tile = None
+    try:
+        # Client area only: borders and the title bar are never rendered
+        if not user32.PrintWindow(hwnd, render_dc, PW_CLIENTONLY | PW_RENDERFULLCONTENT):
+            user32.PrintWindow(hwnd, render_dc, PW_CLIENTONLY)
+        tiles = []
+        for slot, rect in enumerate(rects):
+            x1, y1, x2, y2 = rect
+            hbitmap, array = pool.get((key, slot), x2 - x1, y2 - y1, hwnd_dc)
+            selected = gdi32.SelectObject(tile_dc, hbitmap)
+            if previous_tile is None:
+                previous_tile = selected
+            inside = _clip(rect, size)
+            if inside != rect:
+                array[:] = 0
+            if inside is not None:
+                ix1, iy1, ix2, iy2 = inside
+                gdi32.BitBlt(tile_dc, ix1 - x1, iy1 - y1, ix2 - ix1, iy2 - iy1, render_dc, ix1, iy1, SRCCOPY)
+            tiles.append((rect, FrameView(array)))
+        gdi32.GdiFlush()
+        return tiles
+    finally:
+        if previous_tile is not None:
+            gdi32.SelectObject(tile_dc, previous_tile)
+        gdi32.DeleteDC(tile_dc)
+        gdi32.SelectObject(render_dc, previous_render)
+        gdi32.DeleteObject(render_bitmap)
+        gdi32.DeleteDC(render_dc)
+        user32.ReleaseDC(hwnd, hwnd_dc)
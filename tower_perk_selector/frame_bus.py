@@ -0,0 +1,159 @@
+"""
+Shared-memory frame bus for OCR worker processes.
+
+Sending PIL images to a process pool pickles every one of them (up to 14 OCR
+variants per card) through a pipe. The bus is one multiprocessing.shared_memory
+block split into fixed-size slots: the owning process writes an image into a
+free slot once and sends workers only a small FrameRef; workers attach to the
+block by name and read the pixels in place.
+
+    bus = FrameBus(slots=16, slot_bytes=1 << 20)           # owner (capture process)
+    ref = bus.put(image)                                   # refcount 1
+    executor.submit(work, ref)                             # FrameRef pickles to a few bytes
+    bus.release(ref)                                       # after the worker is done
+
+    reader = FrameBus.attach(bus.name, 16, 1 << 20)        # in a worker
+    image = reader.read(ref)                               # view into the slot, no copy
+
+Reference counts live in the owner, which is the only writer: put() returns a
+ref holding one reference, retain() adds one per extra consumer, and the slot
+is reused once release() has dropped the count to zero. Each slot header
+carries a generation number, so a worker reading a ref whose slot was reused
+gets StaleFrameError instead of someone else's pixels.
+"""
+
+import struct
+import threading
+from collections import deque, namedtuple
+from multiprocessing import shared_memory
+
+from PIL import Image
+
+DEFAULT_SLOTS = 16
+DEFAULT_SLOT_BYTES = 1024 * 1024     # a 2x-upscaled RGB card crop is ~400 KB
+MODES = {'L': 1, 'RGB': 3, 'RGBA': 4}
+
+# generation, mode index, width, height
+_HEADER = struct.Struct('<QIII')
+HEADER_BYTES = 32
+_MODE_NAMES = list(MODES)
+
+FrameRef = namedtuple('FrameRef', 'slot generation mode width height')
+
+
+class StaleFrameError(LookupError):
+    """The slot a FrameRef points at has been released and reused."""
+
+
+def _attach_shared_memory(name):
+    """Open an existing block. Readers are child processes sharing the owner's resource
+    tracker, so an untracked attach (3.13+) and a tracked one both leave unlinking to the owner."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class FrameBus:
+    """A ring of fixed-size image slots in one shared memory block."""
+
+    def __init__(self, slots=DEFAULT_SLOTS, slot_bytes=DEFAULT_SLOT_BYTES, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        stride = HEADER_BYTES + slot_bytes
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=slots * stride)
+        else:
+            self._shm = _attach_shared_memory(name)
+        self.name = self._shm.name
+        self._refcounts = [0] * slots
+        self._generations = [0] * slots
+        self._free = deque(range(slots))
+        self._available = threading.Condition()
+        self.stats = {'puts': 0, 'bytes': 0, 'waits': 0, 'too_large': 0, 'timeouts': 0}
+
+    @classmethod
+    def attach(cls, name, slots=DEFAULT_SLOTS, slot_bytes=DEFAULT_SLOT_BYTES):
+        """Reader side: open the owner's block by name (read() only)."""
+        return cls(slots, slot_bytes, name=name)
+
+    def _offset(self, slot):
+        return slot * (HEADER_BYTES + self.slot_bytes)
+
+    def fits(self, image):
+        return image.mode in MODES and image.width * image.height * MODES[image.mode] <= self.slot_bytes
+
+    def put(self, image, timeout=None):
+        """Copy an image into a free slot and return its FrameRef (one reference held).
+
+        Returns None if the image does not fit a slot (mode or size) or no slot was
+        released within timeout seconds; callers then send the image itself.
+        """
+        if not self.fits(image):
+            with self._available:
+                self.stats['too_large'] += 1
+            return None
+        with self._available:
+            if not self._free:
+                self.stats['waits'] += 1
+                if not self._available.wait_for(lambda: self._free, timeout):
+                    self.stats['timeouts'] += 1
+                    return None
+            slot = self._free.popleft()
+            self._generations[slot] += 1
+            generation = self._generations[slot]
+            self._refcounts[slot] = 1
+        data = image.tobytes()
+        offset = self._offset(slot)
+        start = offset + HEADER_BYTES
+        self._shm.buf[start:start + len(data)] = data
+        _HEADER.pack_into(self._shm.buf, offset, generation, _MODE_NAMES.index(image.mode),
+                          image.width, image.height)
+        with self._available:
+            self.stats['puts'] += 1
+            self.stats['bytes'] += len(data)
+        return FrameRef(slot, generation, image.mode, image.width, image.height)
+
+    def retain(self, ref):
+        """Add a reference for one more consumer of the same slot."""
+        with self._available:
+            self._check(ref)
+            self._refcounts[ref.slot] += 1
+
+    def release(self, ref):
+        """Drop one reference; the slot becomes free when none are left."""
+        with self._available:
+            self._check(ref)
+            self._refcounts[ref.slot] -= 1
+            if self._refcounts[ref.slot] == 0:
+                self._free.append(ref.slot)
+                self._available.notify()
+
+    def _check(self, ref):
+        if self._generations[ref.slot] != ref.generation or self._refcounts[ref.slot] <= 0:
+            raise StaleFrameError(f"frame slot {ref.slot} generation {ref.generation} was already released")
+
+    def read(self, ref):
+        """PIL image over the slot's pixels (shares the memory: use it before the owner releases ref)."""
+        offset = self._offset(ref.slot)
+        generation, _, width, height = _HEADER.unpack_from(self._shm.buf, offset)
+        if generation != ref.generation:
+            raise StaleFrameError(f"frame slot {ref.slot} now holds generation {generation}, not {ref.generation}")
+        start = offset + HEADER_BYTES
+        size = width * height * MODES[ref.mode]
+        return Image.frombuffer(ref.mode, (width, height), self._shm.buf[start:start + size], 'raw', ref.mode, 0, 1)
+
+    @property
+    def in_use(self):
+        with self._available:
+            return self.slots - len(self._free)
+
+    def close(self):
+        """Detach; the owner also frees the block."""
+        try:
+            self._shm.close()
+        except BufferError:
+            pass            # an image from read() is still alive; the OS frees the mapping at exit
+        if self.owner:
+            self._shm.unlink()
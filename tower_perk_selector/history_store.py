@@ -0,0 +1,235 @@
+"""
+SQLite history of perk offers, selections, wave-1 events and focus aborts.
+
+Rows are queued through the buffered log writer (log_writer.py) and inserted
+by its background thread, one transaction per batch, so the automator never
+waits on the database. Queries open their own read connection.
+
+    python -m tower_perk_selector.history_store [--db perk_history.sqlite3] [--days 7] [--window NAME]
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from . import data_dir
+
+DEFAULT_DB_NAME = "perk_history.sqlite3"
+
+
+def default_db():
+    """The history database the automator writes: perk_history.sqlite3 in its data directory."""
+    return data_dir() / DEFAULT_DB_NAME
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS perk_offers (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    window TEXT NOT NULL,
+    decision_id TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    perk_id TEXT,
+    perk_text TEXT,
+    priority INTEGER,
+    effective_priority INTEGER,
+    is_purple INTEGER NOT NULL DEFAULT 0,
+    selected INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_offers_window_ts ON perk_offers (window, ts);
+CREATE INDEX IF NOT EXISTS idx_offers_perk ON perk_offers (perk_id);
+
+CREATE TABLE IF NOT EXISTS wave1_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    window TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_wave1_window_ts ON wave1_events (window, ts);
+
+CREATE TABLE IF NOT EXISTS focus_aborts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    window TEXT NOT NULL,
+    stage TEXT,
+    attempts INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_focus_window_ts ON focus_aborts (window, ts);
+"""
+
+INSERTS = {
+    'perk_offers': "INSERT INTO perk_offers (ts, window, decision_id, slot, perk_id, perk_text, priority, "
+                   "effective_priority, is_purple, selected, outcome) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'wave1_events': "INSERT INTO wave1_events (ts, window) VALUES (?, ?)",
+    'focus_aborts': "INSERT INTO focus_aborts (ts, window, stage, attempts) VALUES (?, ?, ?, ?)",
+}
+
+
+class SqliteStore:
+    """Tables in the history database: schema setup, a write side fed by a BufferedLogWriter
+    and read queries. Subclasses set SCHEMA and INSERTS (table -> INSERT statement)."""
+
+    SCHEMA = ""
+    INSERTS = {}
+
+    def __init__(self, path=None, writer=None):
+        self.path = Path(path) if path else default_db()
+        self.writer = writer
+        self._write_conn = None
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---------- write side ----------
+
+    def _queue(self, table, rows):
+        """Queue rows for one table; they are inserted together in the writer's next batch."""
+        if self.writer is not None:
+            self.writer.write(self, (table, rows))
+        else:
+            self.write_batch([(table, rows)])
+
+    def write_batch(self, items):
+        """Insert queued (table, rows) items in one transaction (called on the writer thread)."""
+        if self._write_conn is None:
+            self._write_conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        grouped = {}
+        for table, rows in items:
+            grouped.setdefault(table, []).extend(rows)
+        with self._write_conn:
+            for table, table_rows in grouped.items():
+                self._write_conn.executemany(self.INSERTS[table], table_rows)
+
+    def _next_id(self, window_name, ts=None):
+        """Unique id for a group of rows (a decision, a card read)."""
+        with self._counter_lock:
+            self._counter += 1
+            return f"{window_name}:{time.time() if ts is None else ts:.3f}:{self._counter}"
+
+    # ---------- query API ----------
+
+    def _query(self, sql, params=()):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _filters(since, window, prefix="WHERE"):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if window is not None:
+            clauses.append("window = ?")
+            params.append(window)
+        return (f"{prefix} " + " AND ".join(clauses)) if clauses else "", params
+
+
+class HistoryStore(SqliteStore):
+    """Write side (via a BufferedLogWriter) and query API for the history database."""
+
+    SCHEMA = SCHEMA
+    INSERTS = INSERTS
+
+    # ---------- write side ----------
+
+    def record_decision(self, window_name, cards, selected):
+        """Record every offered card of one decision.
+
+        cards: dicts with text, perk_id, priority, effective_priority, purple.
+        selected: 1-based index of the chosen card, or an outcome string such as 'NONE - UNRECOGNIZED'.
+        """
+        ts = time.time()
+        decision_id = self._next_id(window_name, ts)
+        outcome = None if isinstance(selected, int) else str(selected)
+        self._queue('perk_offers', [
+            (ts, window_name, decision_id, slot, card.get('perk_id'), card.get('text'),
+             card.get('priority'), card.get('effective_priority'), int(bool(card.get('purple'))),
+             int(selected == slot), outcome)
+            for slot, card in enumerate(cards, start=1)
+        ])
+
+    def record_wave1(self, window_name):
+        self._queue('wave1_events', [(time.time(), window_name)])
+
+    def record_focus_abort(self, window_name, stage, attempts=None):
+        self._queue('focus_aborts', [(time.time(), window_name, stage, attempts)])
+
+    # ---------- query API ----------
+
+    def offer_frequency(self, since=None, window=None):
+        """Return [(perk_id, offers, selected)] ordered by offers, most frequent first."""
+        where, params = self._filters(since, window)
+        return self._query(
+            f"SELECT COALESCE(perk_id, '(unrecognized)'), COUNT(*), SUM(selected) FROM perk_offers {where} "
+            f"GROUP BY perk_id ORDER BY COUNT(*) DESC", params)
+
+    def time_between_perks(self, since=None, window=None):
+        """Return [(window, decisions, avg_seconds, min_seconds, max_seconds)] between consecutive decisions."""
+        where, params = self._filters(since, window)
+        return self._query(
+            f"""
+            WITH decisions AS (
+                SELECT window, MIN(ts) AS ts FROM perk_offers {where} GROUP BY decision_id
+            ), gaps AS (
+                SELECT window, ts - LAG(ts) OVER (PARTITION BY window ORDER BY ts) AS gap FROM decisions
+            )
+            SELECT window, COUNT(*), AVG(gap), MIN(gap), MAX(gap) FROM gaps GROUP BY window ORDER BY window
+            """, params)
+
+    def unrecognized_rate(self, since=None, window=None):
+        """Return [(window, offers, unrecognized, rate)] for OCR results that matched no perk."""
+        where, params = self._filters(since, window)
+        return self._query(
+            f"SELECT window, COUNT(*), SUM(perk_id IS NULL), AVG(perk_id IS NULL) FROM perk_offers {where} "
+            f"GROUP BY window ORDER BY window", params)
+
+    def focus_abort_counts(self, since=None, window=None):
+        """Return [(window, stage, aborts)]."""
+        where, params = self._filters(since, window)
+        return self._query(
+            f"SELECT window, stage, COUNT(*) FROM focus_aborts {where} GROUP BY window, stage ORDER BY window", params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perk history statistics")
+    parser.add_argument("--db", default=None, help="default: perk_history.sqlite3 in PERK_AUTOMATOR_HOME or here")
+    parser.add_argument("--days", type=float, default=None, help="only look at the last N days")
+    parser.add_argument("--window", default=None)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    since = time.time() - args.days * 86400 if args.days else None
+
+    print("Offer frequency per perk:")
+    for perk_id, offers, selected in store.offer_frequency(since, args.window):
+        print(f"  {perk_id:45} offered {offers:5}  selected {selected or 0:5}")
+
+    print("\nTime between perks per window:")
+    for window, count, avg_gap, min_gap, max_gap in store.time_between_perks(since, args.window):
+        if avg_gap is None:
+            print(f"  {window}: {count} decision(s)")
+        else:
+            print(f"  {window}: {count} decisions, avg {avg_gap:.1f}s (min {min_gap:.1f}s, max {max_gap:.1f}s)")
+
+    print("\nOCR unrecognized rate:")
+    for window, offers, unrecognized, rate in store.unrecognized_rate(since, args.window):
+        print(f"  {window}: {unrecognized}/{offers} ({rate * 100:.1f}%)")
+
+    print("\nFocus aborts:")
+    for window, stage, count in store.focus_abort_counts(since, args.window):
+        print(f"  {window} [{stage}]: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Automatic layout calibration from anchor templates.
+
+An anchor is a small, stable piece of the game UI whose position in the base
+layouts is known: the play/pause button, the New Perk bar and the dialog's
+close X. Templates of them are cropped once from a frame where the current
+coordinates are right:
+
+    python -m tower_perk_selector.layout_calibration templates "BlueStacks App Player"      # game running
+    python -m tower_perk_selector.layout_calibration templates "BlueStacks App Player" --anchors play_pause close_x   # paused, dialog open
+
+Calibration then finds the anchors anywhere in a full frame with multi-scale
+normalized cross-correlation, fits x' = x * sx + dx, y' = y * sy + dy from the
+anchors' template positions to the found ones, and stores the result per
+window title in layout_profiles.json:
+
+    python -m tower_perk_selector.layout_calibration calibrate "BlueStacks App Player" [--frame shot.png]
+
+The automator merges the stored scale / offset into the window's profile (see
+LAYOUT CALIBRATION in automator.py). While it runs it only
+checks the anchors where the profile expects them, which is cheap, and
+recalibrates after several failed checks in a row.
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False   # calibration needs numpy; without it Calibrator.ready is False
+
+TEMPLATE_INDEX = "anchors.json"
+
+# Anchor name -> (coords key, half-size of the box around a point key or None for a region key)
+ANCHORS = {
+    'play_pause': ('play_pause', 18),
+    'new_perk_bar': ('new_perk_region', None),
+    'close_x': ('close_x', 16),
+}
+DEFAULT_ANCHORS = ('play_pause', 'new_perk_bar')   # visible whenever the game is on screen
+
+SEARCH_WIDTH = 720          # frames are searched at this width first, then refined at full size
+SCALES = tuple(round(0.5 * 1.05 ** i, 3) for i in range(29))   # 0.5 .. ~1.96
+REFINE_STEPS = (0.975, 0.9875, 1.0, 1.0125, 1.025)   # scale factors tried around the coarse hit
+MIN_TEMPLATE_SIDE = 6       # pixels; smaller scaled templates are skipped
+MIN_PATCH_VARIANCE = 1.0    # per-pixel gray variance below which a frame patch counts as flat
+MATCH_THRESHOLD = 0.75      # NCC an anchor needs to count as found
+VERIFY_MARGIN = 6           # pixels searched around the expected anchor box by verify()
+MIN_AXIS_SPREAD = 40        # reference pixels between anchors needed to fit a scale on that axis
+SCALE_TOLERANCE = 0.15      # fitted scale vs. the scale the templates matched at (rejects the wrong layout)
+
+
+def _gray(image):
+    """Grayscale float32 array of a PIL image or an array."""
+    if isinstance(image, np.ndarray):
+        array = image.astype(np.float32)
+        return array.mean(axis=2) if array.ndim == 3 else array
+    return np.asarray(image.convert('L'), dtype=np.float32)
+
+
+def _resize(array, factor):
+    height, width = array.shape
+    size = (max(1, round(width * factor)), max(1, round(height * factor)))
+    return np.asarray(Image.fromarray(array).resize(size, Image.BILINEAR), dtype=np.float32)
+
+
+def _window_sums(integral, height, width):
+    """Sum of every height x width window, from a zero-padded integral image."""
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+
+def match_template(frame, template):
+    """Normalized cross-correlation of template at every position of frame.
+
+    Returns (score, (x, y)) of the best top-left position, or (-1.0, None) if the
+    template does not fit or is flat.
+    """
+    frame_h, frame_w = frame.shape
+    h, w = template.shape
+    if h > frame_h or w > frame_w:
+        return -1.0, None
+    t = template - template.mean()
+    t_norm = math.sqrt(float((t * t).sum()))
+    if t_norm * t_norm < MIN_PATCH_VARIANCE * h * w:
+        return -1.0, None
+    size = (frame_h + h - 1, frame_w + w - 1)
+    spectrum = np.fft.rfft2(frame, size) * np.fft.rfft2(t[::-1, ::-1], size)
+    correlation = np.fft.irfft2(spectrum, size)[h - 1:frame_h, w - 1:frame_w]
+
+    # Centered so the integral images stay small; flat patches (ad banners, backgrounds)
+    # would otherwise divide rounding noise by a near-zero variance
+    f64 = frame.astype(np.float64)
+    f64 -= f64.mean()
+    integral = np.pad(f64.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    integral_sq = np.pad((f64 * f64).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    sums = _window_sums(integral, h, w)
+    variance = _window_sums(integral_sq, h, w) - sums * sums / (h * w)
+    textured = variance > MIN_PATCH_VARIANCE * h * w
+    ncc = np.zeros_like(variance)
+    ncc[textured] = correlation[textured] / (np.sqrt(variance[textured]) * t_norm)
+    y, x = np.unravel_index(int(np.argmax(ncc)), ncc.shape)
+    return float(ncc[y, x]), (int(x), int(y))
+
+
+def find_anchor(frame, template, scales=SCALES, search_width=SEARCH_WIDTH):
+    """Locate template in frame over scales (both grayscale arrays).
+
+    Searches a downscaled frame first and refines the best hit at full size.
+    Returns (score, (x, y), scale) with the top-left corner in frame pixels.
+    """
+    factor = min(1.0, search_width / frame.shape[1])
+    small = _resize(frame, factor) if factor < 1.0 else frame
+    best = (-1.0, None, None)
+    for scale in scales:
+        t = _resize(template, scale * factor)
+        if min(t.shape) < MIN_TEMPLATE_SIDE:
+            continue
+        score, position = match_template(small, t)
+        if score > best[0]:
+            best = (score, position, scale)
+    score, position, scale = best
+    if position is None or factor == 1.0:
+        return best
+
+    # Refine around the coarse hit at full resolution, between the neighbouring coarse scales
+    refined = (-1.0, None, None)
+    margin = int(math.ceil(2 / factor))
+    for step in REFINE_STEPS:
+        fine_scale = scale * step
+        t = _resize(template, fine_scale)
+        x0 = max(0, int(position[0] / factor) - margin)
+        y0 = max(0, int(position[1] / factor) - margin)
+        x1 = min(frame.shape[1], int(position[0] / factor) + t.shape[1] + margin)
+        y1 = min(frame.shape[0], int(position[1] / factor) + t.shape[0] + margin)
+        fine_score, fine_position = match_template(frame[y0:y1, x0:x1], t)
+        if fine_position is not None and fine_score > refined[0]:
+            refined = (fine_score, (x0 + fine_position[0], y0 + fine_position[1]), fine_scale)
+    return refined if refined[1] is not None else best
+
+
+def anchor_box(coords, anchor):
+    """Reference box ((x1, y1), (x2, y2)) of an anchor in a coords mapping."""
+    key, half = ANCHORS[anchor]
+    value = coords[key]
+    if half is None:
+        return tuple(tuple(point) for point in value)
+    x, y = value
+    return ((x - half, y - half), (x + half, y + half))
+
+
+def _center(box):
+    (x1, y1), (x2, y2) = box
+    return ((x1 + x2) / 2, (y1 + y2) / 2)
+
+
+def _fit_axis(reference, found, scales):
+    """Least-squares (scale, offset) for one axis; the template scale if the anchors are too close."""
+    reference = np.asarray(reference, dtype=np.float64)
+    found = np.asarray(found, dtype=np.float64)
+    if len(reference) >= 2 and reference.max() - reference.min() >= MIN_AXIS_SPREAD:
+        s, d = np.polyfit(reference, found, 1)
+        return float(s), float(d)
+    s = float(np.median(scales))
+    return s, float(np.mean(found - s * reference))
+
+
+def solve_transform(matches):
+    """Fit (sx, sy, dx, dy) from [(reference_box, found_box, template_scale)]."""
+    reference = [_center(ref) for ref, _, _ in matches]
+    found = [_center(box) for _, box, _ in matches]
+    scales = [scale for _, _, scale in matches]
+    sx, dx = _fit_axis([p[0] for p in reference], [p[0] for p in found], scales)
+    sy, dy = _fit_axis([p[1] for p in reference], [p[1] for p in found], scales)
+    return sx, sy, dx, dy
+
+
+class TemplateStore:
+    """Anchor templates on disk: <directory>/anchors.json plus one PNG per template."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._templates = None
+        self._lock = threading.Lock()
+
+    @property
+    def templates(self):
+        """[{'anchor', 'layout', 'box', 'file', 'array'}], loaded on first use."""
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = self._load()
+        return self._templates
+
+    def _load(self):
+        index_path = self.directory / TEMPLATE_INDEX
+        if not index_path.exists():
+            return []
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        templates = []
+        for file_name, entry in index.items():
+            path = self.directory / file_name
+            if not path.exists():
+                continue
+            with Image.open(path) as image:
+                array = _gray(image)
+            templates.append({'anchor': entry['anchor'], 'layout': entry['layout'],
+                              'box': tuple(tuple(p) for p in entry['box']), 'file': file_name, 'array': array})
+        return templates
+
+    def for_layout(self, layout):
+        return [t for t in self.templates if t['layout'] == layout]
+
+    def layouts(self):
+        return sorted({t['layout'] for t in self.templates})
+
+    def add(self, frame, anchor, layout, box, reference_box=None):
+        """Crop box out of frame (a PIL image) and store it as a template of anchor in layout.
+
+        reference_box is the anchor's box in the base layout (default: box).
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index_path = self.directory / TEMPLATE_INDEX
+        index = {}
+        if index_path.exists():
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        number = 1
+        while f"{layout}_{anchor}_{number}.png" in index:
+            number += 1
+        file_name = f"{layout}_{anchor}_{number}.png"
+        reference_box = reference_box or box
+        (x1, y1), (x2, y2) = box
+        crop = frame.crop((x1, y1, x2, y2))
+        (rx1, ry1), (rx2, ry2) = reference_box
+        if crop.size != (rx2 - rx1, ry2 - ry1):
+            # Keep templates at base-layout size so template scale 1.0 means "as laid out"
+            crop = crop.resize((rx2 - rx1, ry2 - ry1), Image.BILINEAR)
+        crop.save(self.directory / file_name)
+        index[file_name] = {'anchor': anchor, 'layout': layout, 'box': [list(p) for p in reference_box]}
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        self._templates = None
+        return file_name
+
+
+class Calibrator:
+    """Finds the anchor templates in frames and solves a window's layout transform."""
+
+    def __init__(self, store, threshold=MATCH_THRESHOLD):
+        self.store = store
+        self.threshold = threshold
+
+    @property
+    def ready(self):
+        return NUMPY_SUPPORT and bool(self.store.templates)
+
+    def calibrate(self, frame):
+        """Search a full frame (PIL image) for every template.
+
+        Returns {'layout', 'scale', 'offset', 'score', 'anchors'} for the base layout whose
+        anchors matched best, or None if no layout had an anchor above the threshold with a
+        consistent transform.
+        Several templates of one anchor (e.g. play and pause icons) count once, best first.
+        """
+        gray = _gray(frame)
+        best = None
+        for layout in self.store.layouts():
+            found = {}
+            for template in self.store.for_layout(layout):
+                score, position, scale = find_anchor(gray, template['array'])
+                if position is None or score < self.threshold:
+                    continue
+                if template['anchor'] in found and found[template['anchor']][0] >= score:
+                    continue
+                h, w = template['array'].shape
+                box = (position, (position[0] + w * scale, position[1] + h * scale))
+                found[template['anchor']] = (score, template['box'], box, scale)
+            if not found:
+                continue
+            matches = [(ref, box, scale) for _, ref, box, scale in found.values()]
+            transform = solve_transform(matches)
+            template_scale = float(np.median([scale for _, _, scale in matches]))
+            if any(abs(s / template_scale - 1.0) > SCALE_TOLERANCE for s in transform[:2]):
+                continue    # anchors found, but not where this layout puts them relative to each other
+            mean_score = sum(match[0] for match in found.values()) / len(found)
+            # Prefer the layout with more anchors found, then the better mean score
+            if best is None or (len(found), mean_score) > (len(best[1]), best[0]):
+                best = (mean_score, found, layout, transform)
+        if best is None:
+            return None
+        mean_score, found, layout, (sx, sy, dx, dy) = best
+        return {'layout': layout, 'scale': (round(sx, 4), round(sy, 4)), 'offset': (round(dx, 1), round(dy, 1)),
+                'score': round(mean_score, 3), 'anchors': sorted(found)}
+
+    def verify(self, frame, layout, transform):
+        """Best anchor score near where `transform` (a layouts.Transform) puts the layout's anchors.
+
+        Only a few small crops are matched, at the transform's scale, so this is cheap
+        enough to run from the main loop. Returns -1.0 if the layout has no templates.
+        """
+        gray = _gray(frame)
+        best = -1.0
+        for template in self.store.for_layout(layout):
+            (x1, y1), (x2, y2) = template['box']
+            left, top = x1 * transform.sx + transform.dx, y1 * transform.sy + transform.dy
+            right, bottom = x2 * transform.sx + transform.dx, y2 * transform.sy + transform.dy
+            t = _resize(template['array'], transform.sx) if abs(transform.sx - 1.0) > 1e-3 else template['array']
+            region = gray[max(0, int(top) - VERIFY_MARGIN):max(0, int(math.ceil(bottom)) + VERIFY_MARGIN),
+                          max(0, int(left) - VERIFY_MARGIN):max(0, int(math.ceil(right)) + VERIFY_MARGIN)]
+            score, _ = match_template(region, t)
+            best = max(best, score)
+        return best
+
+
+def load_profiles(path):
+    """{window title: calibrated settings} from a layout profiles file ({} if missing)."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        profiles = json.load(f)
+    for settings in profiles.values():
+        for key in ('scale', 'offset'):
+            if key in settings:
+                settings[key] = tuple(settings[key])
+    return profiles
+
+
+def save_profile(path, window_name, result):
+    """Store one window's calibration result in the layout profiles file."""
+    profiles = load_profiles(path)
+    profiles[window_name] = dict(result, calibrated_at=datetime.now().isoformat(timespec='seconds'))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    return profiles
+
+
+def _load_frame(automator, args):
+    if args.frame:
+        return Image.open(args.frame).convert('RGB')
+    frame = automator.capture_window_screenshot(args.window)
+    if frame is None:
+        raise SystemExit(f"Could not capture '{args.window}'")
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anchor templates and layout calibration")
+    parser.add_argument("command", choices=("templates", "calibrate", "show"))
+    parser.add_argument("window", nargs="?", default=None, help="exact window title")
+    parser.add_argument("--frame", default=None, help="use a saved full-window screenshot instead of capturing")
+    parser.add_argument("--layout", choices=("ad", "no_ad"), default=None,
+                        help="layout of the frame for 'templates' (default: detected)")
+    parser.add_argument("--anchors", nargs="+", choices=sorted(ANCHORS), default=list(DEFAULT_ANCHORS),
+                        help="anchors visible in the frame for 'templates'")
+    args = parser.parse_args()
+
+    from . import automator
+    automator.init()
+
+    if args.command == "show":
+        for window_name, settings in load_profiles(automator.CALIBRATION_FILE).items():
+            print(f"{window_name}: {settings}")
+        return
+    if not args.window:
+        parser.error(f"{args.command} needs a window title")
+
+    frame = _load_frame(automator, args)
+    if args.command == "templates":
+        layout = args.layout
+        profile = automator.get_window_profile(args.window)
+        if layout is None:
+            _, transform = automator.layouts.profile_transforms({}, profile, frame.size)
+            state = automator.color_probes.evaluate_probes(
+                frame, automator.COMPILED_PROBES, names=['ad'],
+                transform=lambda point: automator.layouts.apply(transform, point))['ad']
+            layout = 'ad' if state == 'ad' else 'no_ad'
+        # Templates are cut where the window's current profile puts the anchors,
+        # but recorded at their base-layout boxes
+        coords = automator.LAYOUT_ENGINE.resolve(layout, profile, frame.size)
+        for anchor in args.anchors:
+            file_name = automator.CALIBRATION_TEMPLATES.add(frame, anchor, layout, anchor_box(coords, anchor),
+                                                            anchor_box(automator.LAYOUTS[layout], anchor))
+            print(f"Saved {anchor} ({layout}) as {file_name}")
+        return
+
+    calibrator = Calibrator(automator.CALIBRATION_TEMPLATES)
+    if not calibrator.ready:
+        raise SystemExit(f"No anchor templates in {automator.CALIBRATION_TEMPLATES.directory}; run 'templates' first")
+    result = calibrator.calibrate(frame)
+    if result is None:
+        print(f"No anchors found in '{args.window}' (threshold {calibrator.threshold})")
+        sys.exit(1)
+    save_profile(automator.CALIBRATION_FILE, args.window, result)
+    print(f"{args.window}: layout {result['layout']}, scale {result['scale']}, offset {result['offset']}, "
+          f"score {result['score']} ({', '.join(result['anchors'])})")
+    print(f"Saved to {automator.CALIBRATION_FILE}")
+
+
+if __name__ == "__main__":
+    main()
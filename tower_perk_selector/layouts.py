@@ -0,0 +1,126 @@
+"""
+Window layouts: base coordinate sets plus per-profile affine transforms.
+
+A layout is a dict of window-relative points (x, y) and regions
+((x1, y1), (x2, y2)), e.g. COORDS_WITH_AD / COORDS_NO_AD. A profile does not
+copy a layout; it declares how to transform one into client-area coordinates:
+
+    client_origin   - (x, y) where the client area started inside the window
+                      when the base layout was measured; subtracted first
+    perk1_top       - translate the perk cards and their click targets so the
+                      first card's top edge lands on this Y (Maximus)
+    scale           - (sx, sy) applied to every coordinate
+    reference_size  - (width, height) of the client area the base layout was
+                      measured at; when the client size is known and differs,
+                      scale is multiplied by client / reference (other emulator
+                      resolutions, DPI)
+    offset          - (dx, dy) added after scaling
+
+LayoutEngine.resolve() composes these into Transform tuples once per
+(layout, profile settings, window size) and caches the transformed layout as
+a read-only mapping of tuples, so the per-tick lookup is a dictionary hit.
+"""
+
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+# x' = x * sx + dx, y' = y * sy + dy
+Transform = namedtuple('Transform', 'sx sy dx dy')
+IDENTITY = Transform(1.0, 1.0, 0.0, 0.0)
+
+# Keys moved together by perk1_top
+PERK_CARD_KEYS = (
+    'perk1_text_region', 'perk2_text_region', 'perk3_text_region',
+    'perk_option_1', 'perk_option_2', 'perk_option_3',
+)
+
+# Profile settings that affect the layout (part of the cache key)
+LAYOUT_SETTINGS = ('client_origin', 'perk1_top', 'scale', 'reference_size', 'offset')
+
+
+def translate(dx, dy):
+    return Transform(1.0, 1.0, float(dx), float(dy))
+
+
+def scale(sx, sy):
+    return Transform(float(sx), float(sy), 0.0, 0.0)
+
+
+def compose(first, then):
+    """Transform applying `first`, then `then`."""
+    return Transform(first.sx * then.sx, first.sy * then.sy,
+                     first.dx * then.sx + then.dx, first.dy * then.sy + then.dy)
+
+
+def apply(transform, value):
+    """Transform a point or a region; integer coordinates are kept integral."""
+    if transform == IDENTITY:
+        return value
+    if isinstance(value[0], tuple):
+        return tuple(apply(transform, point) for point in value)
+    x, y = value
+    return (round(x * transform.sx + transform.dx), round(y * transform.sy + transform.dy))
+
+
+def profile_transforms(base, settings, window_size=None):
+    """Return (transform for PERK_CARD_KEYS, transform for all other keys) for one profile.
+
+    window_size is the current client-area size.
+    """
+    sx, sy = settings.get('scale') or (1.0, 1.0)
+    reference = settings.get('reference_size')
+    if reference and window_size and tuple(window_size) != tuple(reference):
+        sx *= window_size[0] / reference[0]
+        sy *= window_size[1] / reference[1]
+    dx, dy = settings.get('offset') or (0, 0)
+    ox, oy = settings.get('client_origin') or (0, 0)
+    window = compose(compose(translate(-ox, -oy), scale(sx, sy)), translate(dx, dy))
+
+    cards = window
+    perk1_top = settings.get('perk1_top')
+    if perk1_top is not None and 'perk1_text_region' in base:
+        delta = perk1_top - base['perk1_text_region'][0][1]
+        cards = compose(translate(0, delta), window)
+    return cards, window
+
+
+class LayoutEngine:
+    """Caches transformed layouts per (layout name, profile settings, window size)."""
+
+    def __init__(self, layouts):
+        self.layouts = layouts
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, layout_name, settings, window_size=None):
+        """Return the read-only coords mapping for a layout under a profile's settings."""
+        if not settings.get('reference_size'):
+            window_size = None      # the size only matters when scaling to it
+        key = (layout_name, tuple(_freeze(settings.get(name)) for name in LAYOUT_SETTINGS),
+               tuple(window_size) if window_size else None)
+        coords = self._cache.get(key)
+        if coords is None:
+            coords = self._compile(self.layouts[layout_name], settings, window_size)
+            with self._lock:
+                coords = self._cache.setdefault(key, coords)
+        return coords
+
+    @staticmethod
+    def _compile(base, settings, window_size):
+        cards, window = profile_transforms(base, settings, window_size)
+        resolved = {}
+        for name, value in base.items():
+            resolved[name] = apply(cards if name in PERK_CARD_KEYS else window, _freeze(value))
+        return MappingProxyType(resolved)
+
+    def clear(self):
+        """Drop cached layouts (after editing the base layouts or profiles at runtime)."""
+        with self._lock:
+            self._cache.clear()
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
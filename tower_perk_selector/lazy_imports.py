@@ -0,0 +1,82 @@
+"""
+Deferred imports for heavy optional modules.
+
+LazyModule stands in for a module and imports it on first attribute access,
+so pyautogui, pytesseract, tkinter and pygetwindow only cost startup time
+when a code path actually uses them:
+
+    pyautogui = LazyModule('pyautogui')
+    pyautogui.click(x, y)          # imported here
+
+available imports the module and reports whether that worked instead of
+raising (pyautogui, for one, fails without a display). installed() only
+looks the module up, without importing it. Load times are kept in
+IMPORT_TIMES for the startup report.
+"""
+
+import importlib
+import importlib.util
+import threading
+import time
+
+IMPORT_TIMES = {}   # module name -> seconds spent importing it
+
+
+def installed(name):
+    """True if the module can be found, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Module proxy that imports on first use; on_import(module) runs once after the import."""
+
+    def __init__(self, name, on_import=None):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_on_import', on_import)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, '_error', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is not None:
+            return module
+        with self._lock:
+            if self._module is None:
+                if self._error is not None:
+                    raise self._error
+                started = time.perf_counter()
+                try:
+                    module = importlib.import_module(self._name)
+                    if self._on_import is not None:
+                        self._on_import(module)
+                except Exception as e:
+                    object.__setattr__(self, '_error', e)
+                    raise
+                IMPORT_TIMES[self._name] = time.perf_counter() - started
+                object.__setattr__(self, '_module', module)
+            return self._module
+
+    @property
+    def available(self):
+        try:
+            self._load()
+            return True
+        except Exception:
+            return False
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r} ({'loaded' if self.loaded else 'not loaded'})>"
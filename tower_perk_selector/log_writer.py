@@ -0,0 +1,163 @@
+"""
+Buffered background log writer.
+
+The automator's logging functions only enqueue text here; a single writer
+thread drains a bounded queue and appends to each target file in batches,
+opening it once per batch instead of once per line. Batches are flushed when
+they reach BATCH_SIZE entries or FLUSH_INTERVAL seconds, on flush(), and on
+close() (registered with atexit and called on failsafe / Ctrl+C).
+
+When the queue is full the writer either blocks the caller or drops the entry,
+depending on the overflow policy; both cases are counted in stats.
+
+A target is either a file path or any object with write_batch(list_of_strings).
+"""
+
+import atexit
+import queue
+import threading
+import time
+
+MAX_QUEUE = 10000      # entries waiting to be written before backpressure kicks in
+BATCH_SIZE = 256       # entries written per batch
+FLUSH_INTERVAL = 1.0   # seconds an entry may wait before its batch is written
+BLOCK_TIMEOUT = 2.0    # seconds a 'block' caller waits for space before the entry is dropped
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BufferedLogWriter:
+    """Bounded-queue log writer with a background flushing thread."""
+
+    def __init__(self, max_queue=MAX_QUEUE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 overflow='block', block_timeout=BLOCK_TIMEOUT, encoding="utf-8"):
+        if overflow not in ('block', 'drop'):
+            raise ValueError("overflow must be 'block' or 'drop'")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.encoding = encoding
+        self.stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'blocked': 0, 'batches': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def write(self, target, text):
+        """Queue text for target. Returns False if it was dropped."""
+        if self._closed:
+            self._write_batch({target: [text]})
+            return True
+        try:
+            self._queue.put_nowait((target, text))
+        except queue.Full:
+            if self.overflow == 'drop':
+                self._count('dropped')
+                return False
+            self._count('blocked')
+            try:
+                self._queue.put((target, text), timeout=self.block_timeout)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        self._count('enqueued')
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush pending entries and stop the writer thread.
+
+        Every wait is bounded by timeout, so a full queue with a dead or stuck writer
+        thread cannot hang shutdown; entries a dead thread left behind are written here.
+        """
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._write_leftovers()
+
+    def _write_leftovers(self):
+        pending = {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                pending.setdefault(item[0], []).append(item[1])
+            elif isinstance(item, _FlushRequest):
+                item.done.set()
+        if pending:
+            self._write_batch(pending)
+
+    def _write_batch(self, pending):
+        for target, lines in pending.items():
+            try:
+                if hasattr(target, 'write_batch'):
+                    target.write_batch(lines)
+                else:
+                    with open(target, "a", encoding=self.encoding) as f:
+                        f.write(''.join(lines))
+                self._count('written', len(lines))
+            except Exception as e:
+                self._count('errors')
+                print(f"Log write error ({target}): {e}")
+        self._count('batches')
+
+    def _run(self):
+        pending = {}
+        count = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # flush interval elapsed
+
+            if isinstance(item, tuple):
+                target, text = item
+                pending.setdefault(target, []).append(text)
+                count += 1
+                if deadline is None:
+                    deadline = time.time() + self.flush_interval
+                if count < self.batch_size:
+                    continue
+
+            if pending:
+                self._write_batch(pending)
+                pending = {}
+                count = 0
+            deadline = None
+
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            elif item is None:
+                return
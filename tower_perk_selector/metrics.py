@@ -0,0 +1,139 @@
+"""
+Prometheus-format metrics for the perk automator, served on localhost.
+
+Counters and gauges are kept in a Metrics registry; gauges can also be
+callbacks evaluated at scrape time. Stage latencies come from the timing.py
+histograms and are exported as one Prometheus histogram,
+perk_stage_duration_seconds{window, stage}.
+
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import threading
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+
+# Histogram bucket bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_HISTOGRAM = 'perk_stage_duration_seconds'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Counters, gauges and gauge callbacks rendered in the Prometheus text format."""
+
+    def __init__(self, timings=None):
+        self.timings = timings
+        self._meta = {}        # name -> (type, help)
+        self._values = {}      # name -> {labels tuple: value}
+        self._callbacks = {}   # name -> fn() returning {labels dict as tuple: value}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def gauge_callback(self, name, fn):
+        """fn() returns [(labels dict, value)] at scrape time."""
+        self._callbacks[name] = fn
+
+    def value(self, name, **labels):
+        with self._lock:
+            return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+        for name, fn in self._callbacks.items():
+            try:
+                values[name] = {tuple(sorted(labels.items())): value for labels, value in fn()}
+            except Exception as e:
+                print(f"Metrics callback {name} failed: {e}")
+        for name in sorted(values):
+            kind, help_text = self._meta.get(name, ('untyped', ''))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(values[name].items()):
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+        if self.timings is not None:
+            lines.extend(self._render_stage_histograms())
+        return '\n'.join(lines) + '\n'
+
+    def _render_stage_histograms(self):
+        lines = [f"# HELP {STAGE_HISTOGRAM} Duration of each pipeline stage",
+                 f"# TYPE {STAGE_HISTOGRAM} histogram"]
+        bounds_us = [b * 1e6 for b in BUCKETS]
+        for (window_name, stage), histogram in sorted(self.timings.snapshot().items()):
+            base = (('stage', stage), ('window', window_name))
+            for bound, count in zip(BUCKETS, histogram.cumulative_counts(bounds_us)):
+                lines.append(f"{STAGE_HISTOGRAM}_bucket{_labels(base + (('le', _number(bound)),))} {count}")
+            lines.append(f"{STAGE_HISTOGRAM}_bucket{_labels(base + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{STAGE_HISTOGRAM}_sum{_labels(base)} {histogram.total / 1e6!r}")
+            lines.append(f"{STAGE_HISTOGRAM}_count{_labels(base)} {histogram.count}")
+        return lines
+
+
+class MetricsServer:
+    """Serves GET /metrics from a background thread (localhost only by default)."""
+
+    def __init__(self, metrics, host=METRICS_HOST, port=METRICS_PORT):
+        # Imported here: http.server is a noticeable share of the automator's startup
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
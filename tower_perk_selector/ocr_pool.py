@@ -0,0 +1,140 @@
+"""
+Shared Tesseract pool for all monitored windows.
+
+pytesseract starts one tesseract process per call, and every window's perk
+selection runs on its own thread with up to 14 OCR variants per card, so a
+handful of windows can start dozens of tesseract processes at once. OcrPool
+caps the number of concurrent tesseract runs for the whole process; callers
+wait for a free slot, and the wait is recorded as the 'ocr:wait' stage.
+
+    pool = OcrPool(pytesseract, workers=4, timings=TIMINGS)
+    text = pool.image_to_string(image, window_name, config='--psm 7')
+
+ProcessOcrPool has the same interface but runs the pytesseract calls in worker
+processes. Images reach the workers through a shared-memory FrameBus (see
+frame_bus.py): each image is written once into a slot and only its FrameRef is
+pickled. Images that do not fit a slot are pickled as before.
+"""
+
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import frame_bus
+
+WAIT_RECORD_THRESHOLD = 0.001  # seconds; shorter waits are not recorded
+BUS_SLOTS_PER_WORKER = 2       # frame bus slots per worker process
+
+
+def default_workers():
+    return max(1, os.cpu_count() or 2)
+
+
+class OcrPool:
+    """Runs pytesseract calls with at most `workers` in flight at a time."""
+
+    def __init__(self, tesseract, workers=None, timings=None):
+        self.tesseract = tesseract
+        self.workers = workers or default_workers()
+        self.timings = timings
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'waits': 0, 'wait_seconds': 0.0}
+
+    def _run(self, window_name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        with self._slots:
+            waited = time.perf_counter() - started
+            with self._lock:
+                self.stats['calls'] += 1
+                if waited >= WAIT_RECORD_THRESHOLD:
+                    self.stats['waits'] += 1
+                    self.stats['wait_seconds'] += waited
+            if waited >= WAIT_RECORD_THRESHOLD and self.timings is not None:
+                self.timings.record('ocr:wait', waited, window_name)
+            return fn(*args, **kwargs)
+
+    def image_to_data(self, image, window_name=None, **kwargs):
+        return self._run(window_name, self.tesseract.image_to_data, image, **kwargs)
+
+    def image_to_string(self, image, window_name=None, **kwargs):
+        return self._run(window_name, self.tesseract.image_to_string, image, **kwargs)
+
+    def close(self):
+        """Nothing to stop for in-process calls."""
+
+
+_worker_bus = None
+_worker_tesseract = None
+
+
+def _init_worker(bus_name, slots, slot_bytes, module_name, tesseract_cmd):
+    global _worker_bus, _worker_tesseract
+    _worker_bus = frame_bus.FrameBus.attach(bus_name, slots, slot_bytes)
+    _worker_tesseract = importlib.import_module(module_name)
+    if tesseract_cmd:
+        _worker_tesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def _worker_call(fn_name, frame, kwargs):
+    image = _worker_bus.read(frame) if isinstance(frame, frame_bus.FrameRef) else frame
+    return getattr(_worker_tesseract, fn_name)(image, **kwargs)
+
+
+class ProcessOcrPool(OcrPool):
+    """OcrPool whose calls run in `workers` processes, reading images from a shared-memory frame bus.
+
+    The processes and the bus are created on the first call, so importing the
+    automator in a spawned worker does not start another pool.
+    """
+
+    def __init__(self, workers=None, timings=None, module_name='pytesseract', tesseract_cmd=None,
+                 slot_bytes=None):
+        super().__init__(None, workers, timings)
+        self.module_name = module_name
+        self.tesseract_cmd = tesseract_cmd
+        self.slot_bytes = slot_bytes
+        self.bus = None
+        self._executor = None
+        self._start_lock = threading.Lock()
+        self.stats.update({'shared': 0, 'pickled': 0})
+
+    def _start(self):
+        with self._start_lock:
+            if self._executor is None:
+                slots = self.workers * BUS_SLOTS_PER_WORKER
+                self.bus = frame_bus.FrameBus(slots, self.slot_bytes or frame_bus.DEFAULT_SLOT_BYTES)
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+                    initargs=(self.bus.name, slots, self.bus.slot_bytes, self.module_name, self.tesseract_cmd))
+        return self._executor
+
+    def _submit(self, fn_name, image, kwargs):
+        executor = self._executor or self._start()
+        ref = self.bus.put(image, timeout=0)   # at most `workers` calls are in flight, so a slot is free
+        with self._lock:
+            self.stats['shared' if ref is not None else 'pickled'] += 1
+        try:
+            return executor.submit(_worker_call, fn_name, ref if ref is not None else image, kwargs).result()
+        finally:
+            if ref is not None:
+                self.bus.release(ref)
+
+    def image_to_data(self, image, window_name=None, **kwargs):
+        return self._run(window_name, self._submit, 'image_to_data', image, kwargs)
+
+    def image_to_string(self, image, window_name=None, **kwargs):
+        return self._run(window_name, self._submit, 'image_to_string', image, kwargs)
+
+    def close(self):
+        """Stop the worker processes and free the frame bus."""
+        with self._start_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self.bus is not None:
+                self.bus.close()
+                self.bus = None
@@ -0,0 +1,117 @@
+"""
+Per-variant OCR profiling for perk cards.
+
+For every card read by _ocr_variants, one row per variant is stored: wall time,
+mean Tesseract confidence, resolved priority and whether it was the chosen
+variant. Rows go into the ocr_variant_runs table of the history database,
+queued through the buffered log writer like the other history tables.
+
+The report shows, per variant, what it costs and what it earns:
+    - runs, mean and total time (share of all OCR time)
+    - mean confidence and how often the text mapped to a known perk
+    - wins, and sole wins: cards where no other variant produced the
+      winning priority, i.e. cards that would change without this variant
+
+    python -m tower_perk_selector.ocr_profiler [--db perk_history.sqlite3] [--days 7] [--window NAME]
+"""
+
+import argparse
+import time
+
+from .history_store import SqliteStore
+
+UNRECOGNIZED = 9999
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_variant_runs (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    window TEXT NOT NULL,
+    card_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    ms REAL,
+    confidence REAL,
+    priority INTEGER,
+    winner INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_variant_runs_variant ON ocr_variant_runs (variant, ts);
+CREATE INDEX IF NOT EXISTS idx_variant_runs_card ON ocr_variant_runs (card_id);
+"""
+
+INSERTS = {
+    'ocr_variant_runs': "INSERT INTO ocr_variant_runs (ts, window, card_id, variant, ms, confidence, priority, "
+                        "winner) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+class OcrProfiler(SqliteStore):
+    """Records variant results per card and reports per-variant statistics."""
+
+    SCHEMA = SCHEMA
+    INSERTS = INSERTS
+
+    def record_card(self, window_name, results, winner):
+        """results: [(variant, text, confidence, priority, ms)]; winner: name of the chosen variant."""
+        ts = time.time()
+        card_id = self._next_id(window_name, ts)
+        self._queue('ocr_variant_runs', [
+            (ts, window_name, card_id, name, round(ms, 2), confidence, priority, int(name == winner))
+            for name, _, confidence, priority, ms in results
+        ])
+
+    def report(self, since=None, window=None):
+        """Return [(variant, runs, mean_ms, total_ms, time_share, mean_conf, known_rate, wins, sole_wins)],
+        most expensive first."""
+        where, params = self._filters(since, window)
+        return self._query(f"""
+            WITH runs AS (
+                SELECT * FROM ocr_variant_runs {where}
+            ), winning AS (
+                SELECT card_id, priority FROM runs WHERE winner = 1
+            ), producers AS (
+                SELECT r.card_id, COUNT(*) AS n FROM runs r JOIN winning w
+                ON r.card_id = w.card_id AND r.priority = w.priority GROUP BY r.card_id
+            )
+            SELECT r.variant,
+                   COUNT(*),
+                   AVG(r.ms),
+                   SUM(r.ms),
+                   SUM(r.ms) / (SELECT SUM(ms) FROM runs),
+                   AVG(CASE WHEN r.confidence >= 0 THEN r.confidence END),
+                   AVG(r.priority != {UNRECOGNIZED}),
+                   SUM(r.winner),
+                   SUM(r.winner AND r.priority != {UNRECOGNIZED} AND p.n = 1)
+            FROM runs r LEFT JOIN producers p ON r.card_id = p.card_id
+            GROUP BY r.variant
+            ORDER BY SUM(r.ms) DESC
+            """, params)
+
+    def card_count(self, since=None, window=None):
+        where, params = self._filters(since, window)
+        return self._query(f"SELECT COUNT(DISTINCT card_id) FROM ocr_variant_runs {where}", params)[0][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR variant cost and win-rate report")
+    parser.add_argument("--db", default=None, help="default: perk_history.sqlite3 in PERK_AUTOMATOR_HOME or here")
+    parser.add_argument("--days", type=float, default=None, help="only look at the last N days")
+    parser.add_argument("--window", default=None)
+    args = parser.parse_args()
+
+    profiler = OcrProfiler(args.db)
+    since = time.time() - args.days * 86400 if args.days else None
+    rows = profiler.report(since, args.window)
+    if not rows:
+        print("No OCR variant runs recorded.")
+        return
+    print(f"{profiler.card_count(since, args.window)} perk cards read\n")
+    print(f"{'variant':14} {'runs':>7} {'mean ms':>9} {'time %':>7} {'conf':>6} {'known %':>8} {'wins':>6} {'sole':>6}")
+    for variant, runs, mean_ms, total_ms, share, conf, known, wins, sole in rows:
+        conf_text = f"{conf:6.1f}" if conf is not None else f"{'-':>6}"
+        print(f"{variant:14} {runs:7} {mean_ms or 0:9.1f} {(share or 0) * 100:6.1f}% {conf_text} "
+              f"{(known or 0) * 100:7.1f}% {wins or 0:6} {sole or 0:6}")
+    print("\nsole = cards where no other variant produced the winning priority")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Lightweight timing spans with HDR-style latency histograms.
+
+    with TIMINGS.span('capture', window_name):
+        ...
+
+    @TIMINGS.timed('match')
+    def fuzzy_match_perk(...):
+        ...
+
+Durations are recorded in microseconds into log-linear buckets (like
+HdrHistogram): values below 2**PRECISION_BITS are exact, larger values keep
+PRECISION_BITS significant bits, so percentiles are within ~1.6% at any scale
+while each histogram stays a small dict of counts. Histograms are kept per
+(window, stage); the summary also merges them per stage across windows.
+"""
+
+import functools
+import threading
+import time
+
+PRECISION_BITS = 7
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    """Log-linear histogram of non-negative integer values (microseconds)."""
+
+    def __init__(self, precision_bits=PRECISION_BITS):
+        self.precision_bits = precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        magnitude = max(0, value.bit_length() - self.precision_bits)
+        if magnitude == 0:
+            return value
+        return (1 << self.precision_bits) + (magnitude - 1) * self._half + ((value >> magnitude) - self._half)
+
+    def _value_at(self, index):
+        """Upper bound of the values counted in a bucket."""
+        full = 1 << self.precision_bits
+        if index < full:
+            return index
+        magnitude = (index - full) // self._half + 1
+        sub = (index - full) % self._half + self._half
+        return ((sub + 1) << magnitude) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds):
+        """Return how many values fall at or below each bound (bounds ascending, same unit as record)."""
+        result = []
+        ordered = sorted(self.counts.items())
+        position = 0
+        seen = 0
+        for bound in bounds:
+            while position < len(ordered) and self._value_at(ordered[position][0]) <= bound:
+                seen += ordered[position][1]
+                position += 1
+            result.append(seen)
+        return result
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class Timings:
+    """Thread-safe collection of histograms keyed by (window, stage)."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, window_name=None):
+        if not self.enabled:
+            return
+        key = (window_name or '-', stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds * 1e6)
+
+    def span(self, stage, window_name=None):
+        return _Span(self, stage, window_name)
+
+    def timed(self, stage, window_arg=0):
+        """Decorator timing every call; the window name is taken from a str positional argument."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                window_name = kwargs.get('window_name')
+                if window_name is None and len(args) > window_arg and isinstance(args[window_arg], str):
+                    window_name = args[window_arg]
+                with _Span(self, stage, window_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def sleep(self, seconds, stage='wait', window_name=None):
+        """time.sleep() that is recorded as a wait span."""
+        with _Span(self, stage, window_name):
+            time.sleep(seconds)
+
+    def snapshot(self):
+        """Return {(window, stage): histogram copy}."""
+        with self._lock:
+            copies = {}
+            for key, histogram in self._histograms.items():
+                copy = LatencyHistogram(histogram.precision_bits)
+                copy.merge(histogram)
+                copies[key] = copy
+            return copies
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary_rows(self, per_window=True):
+        """Return [(window, stage, count, mean_ms, p50_ms, p90_ms, p99_ms, max_ms)] sorted by total time."""
+        histograms = self.snapshot()
+        if not per_window:
+            merged = {}
+            for (_, stage), histogram in histograms.items():
+                target = merged.get(('*', stage))
+                if target is None:
+                    target = merged[('*', stage)] = LatencyHistogram(histogram.precision_bits)
+                target.merge(histogram)
+            histograms = merged
+        rows = []
+        for (window_name, stage), h in sorted(histograms.items(), key=lambda item: -item[1].total):
+            rows.append((window_name, stage, h.count, h.mean / 1000,
+                         *(h.percentile(p) / 1000 for p in PERCENTILES), h.max / 1000))
+        return rows
+
+    def format_summary(self, per_window=True):
+        rows = self.summary_rows(per_window)
+        if not rows:
+            return "No timings recorded."
+        header = f"{'window':22} {'stage':22} {'count':>7} {'mean':>9} " + \
+                 ' '.join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'max':>9}"
+        lines = [header, '-' * len(header)]
+        for window_name, stage, count, *values in rows:
+            lines.append(f"{window_name[:22]:22} {stage[:22]:22} {count:7} " + ' '.join(f"{v:9.1f}" for v in values))
+        lines.append("(times in ms)")
+        return '\n'.join(lines)
+
+    def print_summary(self, per_window=True):
+        print(self.format_summary(per_window))
+
+
+class _Span:
+    __slots__ = ('timings', 'stage', 'window_name', 'started')
+
+    def __init__(self, timings, stage, window_name):
+        self.timings = timings
+        self.stage = stage
+        self.window_name = window_name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.stage, time.perf_counter() - self.started, self.window_name)
+        return False
+
+
+TIMINGS = Timings()
@@ -0,0 +1,143 @@
+"""
+Window event sources for the window registry.
+
+WinEventHookSource installs SetWinEventHook hooks on a background thread and
+pushes move/resize, foreground and destroy events into a WindowRegistry, so
+coordinate conversions do not have to re-read window rects and focus loops can
+wait for a foreground change instead of sleeping between polls.
+
+SimulatedEventSource lets the same flow be driven off Windows.
+"""
+
+import threading
+
+try:
+    import ctypes
+    from ctypes import wintypes
+    import win32gui
+    WIN32_SUPPORT = True
+except ImportError:
+    WIN32_SUPPORT = False
+
+# WinEvent constants (winuser.h)
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_SYSTEM_MOVESIZEEND = 0x000B
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+WM_QUIT = 0x0012
+
+
+class SimulatedEventSource:
+    """Event source driven by explicit calls, for running without Windows."""
+
+    def __init__(self):
+        self.registry = None
+        self.running = False
+
+    def start(self, registry):
+        self.registry = registry
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def move(self, hwnd, rect):
+        """Simulate a move/resize to rect = (left, top, right, bottom)."""
+        if self.running:
+            self.registry.handle_event('move', hwnd, rect)
+
+    def foreground(self, hwnd):
+        if self.running:
+            self.registry.handle_event('foreground', hwnd)
+
+    def destroy(self, hwnd):
+        if self.running:
+            self.registry.handle_event('destroy', hwnd)
+
+
+class WinEventHookSource:
+    """Out-of-context WinEvent hooks serviced by a dedicated message-loop thread."""
+
+    def __init__(self):
+        self.registry = None
+        self.running = False
+        self._thread = None
+        self._thread_id = None
+        self._started = threading.Event()
+        self._hooks = []
+        self._callback = None
+
+    def start(self, registry):
+        if not WIN32_SUPPORT:
+            print("WARNING: Window event hooks need pywin32 - falling back to polling")
+            return
+        self.registry = registry
+        # Seed the foreground state; the hook reports changes from here on
+        registry.handle_event('foreground', win32gui.GetForegroundWindow())
+        self._thread = threading.Thread(target=self._run, name="WinEventHook", daemon=True)
+        self._thread.start()
+        self._started.wait(2.0)
+
+    def stop(self):
+        self.running = False
+        if self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, event_thread, event_time):
+        if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+            return
+        try:
+            if event == EVENT_SYSTEM_FOREGROUND:
+                self.registry.handle_event('foreground', hwnd)
+            elif event == EVENT_OBJECT_DESTROY:
+                if self.registry.is_tracked(hwnd):
+                    self.registry.handle_event('destroy', hwnd)
+            elif event in (EVENT_OBJECT_LOCATIONCHANGE, EVENT_SYSTEM_MOVESIZEEND, EVENT_SYSTEM_MINIMIZEEND):
+                if self.registry.is_tracked(hwnd):
+                    self.registry.handle_event('move', hwnd, win32gui.GetWindowRect(hwnd))
+        except Exception as e:
+            print(f"  Window event error: {e}")
+
+    def _run(self):
+        user32 = ctypes.windll.user32
+        proc_type = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        # Keep a reference so the callback is not garbage collected while hooked
+        self._callback = proc_type(self._on_event)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        for low, high in ((EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND),
+                          (EVENT_SYSTEM_MOVESIZEEND, EVENT_SYSTEM_MOVESIZEEND),
+                          (EVENT_SYSTEM_MINIMIZEEND, EVENT_SYSTEM_MINIMIZEEND),
+                          (EVENT_OBJECT_DESTROY, EVENT_OBJECT_DESTROY),
+                          (EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_LOCATIONCHANGE)):
+            hook = user32.SetWinEventHook(low, high, 0, self._callback, 0, 0, flags)
+            if hook:
+                self._hooks.append(hook)
+
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        self.running = bool(self._hooks)
+        self._started.set()
+        if not self.running:
+            print("WARNING: SetWinEventHook failed - falling back to polling")
+            return
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in self._hooks:
+            user32.UnhookWinEvent(hook)
+        self._hooks = []
+        self.running = False
@@ -0,0 +1,345 @@
+"""
+Window registry for the perk automator.
+
+Resolves each configured window title to an hwnd once and caches it together
+with the window geometry. Cached entries are revalidated cheaply (IsWindow +
+title check, GetWindowRect once the geometry is older than the TTL), and the
+full EnumWindows scan only runs again when a cached handle stops being valid.
+
+Besides the window rect, each entry carries the client rect in screen
+coordinates: the automator's coordinates are client-area relative, so title
+bars, borders and DPI-dependent frame sizes do not shift them.
+
+The registry talks to the OS through a small backend object, so it can run off
+Windows with FakeWindowBackend. An optional event source (window_events.py)
+can push move/resize/foreground/destroy events into the registry; while one is
+attached, cached geometry is trusted until an event says otherwise.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import win32gui
+    WIN32_SUPPORT = True
+except ImportError:
+    WIN32_SUPPORT = False
+
+# Geometry returned by the registry; mirrors the pygetwindow attributes the automator uses,
+# plus the client area on screen (None when unknown, e.g. replayed windows)
+WindowInfo = namedtuple('WindowInfo', ['hwnd', 'title', 'left', 'top', 'width', 'height',
+                                       'client_left', 'client_top', 'client_width', 'client_height'],
+                        defaults=(None, None, None, None))
+
+GEOMETRY_CACHE_TTL = 0.5     # seconds a cached window rect is trusted before re-reading it
+MISSING_RETRY_INTERVAL = 1.0  # seconds before re-enumerating for a title that was not found
+
+
+def client_geometry(window):
+    """(left, top, width, height) of a window's client area on screen; the window rect if unknown.
+
+    Accepts WindowInfo and pygetwindow windows alike.
+    """
+    if getattr(window, 'client_left', None) is None:
+        return window.left, window.top, window.width, window.height
+    return window.client_left, window.client_top, window.client_width, window.client_height
+
+
+def enable_dpi_awareness():
+    """Opt the process into per-monitor DPI awareness so window rects, client rects and
+    captured bitmaps are all in physical pixels.
+
+    Without it, Windows reports scaled (virtualized) rects on displays above 100% until
+    something else (e.g. importing pyautogui) changes the awareness. Returns the mode that
+    was set, or None off Windows / if every call failed.
+    """
+    try:
+        import ctypes
+        from ctypes import windll
+    except ImportError:
+        return None
+    attempts = (
+        ('per-monitor-v2', lambda: windll.user32.SetProcessDpiAwarenessContext(ctypes.c_void_p(-4))),
+        ('per-monitor', lambda: windll.shcore.SetProcessDpiAwareness(2) == 0),
+        ('system', lambda: windll.user32.SetProcessDPIAware()),
+    )
+    for mode, attempt in attempts:
+        try:
+            if attempt():
+                return mode
+        except (AttributeError, OSError):
+            continue
+    return None
+
+
+def title_matches(title, wanted, partial=False):
+    """Exact title match, or case-insensitive substring match when partial=True."""
+    if not title:
+        return False
+    if partial:
+        return wanted.lower() in title.lower()
+    return title == wanted
+
+
+class Win32WindowBackend:
+    """Window lookups through pywin32."""
+
+    def enumerate(self):
+        """Return a list of (hwnd, title) for all top-level windows."""
+        windows = []
+
+        def enum_callback(hwnd, extra):
+            windows.append((hwnd, win32gui.GetWindowText(hwnd)))
+            return True
+
+        win32gui.EnumWindows(enum_callback, None)
+        return windows
+
+    def is_window(self, hwnd):
+        return bool(win32gui.IsWindow(hwnd))
+
+    def get_title(self, hwnd):
+        return win32gui.GetWindowText(hwnd)
+
+    def get_rect(self, hwnd):
+        """Return (left, top, right, bottom) of the window."""
+        return win32gui.GetWindowRect(hwnd)
+
+    def get_client_rect(self, hwnd):
+        """Return (left, top, right, bottom) of the client area in screen coordinates."""
+        left, top, right, bottom = win32gui.GetClientRect(hwnd)
+        x, y = win32gui.ClientToScreen(hwnd, (left, top))
+        return (x, y, x + right - left, y + bottom - top)
+
+    def get_foreground(self):
+        return win32gui.GetForegroundWindow() or None
+
+
+class FakeWindowBackend:
+    """In-memory window table for running the registry off Windows."""
+
+    def __init__(self):
+        self.windows = {}
+        self.enumerate_calls = 0
+        self.rect_calls = 0
+        self.foreground = None
+        self._next_hwnd = 1000
+
+    def add_window(self, title, rect, client_rect=None):
+        """Add a window and return its fake hwnd (the client area defaults to the whole window)."""
+        self._next_hwnd += 1
+        self.windows[self._next_hwnd] = {'title': title, 'rect': tuple(rect),
+                                         'client_rect': tuple(client_rect) if client_rect else None}
+        return self._next_hwnd
+
+    def move_window(self, hwnd, rect, client_rect=None):
+        self.windows[hwnd]['rect'] = tuple(rect)
+        self.windows[hwnd]['client_rect'] = tuple(client_rect) if client_rect else None
+
+    def destroy_window(self, hwnd):
+        self.windows.pop(hwnd, None)
+
+    def enumerate(self):
+        self.enumerate_calls += 1
+        return [(hwnd, info['title']) for hwnd, info in self.windows.items()]
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def get_title(self, hwnd):
+        return self.windows[hwnd]['title'] if hwnd in self.windows else ""
+
+    def get_rect(self, hwnd):
+        self.rect_calls += 1
+        return self.windows[hwnd]['rect']
+
+    def get_client_rect(self, hwnd):
+        return self.windows[hwnd]['client_rect'] or self.windows[hwnd]['rect']
+
+    def get_foreground(self):
+        return self.foreground
+
+
+class WindowRegistry:
+    """Cache of title -> hwnd and hwnd -> geometry with cheap revalidation."""
+
+    def __init__(self, backend, geometry_ttl=GEOMETRY_CACHE_TTL, missing_retry_interval=MISSING_RETRY_INTERVAL):
+        self.backend = backend
+        self.geometry_ttl = geometry_ttl
+        self.missing_retry_interval = missing_retry_interval
+        self._lock = threading.RLock()
+        self._hwnds = {}        # (title, partial) -> hwnd
+        self._geometry = {}     # hwnd -> (WindowInfo, read_time)
+        self._missing = {}      # (title, partial) -> time of last failed enumeration
+        self._foreground_changed = threading.Condition(self._lock)
+        self.foreground_hwnd = None
+        self.event_source = None
+
+    def _is_valid(self, hwnd, title, partial):
+        try:
+            return self.backend.is_window(hwnd) and title_matches(self.backend.get_title(hwnd), title, partial)
+        except Exception:
+            return False
+
+    def _enumerate(self, title, partial):
+        """Full window scan; refreshes every cached title in one pass."""
+        try:
+            windows = self.backend.enumerate()
+        except Exception as e:
+            print(f"Error enumerating windows: {e}")
+            return None
+        for key in list(self._hwnds.keys()) + [(title, partial)]:
+            wanted, wanted_partial = key
+            found = next((hwnd for hwnd, t in windows if title_matches(t, wanted, wanted_partial)), None)
+            if found is None:
+                self._hwnds.pop(key, None)
+            else:
+                self._hwnds[key] = found
+                self._missing.pop(key, None)
+        return self._hwnds.get((title, partial))
+
+    def resolve(self, title, partial=False):
+        """Return the hwnd for a window title, re-enumerating only when the cache is invalid."""
+        key = (title, partial)
+        with self._lock:
+            hwnd = self._hwnds.get(key)
+            if hwnd is not None:
+                # With an event source attached, destroy events evict stale handles for us
+                if self.events_active or self._is_valid(hwnd, title, partial):
+                    return hwnd
+                self._hwnds.pop(key, None)
+                self._geometry.pop(hwnd, None)
+            missing_since = self._missing.get(key)
+            if missing_since is not None and time.time() - missing_since < self.missing_retry_interval:
+                return None
+            hwnd = self._enumerate(title, partial)
+            if hwnd is None:
+                self._missing[key] = time.time()
+            return hwnd
+
+    def get_window(self, title, partial=False):
+        """Return a WindowInfo for the title, or None if the window does not exist."""
+        with self._lock:
+            hwnd = self.resolve(title, partial)
+            if hwnd is None:
+                return None
+            cached = self._geometry.get(hwnd)
+            if cached is not None and (self.events_active or time.time() - cached[1] < self.geometry_ttl):
+                return cached[0]
+            try:
+                rect = self.backend.get_rect(hwnd)
+            except Exception:
+                # Handle died between the validity check and the rect read
+                self.invalidate(title)
+                hwnd = self.resolve(title, partial)
+                if hwnd is None:
+                    return None
+                rect = self.backend.get_rect(hwnd)
+            info = self._window_info(hwnd, self.backend.get_title(hwnd), rect)
+            self._geometry[hwnd] = (info, time.time())
+            return info
+
+    def _window_info(self, hwnd, title, rect):
+        left, top, right, bottom = rect
+        try:
+            c_left, c_top, c_right, c_bottom = self.backend.get_client_rect(hwnd)
+        except Exception:
+            c_left, c_top, c_right, c_bottom = rect
+        return WindowInfo(hwnd, title, left, top, right - left, bottom - top,
+                          c_left, c_top, c_right - c_left, c_bottom - c_top)
+
+    @property
+    def events_active(self):
+        """True while an event source is pushing window events into the registry."""
+        return self.event_source is not None and self.event_source.running
+
+    def attach_event_source(self, source):
+        """Start an event source that feeds this registry."""
+        self.event_source = source
+        source.start(self)
+
+    def detach_event_source(self):
+        with self._lock:
+            source, self.event_source = self.event_source, None
+        if source is not None:
+            source.stop()
+
+    def is_tracked(self, hwnd):
+        """True if the hwnd is one of the cached windows."""
+        with self._lock:
+            return hwnd in self._hwnds.values()
+
+    def handle_event(self, kind, hwnd, rect=None):
+        """Apply a window event: 'move' (with rect), 'foreground' or 'destroy'."""
+        with self._lock:
+            if kind == 'move' and rect is not None:
+                if self.is_tracked(hwnd):
+                    self.update_geometry(hwnd, rect)
+            elif kind == 'foreground':
+                self.foreground_hwnd = hwnd
+                self._foreground_changed.notify_all()
+            elif kind == 'destroy':
+                self.forget_hwnd(hwnd)
+                if self.foreground_hwnd == hwnd:
+                    self.foreground_hwnd = None
+                    self._foreground_changed.notify_all()
+
+    def refresh_foreground(self):
+        """Re-read the foreground window from the backend (events can be missed or predate the hook)."""
+        try:
+            hwnd = self.backend.get_foreground()
+        except Exception:
+            return self.foreground_hwnd
+        with self._lock:
+            if hwnd != self.foreground_hwnd:
+                self.foreground_hwnd = hwnd
+                self._foreground_changed.notify_all()
+            return hwnd
+
+    def wait_for_foreground(self, hwnd, timeout):
+        """Wait until hwnd is the foreground window or timeout expires.
+
+        Without an event source this is a plain sleep and returns None, so
+        callers fall back to polling the foreground window themselves.
+        """
+        if not self.events_active:
+            time.sleep(timeout)
+            return None
+        deadline = time.time() + timeout
+        self.refresh_foreground()
+        with self._lock:
+            while self.foreground_hwnd != hwnd:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._foreground_changed.wait(remaining)
+            return True
+
+    def update_geometry(self, hwnd, rect):
+        """Store a freshly known rect for an hwnd (e.g. from a move/resize event)."""
+        with self._lock:
+            cached = self._geometry.get(hwnd)
+            title = cached[0].title if cached else self.backend.get_title(hwnd)
+            # Move events only carry the window rect; the client rect is re-read with it
+            self._geometry[hwnd] = (self._window_info(hwnd, title, rect), time.time())
+
+    def forget_hwnd(self, hwnd):
+        """Drop every cache entry pointing at an hwnd (e.g. after the window was destroyed)."""
+        with self._lock:
+            self._geometry.pop(hwnd, None)
+            for key in [k for k, v in self._hwnds.items() if v == hwnd]:
+                del self._hwnds[key]
+
+    def invalidate(self, title=None):
+        """Forget cached handles for one title (both match modes) or for everything."""
+        with self._lock:
+            if title is None:
+                self._hwnds.clear()
+                self._geometry.clear()
+                self._missing.clear()
+                return
+            for key in [k for k in self._hwnds if k[0] == title]:
+                self._geometry.pop(self._hwnds.pop(key), None)
+            for key in [k for k in self._missing if k[0] == title]:
+                del self._missing[key]